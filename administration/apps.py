@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class AdministrationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'administration'
\ No newline at end of file
+    name = 'administration'
+
+    def ready(self):
+        import administration.signals  # noqa
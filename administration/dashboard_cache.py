@@ -0,0 +1,112 @@
+# administration/dashboard_cache.py
+"""
+Cache des réponses des tableaux de bord (admin et vendeur).
+
+Chaque endpoint décoré avec @cached_dashboard est mis en cache sous une clé
+construite à partir du nom de l'endpoint, de la portée de l'utilisateur
+(tous les admins partagent la même entrée, un vendeur a la sienne) et des
+paramètres de la requête.
+
+Invalidation : chaque entrée enregistre la version des sujets dont elle
+dépend ('orders', 'listings', 'reviews', 'transactions'). Les signaux
+post_save/post_delete (voir administration/signals.py) incrémentent ces
+versions. Une entrée expirée (TTL) ou invalidée reste servie pendant que la
+première requête qui la constate la recalcule (stale-while-revalidate) :
+un seul recalcul à la fois, même avec plusieurs admins sur le dashboard.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+TOPICS = ('orders', 'listings', 'reviews', 'transactions')
+
+VERSION_KEY = 'dashboard:version:{}'
+ENTRY_KEY = 'dashboard:{endpoint}:{scope}:{params}'
+LOCK_KEY = 'dashboard:lock:{}'
+LOCK_TIMEOUT = 60
+
+
+def dashboard_ttl():
+    return getattr(settings, 'DASHBOARD_CACHE_TTL', 60)
+
+
+def dashboard_stale_ttl():
+    return getattr(settings, 'DASHBOARD_CACHE_STALE_TTL', 300)
+
+
+def get_versions(topics):
+    keys = [VERSION_KEY.format(topic) for topic in topics]
+    found = cache.get_many(keys)
+    return {topic: found.get(key, 0) for topic, key in zip(topics, keys)}
+
+
+def invalidate(*topics):
+    """Incrémenter la version des sujets : les entrées qui en dépendent deviennent périmées"""
+    for topic in topics:
+        key = VERSION_KEY.format(topic)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def user_scope(user):
+    """Les admins partagent les mêmes données ; les autres utilisateurs ont leur propre entrée"""
+    if user.is_staff or user.is_superuser or getattr(user, 'role', None) == 'admin':
+        return 'staff'
+    return f'user-{user.pk}'
+
+
+def cache_key(endpoint, request):
+    params = '&'.join(f'{key}={value}' for key, value in sorted(request.GET.lists()))
+    digest = hashlib.md5(params.encode()).hexdigest()
+    return ENTRY_KEY.format(endpoint=endpoint, scope=user_scope(request.user), params=digest)
+
+
+def cached_dashboard(endpoint, depends_on=TOPICS, ttl=None):
+    """
+    Décorateur pour une vue fonction, à placer sous @api_view et
+    @permission_classes. Seules les réponses 200 sont mises en cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = cache_key(endpoint, request)
+            versions = get_versions(depends_on)
+            entry = cache.get(key)
+
+            if entry is not None and entry['versions'] == versions and entry['fresh_until'] > time.time():
+                return _cached_response(entry, 'hit')
+
+            locked = cache.add(LOCK_KEY.format(key), True, LOCK_TIMEOUT)
+            if entry is not None and not locked:
+                # Périmée et déjà en cours de recalcul : servir l'ancienne valeur
+                return _cached_response(entry, 'stale')
+
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    lifetime = ttl or dashboard_ttl()
+                    cache.set(key, {
+                        'data': response.data,
+                        'versions': versions,
+                        'fresh_until': time.time() + lifetime,
+                    }, lifetime + dashboard_stale_ttl())
+                    response['X-Dashboard-Cache'] = 'miss'
+                return response
+            finally:
+                if locked:
+                    cache.delete(LOCK_KEY.format(key))
+        return wrapper
+    return decorator
+
+
+def _cached_response(entry, state):
+    response = Response(entry['data'])
+    response['X-Dashboard-Cache'] = state
+    return response
@@ -0,0 +1,280 @@
+# administration/exports.py
+"""
+Exports en flux (commandes, utilisateurs, annonces).
+
+Les lignes sont lues par lots avec un curseur keyset (WHERE id > dernier id
+ORDER BY id LIMIT n) via .values_list() : pas d'instances de modèle, les
+données liées sont jointes dans la même requête et la mémoire reste
+constante quelle que soit la taille de la table. La sortie est écrite au fil
+de l'eau dans une StreamingHttpResponse, en CSV ou NDJSON, éventuellement
+compressée en gzip.
+
+Reprise : chaque ligne contient l'id ; relancer l'export avec `?after=<id>`
+reprend juste après la dernière ligne reçue.
+
+Mode arrière-plan (`?mode=background`) : le fichier est écrit dans
+MEDIA_ROOT/exports/ par un thread, puis l'utilisateur est notifié
+(notifications.Notification) avec le lien de téléchargement.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from e_sugu.workers import start_thread
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+EXPORT_DIR = 'exports'
+
+
+def _date(value, fmt='%Y-%m-%d %H:%M'):
+    return timezone.localtime(value).strftime(fmt) if value else ''
+
+
+class ExportSpec:
+    """
+    Définition d'un export : colonnes (clé, libellé CSV, champ ou lookup) et
+    éventuelle transformation de la valeur brute.
+    """
+
+    def __init__(self, name, columns, formatters=None):
+        self.name = name
+        self.columns = columns
+        self.formatters = formatters or {}
+
+    @property
+    def keys(self):
+        return [key for key, _, _ in self.columns]
+
+    @property
+    def labels(self):
+        return [label for _, label, _ in self.columns]
+
+    @property
+    def lookups(self):
+        return [lookup for _, _, lookup in self.columns]
+
+    def format_row(self, values):
+        return [
+            self.formatters[key](value) if key in self.formatters else value
+            for key, value in zip(self.keys, values)
+        ]
+
+
+def _order_spec():
+    from commandes.models import Order
+
+    status_labels = dict(Order.STATUS_CHOICES)
+    return ExportSpec('commandes', [
+        ('id', 'ID', 'id'),
+        ('order_number', 'Numéro de commande', 'order_number'),
+        ('created_at', 'Date', 'created_at'),
+        ('status', 'Statut', 'status'),
+        ('total_price', 'Prix total', 'total_price'),
+        # Jointure sur la transaction : plus de requête par commande
+        ('payment_method', 'Méthode de paiement', 'transaction__paymenet_method'),
+        ('shipping_country', 'Pays', 'shipping_country'),
+        ('shipping_method', "Méthode d'expédition", 'shipping_method'),
+    ], {
+        'created_at': _date,
+        'status': lambda value: status_labels.get(value, value),
+        'total_price': str,
+        'payment_method': lambda value: value or '',
+    })
+
+
+def _user_spec():
+    from users.models import User
+
+    role_labels = dict(User.ROLE_CHOICES)
+    return ExportSpec('utilisateurs', [
+        ('id', 'ID', 'id'),
+        ('email', 'Email', 'email'),
+        ('last_name', 'Nom', 'last_name'),
+        ('first_name', 'Prénom', 'first_name'),
+        ('role', 'Rôle', 'role'),
+        ('country_code', 'Indicatif', 'country_code'),
+        ('phone', 'Téléphone', 'phone'),
+        ('is_active', 'Statut', 'is_active'),
+        ('created_at', "Date d'inscription", 'created_at'),
+    ], {
+        'role': lambda value: role_labels.get(value, value),
+        'is_active': lambda value: 'Actif' if value else 'Inactif',
+        'created_at': lambda value: _date(value, '%Y-%m-%d'),
+    })
+
+
+def _listing_spec():
+    from listings.models import Listing
+
+    status_labels = dict(Listing.STATUS_CHOICES)
+    return ExportSpec('annonces', [
+        ('id', 'ID', 'id'),
+        ('title', 'Titre', 'title'),
+        ('seller', 'Vendeur', 'user__email'),
+        ('category', 'Catégorie', 'category__name'),
+        ('price', 'Prix', 'price'),
+        ('quantity', 'Quantité', 'quantity'),
+        ('quantity_sold', 'Quantité vendue', 'quantity_sold'),
+        ('status', 'Statut', 'status'),
+        ('views_count', 'Vues', 'views_count'),
+        ('created_at', 'Date de création', 'created_at'),
+    ], {
+        'price': str,
+        'status': lambda value: status_labels.get(value, value),
+        'created_at': _date,
+    })
+
+
+SPECS = {
+    'orders': _order_spec,
+    'users': _user_spec,
+    'listings': _listing_spec,
+}
+
+
+def iter_rows(queryset, spec, after=None, chunk_size=CHUNK_SIZE):
+    """Lignes formatées, lues par lots keyset sur la clé primaire (première colonne)"""
+    queryset = queryset.order_by('pk')
+    last_pk = after
+    while True:
+        batch = queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset
+        rows = list(batch.values_list(*spec.lookups)[:chunk_size])
+        for values in rows:
+            yield spec.format_row(values)
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+class _Echo:
+    """Tampon minimal pour csv.writer : renvoie la ligne au lieu de l'écrire"""
+
+    def write(self, value):
+        return value
+
+
+def iter_lines(spec, rows, output='csv'):
+    if output == 'ndjson':
+        for row in rows:
+            yield json.dumps(dict(zip(spec.keys, row)), ensure_ascii=False, default=str) + '\n'
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(spec.labels)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_gzip(lines):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as archive:
+        for line in lines:
+            archive.write(line.encode('utf-8'))
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_bytes(lines, gzipped=False):
+    if gzipped:
+        yield from iter_gzip(lines)
+    else:
+        for line in lines:
+            yield line.encode('utf-8')
+
+
+def export_options(request):
+    output = request.GET.get('output', 'csv')
+    if output not in FORMATS:
+        output = 'csv'
+    after = request.GET.get('after')
+    return {
+        'output': output,
+        'gzipped': request.GET.get('compress') == 'gzip',
+        'after': int(after) if after and after.isdigit() else None,
+        'background': request.GET.get('mode') == 'background',
+    }
+
+
+def filename_for(spec, output, gzipped):
+    extension = FORMATS[output][1] + ('.gz' if gzipped else '')
+    return f'{spec.name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+
+def streaming_export(kind, queryset, output='csv', gzipped=False, after=None):
+    spec = SPECS[kind]()
+    lines = iter_lines(spec, iter_rows(queryset, spec, after=after), output)
+    content_type = 'application/gzip' if gzipped else FORMATS[output][0]
+    response = StreamingHttpResponse(iter_bytes(lines, gzipped), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename_for(spec, output, gzipped)}"'
+    return response
+
+
+def write_export_file(kind, queryset, output='csv', gzipped=False, after=None):
+    """Écrire l'export dans MEDIA_ROOT/exports/ ; retourne le chemin relatif à MEDIA_ROOT"""
+    spec = SPECS[kind]()
+    name = filename_for(spec, output, gzipped)
+    # Préfixe aléatoire : les fichiers de MEDIA_ROOT sont servis publiquement
+    relative_path = os.path.join(EXPORT_DIR, f'{uuid.uuid4().hex}_{name}')
+    path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    lines = iter_lines(spec, iter_rows(queryset, spec, after=after), output)
+    with open(path, 'wb') as handle:
+        for chunk in iter_bytes(lines, gzipped):
+            handle.write(chunk)
+    return relative_path
+
+
+def run_background_export(user, kind, queryset, **options):
+    """Exporter dans un fichier puis notifier l'utilisateur"""
+    from notifications.models import Notification
+
+    try:
+        relative_path = write_export_file(kind, queryset, **options)
+        url = settings.MEDIA_URL + relative_path.replace(os.sep, '/')
+        Notification.objects.create(
+            user=user,
+            type='system',
+            content=f"📦 Votre export {SPECS[kind]().name} est prêt : {url}",
+        )
+        logger.info(f"✅ Export {kind} écrit dans {relative_path}")
+        return relative_path
+    except Exception as e:
+        logger.error(f"❌ Erreur export {kind}: {str(e)}")
+        Notification.objects.create(user=user, type='system', content=f"❌ L'export {kind} a échoué.")
+
+
+def start_background_export(user, kind, queryset, **options):
+    return start_thread(run_background_export, user, kind, queryset, **options)
+
+
+def export_response(request, kind, queryset):
+    """Point d'entrée des vues : flux direct ou export en arrière-plan (202)"""
+    options = export_options(request)
+    background = options.pop('background')
+    if background:
+        start_background_export(request.user, kind, queryset, **options)
+        return Response(
+            {'message': 'Export en cours, vous serez notifié quand le fichier sera prêt'},
+            status=status.HTTP_202_ACCEPTED
+        )
+    return streaming_export(kind, queryset, **options)
@@ -0,0 +1,32 @@
+# administration/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from commandes.models import Order
+from listings.models import Listing
+from payments.models import Transaction
+from reviews.models import Review
+from transactions.models import Transaction as LegacyTransaction
+from .dashboard_cache import invalidate
+
+TOPIC_BY_MODEL = {
+    Order: 'orders',
+    Listing: 'listings',
+    Review: 'reviews',
+    Transaction: 'transactions',
+    LegacyTransaction: 'transactions',
+}
+
+
+def invalidate_dashboards(sender, **kwargs):
+    """Périmer les dashboards qui dépendent du modèle modifié"""
+    topic = TOPIC_BY_MODEL[sender]
+    # Immédiatement, puis après commit : un recalcul concurrent pendant la
+    # transaction aurait pu lire les anciennes données
+    invalidate(topic)
+    transaction.on_commit(lambda: invalidate(topic))
+
+
+for model in TOPIC_BY_MODEL:
+    post_save.connect(invalidate_dashboards, sender=model, dispatch_uid=f'dashboard_cache_save_{model._meta.label}')
+    post_delete.connect(invalidate_dashboards, sender=model, dispatch_uid=f'dashboard_cache_delete_{model._meta.label}')
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class CategoriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'categories'
\ No newline at end of file
+    name = 'categories'
+
+    def ready(self):
+        import categories.signals  # noqa
@@ -0,0 +1,116 @@
+# categories/cache.py
+"""
+Cache de l'arbre complet des catégories.
+
+L'arbre est sérialisé une seule fois puis conservé dans un dict local au
+processus et dans le cache Django, sous une clé versionnée. Toute écriture
+sur Category incrémente la version (voir categories/signals.py) : chaque
+processus reconstruit alors son arbre au prochain accès.
+
+Sans cache partagé (LocMemCache sans REDIS_URL), l'incrément n'est vu que
+du processus qui a écrit : la version y expire au bout de
+LOCAL_VERSION_TIMEOUT, ce qui borne la durée pendant laquelle les autres
+workers servent un arbre périmé.
+"""
+import time
+
+from django.core.cache import cache
+from e_sugu.caching import is_shared
+
+VERSION_KEY = 'categories:tree:version'
+TREE_KEY = 'categories:tree:{version}'
+TREE_TIMEOUT = 60 * 60 * 24
+LOCAL_VERSION_TIMEOUT = 60
+
+_local = {'version': None, 'tree': None}
+
+
+class CategoryTree:
+    """Arbre des catégories avec accès O(1) par id et par nom (insensible à la casse)"""
+
+    def __init__(self, version, nodes, descendants):
+        self.version = version
+        self.by_id = {node['id']: node for node in nodes}
+        self.descendants = descendants
+        self.by_name = {}
+        # Les catégories principales passent en premier pour un même nom
+        for node in sorted(nodes, key=lambda n: (n['parent'] is not None, n['id'])):
+            self.by_name.setdefault(node['name'].lower(), []).append(node['id'])
+
+    def get(self, pk):
+        return self.by_id.get(pk)
+
+    def find_by_name(self, name):
+        ids = self.by_name.get((name or '').lower())
+        return self.by_id[ids[0]] if ids else None
+
+    def roots(self):
+        return [node for node in self.by_id.values() if node['parent'] is None]
+
+    def subcategories(self):
+        return [node for node in self.by_id.values() if node['parent'] is not None]
+
+    def descendant_ids(self, pk):
+        """Id de la catégorie et de toutes ses sous-catégories"""
+        return self.descendants.get(pk, [])
+
+    def descendant_ids_for_name(self, name):
+        """Ids de toutes les catégories portant ce nom et de leurs sous-catégories"""
+        ids = []
+        for pk in self.by_name.get((name or '').lower(), []):
+            ids.extend(self.descendant_ids(pk))
+        return ids
+
+
+def _version_timeout():
+    return None if is_shared() else LOCAL_VERSION_TIMEOUT
+
+
+def get_tree_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Clé absente, évincée ou expirée : une nouvelle valeur unique invalide les arbres locaux
+        cache.add(VERSION_KEY, time.time_ns(), _version_timeout())
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_tree_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), _version_timeout())
+
+
+def _build_payload():
+    from .models import Category, CategoryClosure
+    from .serializers import CategorySerializer
+
+    categories = Category.objects.prefetch_related('subcategories').order_by('id')
+    nodes = [dict(item) for item in CategorySerializer(categories, many=True).data]
+    for node in nodes:
+        node['subcategories'] = [dict(sub) for sub in node['subcategories']]
+
+    descendants = {}
+    for ancestor_id, descendant_id in CategoryClosure.objects.order_by('depth', 'descendant_id').values_list(
+        'ancestor_id', 'descendant_id'
+    ):
+        descendants.setdefault(ancestor_id, []).append(descendant_id)
+    return {'nodes': nodes, 'descendants': descendants}
+
+
+def get_category_tree():
+    """Arbre courant : dict local, puis cache partagé, puis base de données"""
+    version = get_tree_version()
+    if _local['version'] == version and _local['tree'] is not None:
+        return _local['tree']
+
+    key = TREE_KEY.format(version=version)
+    payload = cache.get(key)
+    if payload is None:
+        payload = _build_payload()
+        cache.set(key, payload, TREE_TIMEOUT)
+
+    tree = CategoryTree(version, payload['nodes'], payload['descendants'])
+    _local['version'], _local['tree'] = version, tree
+    return tree
@@ -0,0 +1,14 @@
+# categories/management/commands/rebuild_category_closure.py
+from django.core.management.base import BaseCommand
+from categories.models import Category, CategoryClosure
+
+
+class Command(BaseCommand):
+    help = "Reconstruire la table de fermeture de l'arbre des catégories (après un loaddata par exemple)"
+
+    def handle(self, *args, **options):
+        CategoryClosure.rebuild()
+        self.stdout.write(
+            f"✅ Table de fermeture reconstruite: {Category.objects.count()} catégories, "
+            f"{CategoryClosure.objects.count()} liens"
+        )
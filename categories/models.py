@@ -1,4 +1,25 @@
-from django.db import models
+from django.db import models, transaction
+from .cache import bump_tree_version
+
+
+class CategoryQuerySet(models.QuerySet):
+    def descendant_ids(self, category):
+        """
+        Ids de la catégorie et de toutes ses sous-catégories (tous niveaux),
+        via la table de fermeture : une seule requête indexée, utilisable
+        directement comme sous-requête (`category_id__in=...`).
+        `category` peut être une instance, un id ou un queryset de catégories.
+        """
+        if isinstance(category, models.QuerySet):
+            lookup = {'ancestor__in': category}
+        else:
+            lookup = {'ancestor': category}
+        return CategoryClosure.objects.filter(**lookup).values_list('descendant_id', flat=True)
+
+    def ancestor_ids(self, category):
+        """Ids de la catégorie et de tous ses parents"""
+        return CategoryClosure.objects.filter(descendant=category).values_list('ancestor_id', flat=True)
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -14,9 +35,91 @@ class Category(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         unique_together = ('name', 'parent')
         verbose_name_plural = "Categories"
 
     def __str__(self):
         return f"{self.name}" if not self.parent else f"{self.parent} > {self.name}"
+
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        parent_changed = False
+        if not is_new:
+            old_parent_id = Category.objects.filter(pk=self.pk).values_list('parent_id', flat=True).first()
+            parent_changed = old_parent_id != self.parent_id
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                CategoryClosure.insert_node(self)
+            elif parent_changed:
+                CategoryClosure.move_subtree(self)
+        # La suppression est gérée par les CASCADE de CategoryClosure
+
+
+class CategoryClosure(models.Model):
+    """
+    Table de fermeture de l'arbre des catégories : une ligne par couple
+    (ancêtre, descendant), y compris (catégorie, catégorie) à la profondeur 0.
+    """
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+    @classmethod
+    def insert_node(cls, category):
+        """Ajouter une nouvelle feuille sous son parent"""
+        links = [cls(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+        if category.parent_id:
+            for ancestor_id, depth in cls.objects.filter(
+                descendant_id=category.parent_id
+            ).values_list('ancestor_id', 'depth'):
+                links.append(cls(ancestor_id=ancestor_id, descendant_id=category.pk, depth=depth + 1))
+        cls.objects.bulk_create(links)
+
+    @classmethod
+    def move_subtree(cls, category):
+        """Rattacher le sous-arbre de `category` à son nouveau parent"""
+        subtree = list(cls.objects.filter(ancestor_id=category.pk).values_list('descendant_id', 'depth'))
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+
+        # Couper les liens avec les anciens ancêtres
+        cls.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+
+        if category.parent_id:
+            new_ancestors = cls.objects.filter(
+                descendant_id=category.parent_id
+            ).values_list('ancestor_id', 'depth')
+            cls.objects.bulk_create([
+                cls(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + depth + 1)
+                for ancestor_id, ancestor_depth in new_ancestors
+                for descendant_id, depth in subtree
+            ])
+
+    @classmethod
+    def rebuild(cls):
+        """Reconstruire entièrement la table (migration, réparation)"""
+        parents = dict(Category.objects.values_list('id', 'parent_id'))
+        links = []
+        for category_id in parents:
+            ancestor_id, depth, seen = category_id, 0, set()
+            while ancestor_id is not None and ancestor_id not in seen:
+                seen.add(ancestor_id)
+                links.append(cls(ancestor_id=ancestor_id, descendant_id=category_id, depth=depth))
+                ancestor_id, depth = parents.get(ancestor_id), depth + 1
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(links, batch_size=1000)
+        bump_tree_version()
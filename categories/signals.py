@@ -0,0 +1,17 @@
+# categories/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Category
+from .cache import bump_tree_version
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, **kwargs):
+    """Invalider l'arbre en cache à chaque modification des catégories"""
+    # Immédiatement, puis après commit : une reconstruction concurrente
+    # pendant la transaction aurait pu lire l'ancien arbre
+    bump_tree_version()
+    transaction.on_commit(bump_tree_version)
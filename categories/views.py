@@ -8,6 +8,7 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from .serializers import CategorySerializer
+from .cache import get_category_tree
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
@@ -15,11 +16,24 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # On ne retourne que les catégories principales (sans parent)
         return Category.objects.filter(parent__isnull=True)
+
+    def list(self, request, *args, **kwargs):
+        # Lecture depuis l'arbre en cache : aucune requête sur Category
+        roots = get_category_tree().roots()
+        page = self.paginate_queryset(roots)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(roots)
+
+    def retrieve(self, request, *args, **kwargs):
+        node = get_category_tree().get(_to_int(kwargs.get(self.lookup_field)))
+        if node is None:
+            return Response({"detail": "Catégorie non trouvée."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(node)
+
     @action(detail=False, methods=['get'], url_path='subcategories')
     def subcategories(self, request):
-        subcats = Category.objects.filter(parent__isnull=False)
-        serializer = self.get_serializer(subcats, many=True)
-        return Response(serializer.data)
+        return Response(get_category_tree().subcategories())
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -31,11 +45,22 @@ class CategoryDetailWithChildrenAPIView(generics.RetrieveAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+
+    def retrieve(self, request, *args, **kwargs):
+        node = get_category_tree().get(_to_int(kwargs.get('pk')))
+        if node is None:
+            return Response({"detail": "Catégorie non trouvée."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(node)
 class CategoryByNameAPIView(APIView):
     def get(self, request, name):
-        try:
-            category = Category.objects.get(name__iexact=name)
-            serializer = CategorySerializer(category)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Category.DoesNotExist:
-            return Response({"detail": "Catégorie non trouvée."}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        node = get_category_tree().find_by_name(name)
+        if node is None:
+            return Response({"detail": "Catégorie non trouvée."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(node, status=status.HTTP_200_OK)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
\ No newline at end of file
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from users.models import User
 from listings.models import Listing
 from django.utils import timezone 
@@ -56,16 +56,19 @@ class Order(models.Model):
 
     def cancel_order(self):
         """Annuler la commande et restocker"""
-        if self.status in ['pending', 'confirmed']:
+        with transaction.atomic():
+            # UPDATE conditionnel : deux annulations simultanées ne restockent qu'une fois
+            cancelled = Order.objects.filter(
+                pk=self.pk, status__in=['pending', 'confirmed']
+            ).update(status='cancelled', updated_at=timezone.now())
+            if not cancelled:
+                return False
+            from users.vendor_stats import schedule_refresh
+            schedule_refresh(self.listing.user_id, self.created_at, 'orders')
             # Restocker la quantité
-            self.listing.quantity_sold = max(0, self.listing.quantity_sold - self.quantity)
-            self.listing.update_status_based_on_quantity()
-            self.listing.save()
-            
-            self.status = 'cancelled'
-            self.save()
-            return True
-        return False
+            self.listing.release_stock(self.quantity)
+        self.status = 'cancelled'
+        return True
     def payment_method(self):
         """Récupère le payment_method depuis la transaction associée"""
         if hasattr(self, 'transaction'):
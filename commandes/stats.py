@@ -0,0 +1,82 @@
+# commandes/stats.py
+"""
+Statistiques de commandes en une seule requête.
+
+OrderStatsAggregator calcule sur n'importe quel queryset de base (acheteur,
+vendeur, global) le total, le chiffre d'affaires, la répartition par statut
+et les compteurs par période avec des agrégats conditionnels
+(COUNT(*) FILTER (WHERE ...)), au lieu d'un COUNT par statut.
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Order
+
+STATUS_CODES = [code for code, _ in Order.STATUS_CHOICES]
+
+
+@dataclass
+class OrderStats:
+    total_orders: int = 0
+    total_revenue: Decimal = Decimal('0')
+    monthly_orders: int = 0
+    orders_last_7_days: int = 0
+    revenue_last_7_days: Decimal = Decimal('0')
+    by_status: dict = field(default_factory=dict)
+
+    @property
+    def average_order_value(self):
+        if not self.total_orders:
+            return 0
+        return float(self.total_revenue / self.total_orders)
+
+    def count(self, status):
+        return self.by_status.get(status, 0)
+
+    def status_stats(self):
+        """Répartition indexée par libellé, comme le renvoyaient les vues"""
+        return {label: self.count(code) for code, label in Order.STATUS_CHOICES}
+
+
+class OrderStatsAggregator:
+    """
+    Usage :
+        stats = OrderStatsAggregator(Order.objects.filter(user=user)).compute()
+        stats.total_orders, stats.count('pending'), stats.status_stats()
+    """
+
+    def __init__(self, queryset=None, statuses=None, now=None):
+        self.queryset = Order.objects.all() if queryset is None else queryset
+        self.statuses = list(statuses) if statuses is not None else STATUS_CODES
+        self.now = now or timezone.now()
+
+    def _month_start(self):
+        local_now = timezone.localtime(self.now)
+        return local_now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    def compute(self):
+        last_7_days = Q(created_at__gte=self.now - timedelta(days=7))
+        aggregates = {
+            'total_orders': Count('id'),
+            'total_revenue': Sum('total_price'),
+            'monthly_orders': Count('id', filter=Q(created_at__gte=self._month_start())),
+            'orders_last_7_days': Count('id', filter=last_7_days),
+            'revenue_last_7_days': Sum('total_price', filter=last_7_days),
+        }
+        for index, status in enumerate(self.statuses):
+            aggregates[f'status_{index}'] = Count('id', filter=Q(status=status))
+
+        # order_by() : l'ordre par défaut du modèle est inutile pour un agrégat
+        data = self.queryset.order_by().aggregate(**aggregates)
+        return OrderStats(
+            total_orders=data['total_orders'],
+            total_revenue=data['total_revenue'] or Decimal('0'),
+            monthly_orders=data['monthly_orders'],
+            orders_last_7_days=data['orders_last_7_days'],
+            revenue_last_7_days=data['revenue_last_7_days'] or Decimal('0'),
+            by_status={status: data[f'status_{index}'] for index, status in enumerate(self.statuses)},
+        )
@@ -0,0 +1,158 @@
+# commandes/timeseries.py
+"""
+Séries temporelles pour les graphiques.
+
+Une seule requête GROUP BY par série : les lignes sont regroupées par
+période (jour, semaine ISO, mois) dans le fuseau du projet (Africa/Bamako),
+puis les périodes sans données sont complétées à zéro en Python.
+
+    series = TimeSeries(Order.objects.filter(listing__user=user), metrics=['orders', 'revenue'])
+    series.run(start, end).as_chart()
+    # {'granularity': 'day', 'labels': ['2025-01-01', ...], 'series': {'orders': [...], 'revenue': [...]}}
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Avg, Count, DateField, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# Métriques disponibles : nom -> fabrique d'agrégat. Les champs sont ceux
+# de Order ; ListingView utilise 'views' et 'unique_visitors'.
+METRICS = {
+    'orders': lambda: Count('id'),
+    'revenue': lambda: Sum('total_price'),
+    'units': lambda: Sum('quantity'),
+    'avg_order_value': lambda: Avg('total_price'),
+    'unique_customers': lambda: Count('user', distinct=True),
+    'views': lambda: Count('id'),
+    'unique_visitors': lambda: Count('ip_address', distinct=True),
+}
+
+
+def bucket_start(day, granularity):
+    """Début de la période contenant `day` (même convention que date_trunc)"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_range(start, end, granularity='day'):
+    """Toutes les périodes entre deux dates (incluses)"""
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        current = next_bucket(current, granularity)
+    return buckets
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def _chart_value(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+class TimeSeriesResult:
+    def __init__(self, granularity, buckets, values):
+        self.granularity = granularity
+        self.buckets = buckets
+        self.values = values  # {métrique: [valeur par période]}
+
+    def labels(self, fmt='%Y-%m-%d'):
+        return [bucket.strftime(fmt) for bucket in self.buckets]
+
+    def points(self, label='date', fmt='%Y-%m-%d'):
+        """Une ligne par période : [{'date': ..., 'orders': ..., ...}]"""
+        return [
+            {label: bucket.strftime(fmt), **{
+                metric: _chart_value(values[index]) for metric, values in self.values.items()
+            }}
+            for index, bucket in enumerate(self.buckets)
+        ]
+
+    def as_chart(self, fmt='%Y-%m-%d'):
+        return {
+            'granularity': self.granularity,
+            'labels': self.labels(fmt),
+            'series': {
+                metric: [_chart_value(value) for value in values]
+                for metric, values in self.values.items()
+            },
+        }
+
+
+class TimeSeries:
+    """
+    `metrics` : noms de METRICS ou dict {nom: expression d'agrégat}.
+    `filters` : filtres supplémentaires appliqués au queryset de base.
+    """
+
+    def __init__(self, queryset, metrics=('orders',), granularity='day', date_field='created_at',
+                 tz=None, filters=None):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Granularité inconnue: {granularity}")
+        if not isinstance(metrics, dict):
+            metrics = {name: METRICS[name]() for name in metrics}
+        self.queryset = queryset.filter(**filters) if filters else queryset
+        self.metrics = metrics
+        self.granularity = granularity
+        self.date_field = date_field
+        self.tz = tz or timezone.get_current_timezone()
+
+    def _midnight(self, day):
+        return timezone.make_aware(datetime.combine(day, time.min), self.tz)
+
+    def rows(self, start=None, end=None):
+        """La requête groupée : {période: {métrique: valeur}}"""
+        queryset = self.queryset
+        if start:
+            queryset = queryset.filter(**{
+                f'{self.date_field}__gte': self._midnight(bucket_start(start, self.granularity))
+            })
+        if end:
+            queryset = queryset.filter(**{f'{self.date_field}__lt': self._midnight(end + timedelta(days=1))})
+
+        bucket = Trunc(self.date_field, self.granularity, output_field=DateField(), tzinfo=self.tz)
+        grouped = queryset.order_by().values(bucket=bucket).annotate(**self.metrics)
+        return {_to_date(row.pop('bucket')): row for row in grouped}
+
+    def run(self, start=None, end=None):
+        """
+        Série complétée à zéro de `start` à `end` (dates locales incluses).
+        Sans `start`, la série commence à la première période ayant des données.
+        """
+        end = end or timezone.localdate()
+        rows = self.rows(start, end)
+        if start is None and not rows:
+            buckets = []
+        else:
+            buckets = bucket_range(start or min(rows), end, self.granularity)
+
+        values = {}
+        for metric in self.metrics:
+            values[metric] = [
+                (rows[bucket][metric] if bucket in rows else None) or 0
+                for bucket in buckets
+            ]
+        return TimeSeriesResult(self.granularity, buckets, values)
+
+
+def time_series(queryset, start=None, end=None, **kwargs):
+    return TimeSeries(queryset, **kwargs).run(start, end)
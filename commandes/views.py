@@ -4,7 +4,7 @@ from rest_framework.response import Response
 from .models import Order, OrderItem
 from .serializers import OrderSerializer
 from paniers.models import Panier  # ton modèle de panier renommé
-from listings.models import Listing
+from listings.models import Listing, listing_cards_prefetch
 from decimal import Decimal 
 #from transactions.models import Transaction 
 from payments.models import Transaction  # Import the Transaction model
@@ -20,13 +20,28 @@ from datetime import timedelta
 from users.models import User
 from django.db.models import Count, Sum, Avg, F, ExpressionWrapper, DurationField, Q
 from django.db.models.functions import TruncDate, TruncMonth, TruncWeek, TruncDay
+from listings.search import listing_search_q
+from users.vendor_stats import schedule_refresh_for_orders
+from .stats import OrderStatsAggregator, STATUS_CODES
+from .timeseries import time_series
+from e_sugu.pagination import KeysetPagination
+from administration.dashboard_cache import cached_dashboard
+from administration.exports import export_response
+
+def for_order_serializer(queryset):
+    """Transaction, articles et annonces lus par OrderSerializer : pas de requête par commande"""
+    return queryset.select_related('transaction').prefetch_related(
+        'items', listing_cards_prefetch('items__listing')
+    )
+
 
 class OrderViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        queryset = Order.objects.filter(user=self.request.user)
+        queryset = for_order_serializer(Order.objects.filter(user=self.request.user))
         
         # Filtrage par statut
         status = self.request.query_params.get('status')
@@ -194,6 +209,7 @@ class BulkOrderActionView(APIView):
         elif action == 'update_status':
             new_status = request.data.get('status')
             orders.update(status=new_status)
+            schedule_refresh_for_orders(orders)
         
         return Response({'updated': orders.count()})
 class ExportOrdersView(APIView):
@@ -214,28 +230,9 @@ class ExportOrdersView(APIView):
             if date_to:
                 orders = orders.filter(created_at__lte=date_to)
             
-            # Créer la réponse CSV
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="commandes_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow([
-                'Numéro de commande', 'Date', 'Statut', 'Prix total', 
-                'Méthode de paiement', 'Pays', 'Méthode d\'expédition'
-            ])
-            
-            for order in orders:
-                writer.writerow([
-                    order.order_number,
-                    order.created_at.strftime('%Y-%m-%d %H:%M'),
-                    order.get_status_display(),
-                    order.total_price,
-                    order.payment_method() or '',
-                    order.shipping_country,
-                    order.shipping_method
-                ])
-            
-            return response
+            # Export en flux : CSV/NDJSON (?output=), gzip (?compress=gzip),
+            # reprise (?after=<id>) ou fichier en arrière-plan (?mode=background)
+            return export_response(request, 'orders', orders)
 
 
 # commandes/views.py - MODIFIER OrderStatsView
@@ -258,47 +255,20 @@ class OrderStatsView(APIView):
             orders = Order.objects.filter(user=user)
             stats_type = 'user'
         
-        # Statistiques par statut
-        status_stats = {}
-        for status_code, status_name in Order.STATUS_CHOICES:
-            count = orders.filter(status=status_code).count()
-            status_stats[status_name] = count
-        
-        # Chiffre d'affaires total
-        total_revenue = orders.aggregate(total=models.Sum('total_price'))['total'] or 0
-        
-        # Commandes du mois
-        current_month = timezone.now().month
-        current_year = timezone.now().year
-        monthly_orders = orders.filter(
-            created_at__month=current_month,
-            created_at__year=current_year
-        ).count()
+        # Total, statuts, revenu et périodes : une seule requête
+        stats = OrderStatsAggregator(orders).compute()
         
         # Préparer la réponse
         response_data = {
             'stats_type': stats_type,
-            'total_orders': orders.count(),
-            'status_stats': status_stats,
-            'total_revenue': float(total_revenue),
-            'monthly_orders': monthly_orders,
+            'total_orders': stats.total_orders,
+            'status_stats': stats.status_stats(),
+            'total_revenue': float(stats.total_revenue),
+            'monthly_orders': stats.monthly_orders,
         }
         
         # Ajouter des statistiques supplémentaires pour l'admin
         if is_admin:
-            
-            seven_days_ago = timezone.now() - timedelta(days=7)
-            
-            # Commandes récentes
-            recent_orders = orders.filter(
-                created_at__gte=seven_days_ago
-            ).count()
-            
-            # Revenue récent
-            recent_revenue = orders.filter(
-                created_at__gte=seven_days_ago
-            ).aggregate(total=Sum('total_price'))['total'] or 0
-            
             # Top vendeurs
             
             top_vendors = Order.objects.values(
@@ -309,9 +279,9 @@ class OrderStatsView(APIView):
             ).order_by('-total_revenue')[:5]
             
             response_data['admin_stats'] = {
-                'recent_orders': recent_orders,
-                'recent_revenue': float(recent_revenue),
-                'average_order_value': float(total_revenue / orders.count()) if orders.count() > 0 else 0,
+                'recent_orders': stats.orders_last_7_days,
+                'recent_revenue': float(stats.revenue_last_7_days),
+                'average_order_value': stats.average_order_value,
                 'top_vendors': list(top_vendors),
             }
         
@@ -327,22 +297,8 @@ class AdminOrderStatsView(APIView):
         # Récupérer TOUTES les commandes (pas de filtre par user)
         orders = Order.objects.all()
         
-        # Statistiques par statut
-        status_stats = {}
-        for status_code, status_name in Order.STATUS_CHOICES:
-            count = orders.filter(status=status_code).count()
-            status_stats[status_name] = count
-        
-        # Chiffre d'affaires total
-        total_revenue = orders.aggregate(total=models.Sum('total_price'))['total'] or 0
-        
-        # Commandes du mois
-        current_month = timezone.now().month
-        current_year = timezone.now().year
-        monthly_orders = orders.filter(
-            created_at__month=current_month,
-            created_at__year=current_year
-        ).count()
+        # 'completed' n'est pas dans STATUS_CHOICES mais reste exposé par cet endpoint
+        stats = OrderStatsAggregator(orders, statuses=STATUS_CODES + ['completed']).compute()
         
         # 🔥 Statistiques supplémentaires pour admin
         # Commandes par vendeur
@@ -356,32 +312,21 @@ class AdminOrderStatsView(APIView):
             total_revenue=models.Sum('total_price')
         ).order_by('-total_revenue')[:10]
         
-        # Commandes par période (7 derniers jours)
-        from datetime import timedelta
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        orders_last_7_days = orders.filter(
-            created_at__gte=seven_days_ago
-        ).count()
-        
-        revenue_last_7_days = orders.filter(
-            created_at__gte=seven_days_ago
-        ).aggregate(total=Sum('total_price'))['total'] or 0
-        
         return Response({
-            'total_orders': orders.count(),
-            'status_stats': status_stats,
-            'total_revenue': float(total_revenue),
-            'monthly_orders': monthly_orders,
+            'total_orders': stats.total_orders,
+            'status_stats': stats.status_stats(),
+            'total_revenue': float(stats.total_revenue),
+            'monthly_orders': stats.monthly_orders,
             
             # 🔥 Statistiques admin supplémentaires
             'admin_stats': {
-                'orders_last_7_days': orders_last_7_days,
-                'revenue_last_7_days': float(revenue_last_7_days),
-                'average_order_value': float(total_revenue / orders.count()) if orders.count() > 0 else 0,
+                'orders_last_7_days': stats.orders_last_7_days,
+                'revenue_last_7_days': float(stats.revenue_last_7_days),
+                'average_order_value': stats.average_order_value,
                 'top_vendors': list(vendor_stats),
-                'pending_orders': orders.filter(status='pending').count(),
-                'completed_orders': orders.filter(status='completed').count(),
-                'cancelled_orders': orders.filter(status='cancelled').count(),
+                'pending_orders': stats.count('pending'),
+                'completed_orders': stats.count('completed'),
+                'cancelled_orders': stats.count('cancelled'),
             }
         })
 
@@ -393,50 +338,30 @@ class UserOrderStatsView(APIView):
     def get(self, request):
         user = request.user
         orders = Order.objects.filter(user=user)  # 🔥 Seulement ses commandes
-        
-        # Statistiques par statut
-        status_stats = {}
-        for status_code, status_name in Order.STATUS_CHOICES:
-            count = orders.filter(status=status_code).count()
-            status_stats[status_name] = count
-        
-        # Chiffre d'affaires total (ses achats)
-        total_revenue = orders.aggregate(total=models.Sum('total_price'))['total'] or 0
-        
-        # Commandes du mois
-        current_month = timezone.now().month
-        current_year = timezone.now().year
-        monthly_orders = orders.filter(
-            created_at__month=current_month,
-            created_at__year=current_year
-        ).count()
+        stats = OrderStatsAggregator(orders).compute()
         
         # Statistiques spécifiques acheteur
         if user.is_seller or hasattr(user, 'vendor_profile'):
             # Si c'est aussi un vendeur, ajouter ses ventes
-            vendor_orders = Order.objects.filter(listing__user=user)
-            vendor_revenue = vendor_orders.aggregate(total=Sum('total_price'))['total'] or 0
+            sales = OrderStatsAggregator(Order.objects.filter(listing__user=user), statuses=[]).compute()
             
             return Response({
                 'user_type': 'seller',
-                'total_orders_as_buyer': orders.count(),
-                'total_orders_as_seller': vendor_orders.count(),
-                'status_stats_as_buyer': status_stats,
-                'total_spent': float(total_revenue),
-                'total_earned': float(vendor_revenue),
-                'monthly_orders': monthly_orders,
-                'monthly_sales': vendor_orders.filter(
-                    created_at__month=current_month,
-                    created_at__year=current_year
-                ).count(),
+                'total_orders_as_buyer': stats.total_orders,
+                'total_orders_as_seller': sales.total_orders,
+                'status_stats_as_buyer': stats.status_stats(),
+                'total_spent': float(stats.total_revenue),
+                'total_earned': float(sales.total_revenue),
+                'monthly_orders': stats.monthly_orders,
+                'monthly_sales': sales.monthly_orders,
             })
         
         return Response({
             'user_type': 'buyer',
-            'total_orders': orders.count(),
-            'status_stats': status_stats,
-            'total_revenue': float(total_revenue),
-            'monthly_orders': monthly_orders,
+            'total_orders': stats.total_orders,
+            'status_stats': stats.status_stats(),
+            'total_revenue': float(stats.total_revenue),
+            'monthly_orders': stats.monthly_orders,
         })
 # commandes/views.py - AJOUTER ces endpoints
 
@@ -449,39 +374,16 @@ class AdminDashboardStatsView(APIView):
         
         orders = Order.objects.all()
         today = timezone.now()
-        
-        # Statistiques de base
-        total_orders = orders.count()
-        total_revenue = orders.aggregate(total=Sum('total_price'))['total'] or 0
-        
-        # Statistiques par période
-        last_7_days = today - timedelta(days=7)
         last_30_days = today - timedelta(days=30)
         
-        orders_last_7_days = orders.filter(created_at__gte=last_7_days).count()
-        revenue_last_7_days = orders.filter(
-            created_at__gte=last_7_days
-        ).aggregate(total=Sum('total_price'))['total'] or 0
+        # Statistiques de base, par période et par statut : une seule requête
+        stats = OrderStatsAggregator(orders, now=today).compute()
         
-        # Distribution par statut
-        status_distribution = {}
-        for status_code, status_name in Order.STATUS_CHOICES:
-            count = orders.filter(status=status_code).count()
-            status_distribution[status_name] = count
-        
-        # Tendances quotidiennes (7 derniers jours)
-        daily_trends = []
-        for i in range(7):
-            date = today - timedelta(days=i)
-            day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-            
-            day_orders = orders.filter(created_at__range=[day_start, day_end])
-            daily_trends.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'orders': day_orders.count(),
-                'revenue': float(day_orders.aggregate(total=Sum('total_price'))['total'] or 0)
-            })
+        # Tendances quotidiennes (7 derniers jours) : une requête groupée par jour
+        local_today = timezone.localdate(today)
+        daily_trends = time_series(
+            orders, local_today - timedelta(days=6), local_today, metrics=['orders', 'revenue']
+        ).points()
         
         # Top vendeurs
         top_vendors = Order.objects.values(
@@ -504,9 +406,6 @@ class AdminDashboardStatsView(APIView):
             total_revenue=Sum('total_price')
         ).order_by('-total_revenue')[:10]
         
-        # Métriques de performance
-        avg_order_value = float(total_revenue / total_orders) if total_orders > 0 else 0
-        
         # Convertissez les QuerySets en listes
         top_vendors_list = []
         for vendor in top_vendors:
@@ -530,14 +429,14 @@ class AdminDashboardStatsView(APIView):
         
         return Response({
             'overview': {
-                'total_orders': total_orders,
-                'total_revenue': float(total_revenue),
-                'orders_last_7_days': orders_last_7_days,
-                'revenue_last_7_days': float(revenue_last_7_days),
-                'avg_order_value': avg_order_value,
+                'total_orders': stats.total_orders,
+                'total_revenue': float(stats.total_revenue),
+                'orders_last_7_days': stats.orders_last_7_days,
+                'revenue_last_7_days': float(stats.revenue_last_7_days),
+                'avg_order_value': stats.average_order_value,
             },
-            'status_distribution': status_distribution,
-            'daily_trends': daily_trends[::-1],  # Inverser pour avoir du plus ancien au plus récent
+            'status_distribution': stats.status_stats(),
+            'daily_trends': daily_trends,  # Du plus ancien au plus récent
             'top_vendors': top_vendors_list,
             'top_products': top_products_list,
             'period': {
@@ -552,40 +451,19 @@ class AdminDashboardStatsView(APIView):
 def admin_orders_analytics(request):
    
     
-    # Commandes par mois
-    monthly_stats = Order.objects.annotate(
-        month=TruncMonth('created_at')
-    ).values('month').annotate(
-        orders=Count('id'),
-        revenue=Sum('total_price'),
-        avg_order_value=Avg('total_price')
-    ).order_by('month')
+    today = timezone.localdate()
     
-    # Commandes par semaine
-    weekly_stats = Order.objects.annotate(
-        week=TruncWeek('created_at')
-    ).values('week').annotate(
-        orders=Count('id'),
-        revenue=Sum('total_price')
-    ).order_by('-week')[:12]
-    
-    # Conversion des QuerySets
-    monthly_data = []
-    for stat in monthly_stats:
-        monthly_data.append({
-            'month': stat['month'].strftime('%Y-%m'),
-            'orders': stat['orders'],
-            'revenue': float(stat['revenue'] or 0),
-            'avg_order_value': float(stat['avg_order_value'] or 0)
-        })
+    # Commandes par mois (depuis la première commande)
+    monthly_data = time_series(
+        Order.objects.all(), end=today, granularity='month',
+        metrics=['orders', 'revenue', 'avg_order_value']
+    ).points(label='month', fmt='%Y-%m')
     
-    weekly_data = []
-    for stat in weekly_stats:
-        weekly_data.append({
-            'week': stat['week'].strftime('%Y-%m-%d'),
-            'orders': stat['orders'],
-            'revenue': float(stat['revenue'] or 0)
-        })
+    # Commandes par semaine (12 dernières semaines, de la plus récente à la plus ancienne)
+    weekly_data = time_series(
+        Order.objects.all(), today - timedelta(weeks=11), today, granularity='week',
+        metrics=['orders', 'revenue']
+    ).points(label='week')[::-1]
     
     return Response({
         'monthly_analytics': monthly_data,
@@ -805,10 +683,11 @@ class BuyerOrdersViewSet(viewsets.ReadOnlyModelViewSet):
     """Commandes de l'utilisateur (acheteur)"""
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         # Filtrer les commandes où l'utilisateur est l'acheteur
-        queryset = Order.objects.filter(user=self.request.user)
+        queryset = for_order_serializer(Order.objects.filter(user=self.request.user))
         # ... (filtres existants)
         return queryset
 
@@ -817,6 +696,7 @@ class SellerOrdersViewSet(viewsets.ReadOnlyModelViewSet):
     """Commandes des produits du vendeur"""
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -826,9 +706,9 @@ class SellerOrdersViewSet(viewsets.ReadOnlyModelViewSet):
             return Order.objects.none()
         
         # Filtrer les commandes qui contiennent ses produits
-        queryset = Order.objects.filter(
+        queryset = for_order_serializer(Order.objects.filter(
             items__listing__user=user
-        ).distinct()
+        ).distinct())
         
         # Appliquer les mêmes filtres
         status = self.request.query_params.get('status')
@@ -909,53 +789,33 @@ def admin_time_series_stats(request):
     period = request.GET.get('period', 'day')  # day, week, month
     days = int(request.GET.get('days', 30))
     
-    # Sélectionner la fonction de troncation
-    if period == 'week':
-        trunc_func = TruncWeek
-    elif period == 'month':
-        trunc_func = TruncMonth
-    else:
-        trunc_func = TruncDay
+    if period not in ('day', 'week', 'month'):
+        period = 'day'
     
-    # Calculer la date de début
-    end_date = timezone.now()
+    # Calculer la date de début (dates locales)
+    end_date = timezone.localdate()
     start_date = end_date - timedelta(days=days)
     
-    # Agréger par période
-    time_series = Order.objects.filter(
-        created_at__gte=start_date
-    ).annotate(
-        period=trunc_func('created_at')
-    ).values('period').annotate(
-        order_count=Count('id'),
-        total_revenue=Sum('total_price'),
-        avg_order_value=Avg('total_price'),
-        unique_customers=Count('user', distinct=True)
-    ).order_by('period')
-    
-    # Formater les données
-    formatted_data = []
-    for data in time_series:
-        formatted_data.append({
-            'period': data['period'].strftime('%Y-%m-%d'),
-            'orders': data['order_count'],
-            'revenue': float(data['total_revenue'] or 0),
-            'avg_order_value': float(data['avg_order_value'] or 0),
-            'unique_customers': data['unique_customers']
-        })
+    # Agréger par période : une requête groupée, périodes vides à zéro
+    result = time_series(
+        Order.objects.all(), start_date, end_date, granularity=period,
+        metrics=['orders', 'revenue', 'avg_order_value', 'unique_customers']
+    )
     
     return Response({
         'period': period,
         'days': days,
         'start_date': start_date.strftime('%Y-%m-%d'),
         'end_date': end_date.strftime('%Y-%m-%d'),
-        'data': formatted_data
+        'data': result.points(label='period'),
+        'chart': result.as_chart(),
     })
 
 # Dans commandes/views.py - AJOUTER
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
+@cached_dashboard('admin_performance_metrics', depends_on=('orders',))
 def admin_performance_metrics(request):
     """Métriques de performance avancées"""
     
@@ -1020,6 +880,7 @@ def admin_performance_metrics(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
+@cached_dashboard('admin_geographic_analysis', depends_on=('orders',))
 def admin_geographic_analysis(request):
     """Analyse des commandes par région/pays"""
     
@@ -1070,6 +931,7 @@ def admin_geographic_analysis(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
+@cached_dashboard('admin_product_analysis', depends_on=('orders', 'listings'))
 def admin_product_analysis(request):
     """Analyse détaillée des produits"""
     
@@ -1186,6 +1048,7 @@ def admin_product_analysis(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
+@cached_dashboard('admin_alerts', depends_on=('orders', 'listings', 'reviews'))
 def admin_alerts(request):
     """Alertes importantes pour l'admin"""
     
@@ -1264,6 +1127,7 @@ def admin_alerts(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
+@cached_dashboard('admin_comprehensive_dashboard', depends_on=('orders',))
 def admin_comprehensive_dashboard(request):
     """Dashboard complet avec toutes les métriques"""
     
@@ -1313,8 +1177,6 @@ def admin_all_orders(request):
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
     ordering = request.GET.get('ordering', '-created_at')
-    page = int(request.GET.get('page', 1))
-    page_size = int(request.GET.get('page_size', 20))
     
     # Construire le queryset
     orders = Order.objects.all().select_related(
@@ -1333,7 +1195,7 @@ def admin_all_orders(request):
             Q(user__email__icontains=search) |
             Q(user__first_name__icontains=search) |
             Q(user__last_name__icontains=search) |
-            Q(listing__title__icontains=search)
+            listing_search_q(search, prefix='listing__')
         )
     
     if date_from:
@@ -1345,19 +1207,18 @@ def admin_all_orders(request):
     # Ordonner
     orders = orders.order_by(ordering)
     
-    # Pagination
-    total_count = orders.count()
-    start = (page - 1) * page_size
-    end = start + page_size
-    paginated_orders = orders[start:end]
+    # Pagination par curseur (?page=N reste accepté)
+    paginator = KeysetPagination(page_size=20)
+    paginated_orders = paginator.paginate_queryset(orders, request)
     
     # Préparer les données
     orders_data = []
     for order in paginated_orders:
-        # Trouver la transaction associée
+        # Trouver la transaction associée (préchargée)
         transaction = None
-        if hasattr(order, 'transactions') and order.transactions.exists():
-            transaction_obj = order.transactions.first()
+        order_transactions = list(order.transactions.all())
+        if order_transactions:
+            transaction_obj = order_transactions[0]
             transaction = {
                 'id': transaction_obj.id,
                 'status': transaction_obj.status,
@@ -1399,12 +1260,7 @@ def admin_all_orders(request):
             'transaction': transaction
         })
     
-    return Response({
-        'count': total_count,
-        'next': f'{request.build_absolute_uri(request.path)}?page={page + 1}' if end < total_count else None,
-        'previous': f'{request.build_absolute_uri(request.path)}?page={page - 1}' if page > 1 else None,
-        'results': orders_data
-    })
+    return paginator.get_paginated_response(orders_data)
 
 # Dans commandes/views.py - AJOUTER
 @api_view(['GET'])
@@ -1471,8 +1327,7 @@ def admin_recent_orders(request):
             Q(user__email__icontains=search) |
             Q(user__first_name__icontains=search) |
             Q(user__last_name__icontains=search) |
-            Q(listing__title__icontains=search) |
-            Q(listing__description__icontains=search) |
+            listing_search_q(search, prefix='listing__') |
             Q(shipping_country__icontains=search) |
             Q(shipping_method__icontains=search)
         )
@@ -1,10 +1,12 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.decorators import action
 from .models import Discussion, Message
 from .serializers import DiscussionSerializer, MessageSerializer, CreateMessageSerializer, CreateDiscussionSerializer
 from users.models import User
 from django.db import models
+from e_sugu.pagination import KeysetPagination
 
 class DiscussionViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = DiscussionSerializer
@@ -36,6 +38,16 @@ class DiscussionViewSet(viewsets.ReadOnlyModelViewSet):
         context['request'] = self.request
         return context
 
+    @action(detail=True, methods=['get'])
+    def messages(self, request, pk=None):
+        """Messages d'une discussion, du plus récent au plus ancien, par curseur"""
+        discussion = self.get_object()
+        messages = discussion.messages.select_related('sender').order_by('-created_at')
+        paginator = KeysetPagination(page_size=50)
+        page = paginator.paginate_queryset(messages, request)
+        serializer = MessageSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
     def retrieve(self, request, *args, **kwargs):
         """Récupérer une discussion et marquer les messages comme lus"""
         instance = self.get_object()
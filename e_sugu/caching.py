@@ -0,0 +1,19 @@
+# e_sugu/caching.py
+"""
+Caractéristiques des backends de cache.
+
+Sans REDIS_URL, le cache par défaut est un LocMemCache : chaque processus
+(worker gunicorn, thread Celery...) a le sien. Ce qui y est écrit par un
+worker n'est pas vu des autres, ce qui compte pour les invalidations et les
+compteurs partagés.
+"""
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """True si le cache est commun à tous les processus (Redis, Memcached, base...)"""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
@@ -0,0 +1,224 @@
+# e_sugu/pagination.py
+"""
+Pagination par curseur (keyset) pour les listes volumineuses.
+
+La page suivante est lue avec WHERE (created_at, id) < (dernière valeur)
+au lieu d'un OFFSET : le coût d'une page ne dépend plus de sa profondeur.
+Le curseur est opaque et signé (django.core.signing).
+
+Le total est optionnel (`?count=exact|estimate|none`) : 'estimate' lit
+pg_class.reltuples (table entière) ou l'estimation du planificateur
+(EXPLAIN) au lieu d'un COUNT(*), sauf pour les petits résultats.
+
+Compatibilité : `?page=N` bascule sur la pagination par numéro de page
+(réponse identique à PageNumberPagination), de même que les querysets
+triés autrement que par un champ non nul (ex. rang de recherche).
+"""
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CURSOR_SALT = 'e_sugu.pagination.cursor'
+COUNT_MODES = ('exact', 'estimate', 'none')
+# En dessous, un COUNT(*) exact reste peu coûteux et plus juste que l'estimation
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimated_count(queryset):
+    """Nombre approximatif de lignes, sans COUNT(*) (PostgreSQL)"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            # -1 : table jamais analysée
+            if row and row[0] >= 0:
+                return row[0]
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+def keyset_ordering(queryset):
+    """
+    (champ, décroissant) si le queryset est trié par un seul champ non nul
+    (éventuellement suivi de l'id dans le même sens), sinon None
+    """
+    order_by = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+    if not order_by or len(order_by) > 2 or not all(isinstance(item, str) for item in order_by):
+        return None
+    descending = order_by[0].startswith('-')
+    name = order_by[0].lstrip('-')
+    if len(order_by) == 2 and (
+        order_by[1].lstrip('-') not in ('id', 'pk') or order_by[1].startswith('-') != descending
+    ):
+        return None
+    if name in ('id', 'pk'):
+        return 'pk', descending
+    try:
+        field = queryset.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if not field.concrete or field.null or field.is_relation:
+        return None
+    return name, descending
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def pagination_requested(request):
+    """Pour les endpoints qui renvoyaient une liste brute : paginer seulement sur demande"""
+    return any(
+        param in request.query_params
+        for param in (KeysetPagination.cursor_query_param, KeysetPagination.page_query_param,
+                      KeysetPagination.page_size_query_param)
+    )
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+    count_query_param = 'count'
+    count_mode = 'estimate'
+
+    def __init__(self, page_size=None, count_mode=None):
+        if page_size:
+            self.page_size = page_size
+        if count_mode:
+            self.count_mode = count_mode
+        self.page_paginator = None
+
+    def _page_paginator(self):
+        paginator = PageNumberPagination()
+        paginator.page_size = self.page_size
+        paginator.page_size_query_param = self.page_size_query_param
+        paginator.max_page_size = self.max_page_size
+        paginator.page_query_param = self.page_query_param
+        return paginator
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_count_mode(self, request):
+        mode = request.query_params.get(self.count_query_param, self.count_mode)
+        return mode if mode in COUNT_MODES else self.count_mode
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = signing.loads(encoded, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            raise NotFound('Curseur invalide')
+        # Curseur obtenu avec un autre tri
+        if cursor.get('f') != self.field:
+            raise NotFound('Curseur invalide')
+        return cursor
+
+    def encode_cursor(self, item, reverse=False):
+        payload = {
+            'f': self.field,
+            'v': _encode_value(getattr(item, self.field) if self.field != 'pk' else item.pk),
+            'pk': item.pk,
+            'r': reverse,
+        }
+        cursor = signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+        url = remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def _position_filter(self, cursor, after):
+        """Lignes après (ou avant) la position du curseur, dans l'ordre de tri"""
+        lookup = 'lt' if self.descending == after else 'gt'
+        if self.field == 'pk':
+            return Q(**{f'pk__{lookup}': cursor['pk']})
+        return Q(**{f'{self.field}__{lookup}': cursor['v']}) | Q(
+            **{self.field: cursor['v'], f'pk__{lookup}': cursor['pk']}
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = keyset_ordering(queryset)
+        if ordering is None or self.page_query_param in request.query_params:
+            self.page_paginator = self._page_paginator()
+            return self.page_paginator.paginate_queryset(queryset, request, view)
+
+        self.field, self.descending = ordering
+        self.base_url = request.build_absolute_uri()
+        self.count = None
+        mode = self.get_count_mode(request)
+        if mode == 'exact':
+            self.count = queryset.count()
+        elif mode == 'estimate':
+            self.count = estimated_count(queryset)
+            if self.count < EXACT_COUNT_THRESHOLD:
+                self.count = queryset.count()
+
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['r'])
+        sign = '-' if self.descending != reverse else ''
+        ordered = queryset.order_by(f'{sign}{self.field}', f'{sign}pk')
+        if cursor:
+            ordered = ordered.filter(self._position_filter(cursor, after=not reverse))
+
+        items = list(ordered[:page_size + 1])
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        if reverse:
+            items.reverse()
+
+        self.next_link = self.previous_link = None
+        if items:
+            if has_more or reverse:
+                self.next_link = self.encode_cursor(items[-1])
+            if (has_more and reverse) or (cursor and not reverse):
+                self.previous_link = self.encode_cursor(items[0], reverse=True)
+        return items
+
+    def get_paginated_response(self, data):
+        if self.page_paginator:
+            return self.page_paginator.get_paginated_response(data)
+        payload = OrderedDict()
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.next_link
+        payload['previous'] = self.previous_link
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return self._page_paginator().get_paginated_response_schema(schema)
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
     
     # Third-party apps
     'rest_framework',
@@ -113,6 +114,26 @@ DATABASES = {
     }
 }
 
+# Cache partagé entre les processus (Redis en production). Sans REDIS_URL,
+# cache mémoire local au processus (développement)
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'e_sugu',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'e_sugu',
+        }
+    }
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
@@ -168,8 +189,27 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
 'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
+    # Débits des endpoints sensibles (e_sugu/throttling.py) : '<scope>_<ip|email|phone>'
+    'DEFAULT_THROTTLE_RATES': {
+        'register_ip': config('THROTTLE_REGISTER_IP', default='10/hour'),
+        'register_email': '3/hour',
+        'register_phone': '3/hour',
+        'otp_ip': config('THROTTLE_OTP_IP', default='10/hour'),
+        'otp_email': '3/hour',
+        'password_reset_ip': config('THROTTLE_PASSWORD_RESET_IP', default='10/hour'),
+        'password_reset_email': '3/hour',
+        'password_reset_phone': '3/hour',
+        'login_ip': config('THROTTLE_LOGIN_IP', default='30/min'),
+        'login_email': '10/min',
+        'listing_view_ip': config('THROTTLE_LISTING_VIEW_IP', default='120/min'),
+    },
 }
 
+# Compteurs de limitation : 'sliding' (fenêtre glissante) ou 'fixed' (fenêtre fixe),
+# dans l'alias de cache THROTTLE_CACHE (partagé entre les processus via Redis)
+THROTTLE_ALGORITHM = config('THROTTLE_ALGORITHM', default='sliding')
+THROTTLE_CACHE = config('THROTTLE_CACHE', default='default')
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -256,9 +296,42 @@ STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY')
 STRIPE_CURRENCY = 'xof'
 STRIPE_CONNECT_ENABLED = True
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
+# Durée de blocage du stock pendant un paiement (secondes), voir expire_stock_reservations
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=900, cast=int)
+# Traitement des webhooks Stripe enregistrés : 'async' (thread après l'acquittement), 'sync' ou 'off' (commande process_stripe_events uniquement)
+STRIPE_EVENT_PROCESSING = config('STRIPE_EVENT_PROCESSING', default='async')
+# Client HTTP Stripe (payments/services/stripe_client.py) : pool keep-alive, délais bornés, disjoncteur
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='')  # ex. http://localhost:12111 pour stripe-mock
+STRIPE_HTTP_POOL_SIZE = config('STRIPE_HTTP_POOL_SIZE', default=10, cast=int)
+STRIPE_CONNECT_TIMEOUT = config('STRIPE_CONNECT_TIMEOUT', default=3, cast=float)
+STRIPE_READ_TIMEOUT = config('STRIPE_READ_TIMEOUT', default=15, cast=float)
+STRIPE_MAX_NETWORK_RETRIES = config('STRIPE_MAX_NETWORK_RETRIES', default=2, cast=int)
+STRIPE_CIRCUIT_THRESHOLD = config('STRIPE_CIRCUIT_THRESHOLD', default=5, cast=int)
+STRIPE_CIRCUIT_COOLDOWN = config('STRIPE_CIRCUIT_COOLDOWN', default=30, cast=int)
+# Versements vendeurs (settle_payouts) : rétention avant versement (jours) et workers parallèles
+PAYOUT_SETTLEMENT_DELAY_DAYS = config('PAYOUT_SETTLEMENT_DELAY_DAYS', default=7, cast=int)
+PAYOUT_WORKERS = config('PAYOUT_WORKERS', default=4, cast=int)
 STRIPE_SECRET_KEY="sk_test_51RGQ0tQPiTasEOUobtCvldqqCKe78sXdNvArOctS3wHqTEeQKuPQ0UynqnfYBfxjg8fmuFmAoE8zkVh8SpTwn0PP009nI7LbE9"
 STRIPE_PUBLISHABLE_KEY="pk_test_51RGQ0tQPiTasEOUoLzfyMSAFUH9UTCSSnna0ubGD8BvpMdx0iEMWFQvAwaTG9BklzfABbaoJK23bRn5cIhuLd0eo00UJ7az9t9"
 
+# Suivi des vues d'annonces : 'buffered' (tampon + écriture par lots) ou 'sync' (écriture immédiate).
+# Le tampon doit être partagé par tous les processus : 'buffered' seulement avec Redis
+LISTING_VIEW_TRACKING_MODE = config('LISTING_VIEW_TRACKING_MODE', default='buffered' if REDIS_URL else 'sync')
+LISTING_VIEW_FLUSH_INTERVAL = config('LISTING_VIEW_FLUSH_INTERVAL', default=10, cast=int)  # secondes
+
+# Cache des dashboards admin/vendeur (secondes) : durée de fraîcheur, puis
+# durée pendant laquelle l'ancienne valeur est servie pendant le recalcul
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=60, cast=int)
+DASHBOARD_CACHE_STALE_TTL = config('DASHBOARD_CACHE_STALE_TTL', default=300, cast=int)
+
+# Rotation des annonces à la une : durée de vie d'un ordre aléatoire (secondes)
+FEATURED_ROTATION_TTL = config('FEATURED_ROTATION_TTL', default=900, cast=int)
+
+# Miniatures des images d'annonces : 'async' (pool de threads après l'upload), 'sync' ou 'off'
+LISTING_IMAGE_DERIVATIVES = config('LISTING_IMAGE_DERIVATIVES', default='async')
+IMAGE_DERIVATIVE_WORKERS = config('IMAGE_DERIVATIVE_WORKERS', default=2, cast=int)
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1024)
+
 # Agora (Live Streaming)
 AGORA_APP_ID = config('AGORA_APP_ID', default='')
 AGORA_APP_CERTIFICATE = config('AGORA_APP_CERTIFICATE', default='')
@@ -0,0 +1,180 @@
+# e_sugu/throttling.py
+"""
+Limitation de débit des endpoints exposés aux abus (OTP, connexion, vues).
+
+Les compteurs sont partagés dans le cache Django (Redis en production) et
+incrémentés atomiquement (add + incr) : pas de liste d'horodatages relue et
+réécrite à chaque requête comme SimpleRateThrottle. Deux algorithmes
+(THROTTLE_ALGORITHM) :
+- 'fixed'   : un compteur par fenêtre ; jusqu'à 2× le débit autour d'une frontière ;
+- 'sliding' : fenêtre glissante estimée à partir du compteur courant et de la
+              part restante du précédent (toujours deux clés, O(1)).
+
+Sans Redis, THROTTLE_CACHE désigne un LocMemCache propre à chaque processus :
+chaque worker compte de son côté et les limites sont multipliées par leur
+nombre. `check_throttle_cache` le signale (python manage.py check) hors DEBUG.
+
+Chaque vue déclare `throttle_scope` ; chaque classe ajoute sa dimension et
+lit le débit '<scope>_ip', '<scope>_email' ou '<scope>_phone' dans
+DEFAULT_THROTTLE_RATES. Une dimension sans débit n'est pas limitée.
+Les throttles passent dans APIView.initial(), avant le handler : une requête
+refusée ne fait ni requête SQL, ni hachage de mot de passe, ni envoi d'email.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from e_sugu.caching import is_shared
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'5/min' -> (5, 60)"""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+def get_cache():
+    return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+
+def check_throttle_cache(app_configs=None, **kwargs):
+    """Avertir si les compteurs ne sont pas partagés entre les processus (hors DEBUG)"""
+    alias = getattr(settings, 'THROTTLE_CACHE', 'default')
+    if settings.DEBUG or is_shared(alias):
+        return []
+    return [checks.Warning(
+        f"Le cache '{alias}' des limitations de débit est local à chaque processus : "
+        "les limites sont multipliées par le nombre de workers.",
+        hint="Définir REDIS_URL, ou THROTTLE_CACHE vers un cache partagé.",
+        id='e_sugu.W001',
+    )]
+
+
+def _hit(cache, key, timeout):
+    """Incrémenter un compteur, créé à 0 s'il n'existe pas (ou vient d'expirer)"""
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout)
+        return 1
+
+
+def fixed_window(cache, key, limit, duration, now):
+    """(autorisée, attente en secondes)"""
+    elapsed = now % duration
+    count = _hit(cache, f"{key}:{int(now // duration)}", duration)
+    return count <= limit, duration - elapsed
+
+
+def sliding_window(cache, key, limit, duration, now):
+    """(autorisée, attente en secondes) ; la fenêtre précédente pèse pour sa part restante"""
+    window = int(now // duration)
+    count = _hit(cache, f"{key}:{window}", duration * 2)
+    previous = cache.get(f"{key}:{window - 1}") or 0
+    elapsed = (now % duration) / duration
+    if previous * (1 - elapsed) + count <= limit:
+        return True, 0
+    # Prochaine requête acceptée : dans cette fenêtre quand la part de la précédente a assez décru...
+    if count < limit:
+        return False, duration * (1 - (limit - count - 1) / previous - elapsed)
+    # ... sinon quand la fenêtre courante est devenue la précédente
+    return False, duration * (2 - elapsed - (limit - 1) / count)
+
+
+ALGORITHMS = {'fixed': fixed_window, 'sliding': sliding_window}
+
+
+class CacheRateThrottle(BaseThrottle):
+    """Base : un compteur par (scope, dimension, identifiant) dans le cache partagé"""
+    dimension = None
+    scope = None  # sinon `throttle_scope` de la vue
+    timer = time.time
+
+    def get_identity(self, request):
+        """Identifiant à limiter ; None : pas de limitation pour cette requête"""
+        return None
+
+    def allow_request(self, request, view):
+        scope = self.scope or getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f"{scope}_{self.dimension}")
+        identity = self.get_identity(request) if rate else None
+        if not identity:
+            return True
+
+        limit, duration = parse_rate(rate)
+        digest = hashlib.sha1(identity.encode()).hexdigest()[:20]
+        key = f"throttle:{scope}:{self.dimension}:{digest}"
+        algorithm = ALGORITHMS[getattr(settings, 'THROTTLE_ALGORITHM', 'sliding')]
+        try:
+            allowed, self.wait_seconds = algorithm(get_cache(), key, limit, duration, self.timer())
+        except Exception as e:
+            # Cache indisponible : ne pas bloquer la connexion de tout le monde
+            logger.error(f"❌ Limitation {scope}_{self.dimension} ignorée, cache indisponible: {e}")
+            return True
+        if not allowed:
+            logger.warning(f"🚫 Limite {scope}_{self.dimension} atteinte ({rate})")
+        return allowed
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+def _field(request, *names):
+    data = request.data if hasattr(request.data, 'get') else {}
+    for name in names:
+        value = data.get(name)
+        if value and isinstance(value, str):
+            return value.strip()
+    return None
+
+
+class IPRateThrottle(CacheRateThrottle):
+    """Par adresse IP (X-Forwarded-For selon NUM_PROXIES, comme DRF)"""
+    dimension = 'ip'
+
+    def get_identity(self, request):
+        return self.get_ident(request)
+
+
+class EmailRateThrottle(CacheRateThrottle):
+    """Par email du corps de la requête ('email', ou 'identifier' s'il contient '@')"""
+    dimension = 'email'
+
+    def get_identity(self, request):
+        email = _field(request, 'email')
+        if not email:
+            identifier = _field(request, 'identifier')
+            email = identifier if identifier and '@' in identifier else None
+        return email.lower() if email else None
+
+
+class PhoneRateThrottle(CacheRateThrottle):
+    """Par numéro ('phone_full', 'identifier' en +..., ou indicatif + 'phone'), chiffres seuls"""
+    dimension = 'phone'
+
+    def get_identity(self, request):
+        phone = _field(request, 'phone_full')
+        if not phone:
+            identifier = _field(request, 'identifier')
+            phone = identifier if identifier and identifier.startswith('+') else None
+        if not phone and _field(request, 'phone'):
+            phone = (_field(request, 'country_code') or '') + _field(request, 'phone')
+        digits = ''.join(char for char in phone or '' if char.isdigit())
+        return digits or None
+
+
+class ListingViewRateThrottle(IPRateThrottle):
+    """track_listing_view est une vue fonction : le scope est porté par la classe"""
+    scope = 'listing_view'
@@ -0,0 +1,45 @@
+# e_sugu/workers.py
+"""
+Exécution de tâches dans des threads (miniatures, webhooks, exports, versements).
+
+Un thread a sa propre connexion à la base : `run_in_worker` la ferme à la
+fin de la tâche, sinon elle resterait ouverte jusqu'à l'arrêt du processus.
+Les pools nommés de `get_executor` sont créés au premier usage et partagés
+par tout le processus.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, connection
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def run_in_worker(func, *args, **kwargs):
+    """Appeler func depuis un thread de travail, puis fermer la connexion du thread"""
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        connection.close()
+
+
+def get_executor(name, max_workers=1):
+    """Pool de threads `name` du processus ; max_workers ne compte qu'à sa création"""
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        return _executors[name]
+
+
+def submit(name, func, *args, max_workers=1):
+    """Exécuter func(*args) dans le pool `name`"""
+    return get_executor(name, max_workers).submit(run_in_worker, func, *args)
+
+
+def start_thread(func, *args, **kwargs):
+    """Exécuter func dans un thread dédié (daemon), pour une tâche longue et isolée"""
+    thread = threading.Thread(target=run_in_worker, args=(func, *args), kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
@@ -1,7 +1,7 @@
 # events/serializers.py
 from rest_framework import serializers
 from .models import Event, EventListing, EventMessage
-from listings.serializers import ListingSerializer
+from listings.serializers import ListingSerializer, ListingCardSerializer, card_view_requested
 from users.serializers import UserProfileSerializer
 
 class EventListingSerializer(serializers.ModelSerializer):
@@ -11,6 +11,16 @@ class EventListingSerializer(serializers.ModelSerializer):
         model = EventListing
         fields = ['id', 'listing', 'special_offer']
 
+    def to_representation(self, instance):
+        if not card_view_requested(self.context.get('request')):
+            return super().to_representation(instance)
+        # `?view=card` : annonce compacte, voir ListingCardSerializer
+        return {
+            'id': instance.pk,
+            'listing': ListingCardSerializer(context=self.context).to_representation(instance.listing),
+            'special_offer': str(instance.special_offer) if instance.special_offer is not None else None,
+        }
+
 class EventMessageSerializer(serializers.ModelSerializer):
     sender = UserProfileSerializer(read_only=True)
 
@@ -5,7 +5,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Event, EventListing, EventMessage
-from listings.models import Listing
+from django.db.models import Prefetch
+from listings.models import Listing, listing_cards_prefetch
+from listings.serializers import card_view_requested
 from .serializers import EventSerializer, CreateEventSerializer, EventMessageSerializer, CreateEventMessageSerializer
 
 class IsOwner(BasePermission):
@@ -13,7 +15,9 @@ class IsOwner(BasePermission):
         return obj.user == request.user
 
 class EventViewSet(viewsets.ModelViewSet):
-    queryset = Event.objects.all()
+    queryset = Event.objects.select_related('user').prefetch_related(
+        'event_listings', listing_cards_prefetch('event_listings__listing')
+    )
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
@@ -28,6 +32,15 @@ class EventViewSet(viewsets.ModelViewSet):
             except Listing.DoesNotExist:
                 pass
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if card_view_requested(self.request):
+            # Annonces des événements en mode carte : projection légère
+            return queryset.prefetch_related(None).prefetch_related(
+                'event_listings', Prefetch('event_listings__listing', queryset=Listing.objects.as_cards())
+            )
+        return queryset
+
     def get_serializer_class(self):
         if self.action == 'create':
             return CreateEventSerializer
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import FavoriteListing, FavoriteEvent
 from listings.models import Listing
-from listings.serializers import ListingSerializer
+from listings.serializers import ListingSerializer, ListingCardSerializer
 from events.models import Event
 from events.serializers import EventSerializer
 
@@ -25,6 +25,15 @@ class FavoriteListingSerializer(serializers.ModelSerializer):
         listing = Listing.objects.get(id=listing_id)
         return FavoriteListing.objects.create(user=self.context['request'].user, listing=listing)
 
+class FavoriteListingCardSerializer(serializers.BaseSerializer):
+    """Favori en mode carte (`?view=card`) : l'annonce est rendue par ListingCardSerializer"""
+
+    def to_representation(self, favorite):
+        return {
+            'id': favorite.pk,
+            'listing': ListingCardSerializer(context=self.context).to_representation(favorite.listing),
+        }
+
 class FavoriteEventSerializer(serializers.ModelSerializer):
     event = EventSerializer(read_only=True)
     event_id = serializers.IntegerField(write_only=True)
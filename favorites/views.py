@@ -3,8 +3,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import FavoriteListing, FavoriteEvent
-from .serializers import FavoriteListingSerializer, FavoriteEventSerializer
-from listings.models import Listing
+from django.db.models import Prefetch
+from .serializers import FavoriteListingSerializer, FavoriteListingCardSerializer, FavoriteEventSerializer
+from listings.models import Listing, listing_cards_prefetch
+from listings.serializers import card_view_requested
 from events.models import Event
 
 # ---------- FAVORIS D’ANNONCES ----------
@@ -12,8 +14,16 @@ class FavoriteListingListView(generics.ListAPIView):
     serializer_class = FavoriteListingSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_serializer_class(self):
+        if card_view_requested(self.request):
+            return FavoriteListingCardSerializer
+        return FavoriteListingSerializer
+
     def get_queryset(self):
-        return FavoriteListing.objects.filter(user=self.request.user)
+        favorites = FavoriteListing.objects.filter(user=self.request.user)
+        if card_view_requested(self.request):
+            return favorites.prefetch_related(Prefetch('listing', queryset=Listing.objects.as_cards()))
+        return favorites.select_related('user').prefetch_related(listing_cards_prefetch('listing'))
 
 
 class AddFavoriteListingView(APIView):
@@ -65,7 +75,9 @@ class FavoriteEventListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return FavoriteEvent.objects.filter(user=self.request.user)
+        return FavoriteEvent.objects.filter(user=self.request.user).select_related('event__user').prefetch_related(
+            'event__event_listings', listing_cards_prefetch('event__event_listings__listing')
+        )
 
 
 class AddFavoriteEventView(APIView):
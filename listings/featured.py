@@ -0,0 +1,129 @@
+# listings/featured.py
+"""
+Rotation des annonces à la une.
+
+Au lieu d'un ORDER BY RANDOM() sur tout l'ensemble à chaque appel, les ids
+des annonces à la une sont mélangés une fois avec une graine (seed) et
+gardés dans le cache. Une page coûte alors une requête `WHERE id IN (...)`
+de la taille de la page.
+
+La graine est renvoyée dans la réponse (`rotation`) et reprise dans les
+liens next/previous : toutes les pages d'une même rotation suivent le même
+ordre, sans doublon ni trou. La rotation est régénérée à l'expiration
+(FEATURED_ROTATION_TTL), par la commande `rotate_featured_listings`, ou
+quand l'ensemble des annonces à la une change (signaux de listings).
+"""
+import random
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+ROTATION_KEY = 'listings:featured:rotation'
+# Paramètres qui ne filtrent pas l'ensemble : la rotation globale s'applique telle quelle
+PAGING_PARAMS = {'page', 'page_size', 'rotation', 'view', 'count'}
+
+
+def rotation_ttl():
+    return getattr(settings, 'FEATURED_ROTATION_TTL', 900)
+
+
+def featured_ids():
+    from .models import Listing
+
+    return list(Listing.objects.filter(status='active', is_featured=True).values_list('id', flat=True))
+
+
+def _mix(seed, pk):
+    """Hachage 64 bits (splitmix64) de (graine, id)"""
+    value = (seed * 0x9E3779B97F4A7C15 + pk) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
+
+
+def shuffled(ids, seed):
+    """
+    Ordre d'une rotation : tri par hachage (graine, id). Retirer ou ajouter
+    une annonce ne déplace pas les autres les unes par rapport aux autres.
+    """
+    return sorted(ids, key=lambda pk: _mix(seed, pk))
+
+
+def rotate():
+    """Nouvelle graine et nouvel ordre ; retourne la rotation mise en cache"""
+    seed = random.SystemRandom().randrange(1, 2 ** 31)
+    rotation = {'seed': seed, 'ids': shuffled(featured_ids(), seed)}
+    cache.set(ROTATION_KEY, rotation, rotation_ttl())
+    return rotation
+
+
+def invalidate():
+    cache.delete(ROTATION_KEY)
+
+
+def get_rotation(seed=None):
+    """
+    Rotation courante, ou celle de `seed` (pages suivantes d'une rotation
+    déjà expirée : même ordre relatif, recalculé sur les ids courants)
+    """
+    rotation = cache.get(ROTATION_KEY) or rotate()
+    if seed is None or seed == rotation['seed']:
+        return rotation
+    return {'seed': seed, 'ids': shuffled(rotation['ids'], seed)}
+
+
+class FeaturedRotationPagination(BasePagination):
+    """Pagination par numéro de page sur l'ordre d'une rotation"""
+    page_size = 40
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    page_query_param = 'page'
+    rotation_query_param = 'rotation'
+
+    def _int_param(self, request, name, default=None):
+        try:
+            return int(request.query_params[name])
+        except (KeyError, ValueError):
+            return default
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = max(1, min(self._int_param(request, self.page_size_query_param, self.page_size),
+                               self.max_page_size))
+        self.page = max(1, self._int_param(request, self.page_query_param, 1))
+        rotation = get_rotation(self._int_param(request, self.rotation_query_param))
+        self.seed = rotation['seed']
+
+        ids = rotation['ids']
+        if set(request.query_params) - PAGING_PARAMS:
+            # Requête filtrée (catégorie, prix...) : garder l'ordre, restreint aux ids retenus
+            allowed = set(queryset.values_list('pk', flat=True))
+            ids = [pk for pk in ids if pk in allowed]
+
+        self.count = len(ids)
+        start = (self.page - 1) * page_size
+        page_ids = ids[start:start + page_size]
+        self.has_next = start + page_size < self.count
+
+        # Une annonce retirée depuis la rotation (vendue, désactivée) est simplement absente de la page
+        found = {item.pk: item for item in queryset.filter(pk__in=page_ids).order_by()}
+        return [found[pk] for pk in page_ids if pk in found]
+
+    def page_link(self, number):
+        url = replace_query_param(self.request.build_absolute_uri(), self.rotation_query_param, self.seed)
+        if number == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, number)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('rotation', self.seed),
+            ('next', self.page_link(self.page + 1) if self.has_next else None),
+            ('previous', self.page_link(self.page - 1) if self.page > 1 else None),
+            ('results', data),
+        ]))
@@ -1,7 +1,7 @@
 # listings/filters.py
 import django_filters
 from .models import Listing
-from categories.models import Category
+from categories.cache import get_category_tree
 
 class ListingFilter(django_filters.FilterSet):
     price_min = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
@@ -19,19 +19,7 @@ class ListingFilter(django_filters.FilterSet):
     
     def filter_category(self, queryset, name, value):
         """
-        Filtre les annonces dont la catégorie est `value` ou une sous-catégorie de `value`.
+        Filtre les annonces dont la catégorie est `value` ou une sous-catégorie de `value` (tous niveaux).
         """
-        try:
-            # Récupérer la catégorie principale par nom (insensible à la casse)
-            category = Category.objects.get(name__iexact=value)
-        except Category.DoesNotExist:
-            return queryset.none()
-
-        # Récupérer les sous-catégories de cette catégorie
-        subcategories = Category.objects.filter(parent=category)
-
-        # Liste des ids à filtrer : catégorie + sous-catégories
-        category_ids = [category.id] + list(subcategories.values_list('id', flat=True))
-
-        # Filtrer les annonces avec category dans cette liste
-        return queryset.filter(category_id__in=category_ids)
\ No newline at end of file
+        # Ids résolus depuis l'arbre en cache (insensible à la casse) ; aucune correspondance => aucun résultat
+        return queryset.filter(category_id__in=get_category_tree().descendant_ids_for_name(value))
\ No newline at end of file
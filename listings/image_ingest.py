@@ -0,0 +1,84 @@
+# listings/image_ingest.py
+"""
+Ajout d'images en lot à une annonce.
+
+Les fichiers reçus sont décodés et validés (Pillow) puis écrits dans le
+stockage en parallèle dans un pool de threads ; les lignes Image sont
+créées en un seul bulk_create. Chaque fichier a son propre résultat :
+un fichier invalide n'empêche pas l'enregistrement des autres.
+
+bulk_create n'envoie pas post_save : les miniatures sont planifiées ici
+(voir listings/thumbnails.py).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image as PILImage, UnidentifiedImageError
+
+from . import thumbnails
+from .models import Image
+
+MAX_FILES = 10
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 Mo
+MAX_PIXELS = 40_000_000
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+WORKERS = 4
+
+
+def validate_image(upload):
+    """Liste des erreurs du fichier (vide si l'image est valide)"""
+    if upload.size > MAX_FILE_SIZE:
+        return [f"Fichier trop volumineux (max. {MAX_FILE_SIZE // (1024 * 1024)} Mo)."]
+    try:
+        upload.seek(0)
+        with PILImage.open(upload) as picture:
+            if picture.format not in ALLOWED_FORMATS:
+                return [f"Format non pris en charge : {picture.format}."]
+            if picture.width * picture.height > MAX_PIXELS:
+                return [f"Image trop grande ({picture.width}x{picture.height})."]
+            # Décodage complet : détecte les fichiers tronqués ou corrompus
+            picture.load()
+    except (UnidentifiedImageError, OSError, PILImage.DecompressionBombError):
+        return ["Fichier image invalide ou corrompu."]
+    finally:
+        upload.seek(0)
+    return []
+
+
+def _store(listing, upload):
+    """Écrire le fichier dans le stockage de Image.image ; retourne son chemin"""
+    field = Image._meta.get_field('image')
+    name = field.generate_filename(Image(listing=listing), os.path.basename(upload.name))
+    return field.storage.save(name, upload, max_length=field.max_length)
+
+
+def store_images(listing, uploads):
+    """Enregistrer des fichiers déjà validés : écriture parallèle puis un seul INSERT"""
+    if not uploads:
+        return []
+    with ThreadPoolExecutor(max_workers=min(WORKERS, len(uploads))) as pool:
+        names = list(pool.map(lambda upload: _store(listing, upload), uploads))
+    images = Image.objects.bulk_create([Image(listing=listing, image=name) for name in names])
+    for image in images:
+        thumbnails.schedule(image.pk)
+    return images
+
+
+def ingest_images(listing, uploads):
+    """
+    Valider (en parallèle) puis enregistrer les fichiers valides.
+    Retourne (images créées, résultats par fichier dans l'ordre d'envoi).
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(WORKERS, len(uploads)))) as pool:
+        errors = list(pool.map(validate_image, uploads))
+
+    images = store_images(listing, [upload for upload, upload_errors in zip(uploads, errors) if not upload_errors])
+    created = iter(images)
+
+    results = []
+    for index, (upload, upload_errors) in enumerate(zip(uploads, errors)):
+        if upload_errors:
+            results.append({'index': index, 'name': upload.name, 'status': 'error', 'errors': upload_errors})
+        else:
+            results.append({'index': index, 'name': upload.name, 'status': 'created', 'id': next(created).pk})
+    return images, results
@@ -0,0 +1,103 @@
+# listings/management/commands/benchmark_listing_cards.py
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from categories.models import Category
+from listings.models import Image, Listing
+from listings.serializers import ListingCardSerializer, ListingSerializer
+from users.models import User
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Comparer le débit de sérialisation de ListingSerializer et de ListingCardSerializer (?view=card)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=2000, help="Nombre d'annonces synthétiques")
+        parser.add_argument('--images', type=int, default=4, help="Images par annonce")
+        parser.add_argument('--runs', type=int, default=30, help='Nombre de pages sérialisées par variante')
+        parser.add_argument('--page-size', type=int, default=40)
+
+    def handle(self, *args, **options):
+        # Tout est fait dans une transaction annulée à la fin : aucune donnée n'est conservée
+        try:
+            with transaction.atomic():
+                self._seed(options['listings'], options['images'])
+                self._run(options['runs'], options['page_size'])
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write('🧹 Données synthétiques supprimées (rollback)')
+
+    def _seed(self, count, images):
+        self.stdout.write(f'🚀 Création de {count} annonces synthétiques ({images} images chacune)...')
+        user = User.objects.create_user(
+            email='benchmark-cards@example.com',
+            password='benchmark-pass-123',
+            first_name='Bench',
+            last_name='Cards',
+            phone='70000000',
+        )
+        parent = Category.objects.create(name='Benchmark cartes')
+        category = Category.objects.create(name='Benchmark cartes - enfant', parent=parent)
+
+        listings = Listing.objects.bulk_create([
+            Listing(
+                user=user,
+                category=category,
+                title=f'Annonce {i}',
+                description='Description détaillée du produit. ' * 20,
+                location='Bamako',
+                price=1000 + i,
+                condition='new',
+                quantity=10,
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        Image.objects.bulk_create([
+            Image(listing=listing, image=f'listings/benchmark/{listing.pk}-{n}.jpg')
+            for listing in listings
+            for n in range(images)
+        ], batch_size=5000)
+        self.listing_ids = [listing.pk for listing in listings]
+
+    def _variants(self):
+        base = Listing.objects.filter(pk__in=self.listing_ids).order_by('-created_at', '-pk')
+        return [
+            ('ListingSerializer', base.for_listing_cards(), ListingSerializer),
+            ('ListingCardSerializer', base.as_cards(), ListingCardSerializer),
+        ]
+
+    def _run(self, runs, page_size):
+        request = Request(APIRequestFactory().get('/api/listings/listings/'))
+        context = {'request': request}
+        pages = max(1, len(self.listing_ids) // page_size)
+
+        self.stdout.write(
+            f"{'Sérialiseur':<24} {'total p50 (ms)':>15} {'sérial. p50 (ms)':>17} {'annonces/s':>12} {'octets/page':>12}"
+        )
+        for label, queryset, serializer_class in self._variants():
+            totals, serialization, sizes = [], [], []
+            for i in range(runs):
+                offset = (i % pages) * page_size
+                start = time.perf_counter()
+                page = list(queryset[offset:offset + page_size])
+                fetched = time.perf_counter()
+                data = serializer_class(page, many=True, context=context).data
+                done = time.perf_counter()
+                totals.append((done - start) * 1000)
+                serialization.append((done - fetched) * 1000)
+                sizes.append(len(repr(data)))
+
+            throughput = page_size / (statistics.median(serialization) / 1000)
+            self.stdout.write(
+                f'{label:<24} {statistics.median(totals):>15.2f} {statistics.median(serialization):>17.2f} '
+                f'{throughput:>12.0f} {statistics.median(sizes):>12.0f}'
+            )
@@ -0,0 +1,109 @@
+# listings/management/commands/benchmark_search.py
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework import filters
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+
+from categories.models import Category
+from listings.models import Listing
+from listings.search import LISTING_SEARCH_VECTOR, ListingSearchFilter
+from users.models import User
+
+WORDS = [
+    'villa', 'maison', 'appartement', 'voiture', 'toyota', 'mercedes', 'moto', 'yamaha',
+    'téléphone', 'ordinateur', 'portable', 'chaussures', 'robe', 'jouets', 'enfant',
+    'terrain', 'bureau', 'climatiseur', 'réfrigérateur', 'télévision', 'piscine',
+    'meublé', 'neuf', 'occasion', 'garantie', 'livraison', 'rapide', 'bamako', 'kati',
+]
+LOCATIONS = ['Bamako', 'Kati', 'Ségou', 'Sikasso', 'Mopti', 'Kayes', 'Koulikoro', 'Gao']
+QUERIES = ['villa', 'toyota', 'maison piscine', 'ordinateur portable', 'bamako', 'jouets enfant', 'mercedes neuf']
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Comparer les latences p50/p95 de SearchFilter (ILIKE) et de la recherche plein texte"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=100000, help="Nombre d'annonces synthétiques")
+        parser.add_argument('--runs', type=int, default=50, help='Nombre de requêtes par recherche')
+        parser.add_argument('--page-size', type=int, default=40)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Le benchmark nécessite PostgreSQL.')
+
+        # Tout est fait dans une transaction annulée à la fin : aucune donnée n'est conservée
+        try:
+            with transaction.atomic():
+                self._seed(options['listings'])
+                self._run(options['runs'], options['page_size'])
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write('🧹 Données synthétiques supprimées (rollback)')
+
+    def _seed(self, count):
+        self.stdout.write(f'🚀 Création de {count} annonces synthétiques...')
+        rng = random.Random(42)
+        user = User.objects.create_user(
+            email='benchmark-search@example.com',
+            password='benchmark-pass-123',
+            first_name='Bench',
+            last_name='Search',
+            phone='70000000',
+        )
+        category = Category.objects.create(name='Benchmark recherche')
+
+        batch = []
+        for i in range(count):
+            batch.append(Listing(
+                user=user,
+                category=category,
+                title=' '.join(rng.sample(WORDS, 4)),
+                description=' '.join(rng.choices(WORDS, k=40)),
+                location=rng.choice(LOCATIONS),
+                price=rng.randint(1000, 5000000),
+                condition=rng.choice(['new', 'used']),
+            ))
+            if len(batch) == 5000:
+                Listing.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Listing.objects.bulk_create(batch)
+
+        # bulk_create ne déclenche pas les signaux : calculer les vecteurs en une passe
+        Listing.objects.filter(user=user).update(search_vector=LISTING_SEARCH_VECTOR)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE listings_listing')
+
+    def _run(self, runs, page_size):
+        factory = APIRequestFactory()
+        view = type('BenchView', (), {
+            'search_fields': ['title', 'description', 'location'],
+            'ordering_param': 'ordering',
+        })()
+        backends = [
+            ('SearchFilter (ILIKE)', filters.SearchFilter()),
+            ('ListingSearchFilter (tsvector)', ListingSearchFilter()),
+        ]
+
+        self.stdout.write(f"{'Backend':<32} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+        for label, backend in backends:
+            timings = []
+            for i in range(runs):
+                term = QUERIES[i % len(QUERIES)]
+                request = Request(factory.get('/api/listings/', {'search': term}))
+                queryset = backend.filter_queryset(request, Listing.objects.filter(status='active'), view)
+                start = time.perf_counter()
+                list(queryset[:page_size].values_list('id', flat=True))
+                timings.append((time.perf_counter() - start) * 1000)
+            p50 = statistics.median(timings)
+            p95 = statistics.quantiles(timings, n=20)[18]
+            self.stdout.write(f'{label:<32} {p50:>10.2f} {p95:>10.2f}')
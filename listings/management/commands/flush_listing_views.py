@@ -0,0 +1,38 @@
+# listings/management/commands/flush_listing_views.py
+import time
+
+from django.core.management.base import BaseCommand
+from listings.view_tracking import flush_view_buffer, flush_interval
+
+
+class Command(BaseCommand):
+    help = "Vider le tampon des vues d'annonces (une fois, ou en boucle avec --loop)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Tourner en continu (worker)')
+        parser.add_argument('--interval', type=int, default=None, help='Intervalle entre deux vidages (secondes)')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or flush_interval()
+
+        if not options['loop']:
+            self.stdout.write(f"✅ {self._flush_all()} vue(s) écrite(s)")
+            return
+
+        self.stdout.write(f"🔄 Vidage des vues toutes les {interval}s (Ctrl+C pour arrêter)")
+        try:
+            while True:
+                written = self._flush_all()
+                if written:
+                    self.stdout.write(f"✅ {written} vue(s) écrite(s)")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write(f"🛑 Arrêt - {self._flush_all()} vue(s) restante(s) écrite(s)")
+
+    def _flush_all(self):
+        total = 0
+        while True:
+            written = flush_view_buffer()
+            total += written
+            if not written:
+                return total
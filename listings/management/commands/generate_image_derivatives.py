@@ -0,0 +1,33 @@
+# listings/management/commands/generate_image_derivatives.py
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from e_sugu.workers import run_in_worker
+from listings.models import Image
+from listings.thumbnails import generate_for_image
+
+
+class Command(BaseCommand):
+    help = "Générer les miniatures manquantes des images d'annonces (rattrapage des médias existants)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Régénérer aussi les images qui ont déjà des miniatures')
+        parser.add_argument('--workers', type=int, default=4, help='Nombre de threads')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        images = Image.objects.order_by('pk')
+        if not options['force']:
+            images = images.filter(derivatives={})
+        image_ids = list(images.values_list('pk', flat=True))
+        self.stdout.write(f"🚀 {len(image_ids)} image(s) à traiter avec {options['workers']} thread(s)")
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for start in range(0, len(image_ids), options['batch_size']):
+                batch = image_ids[start:start + options['batch_size']]
+                done += sum(pool.map(lambda pk: run_in_worker(generate_for_image, pk, force=options['force']), batch))
+                self.stdout.write(f"   {min(start + len(batch), len(image_ids))}/{len(image_ids)}")
+
+        self.stdout.write(f"✅ Miniatures générées pour {done} image(s)")
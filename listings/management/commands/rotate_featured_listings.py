@@ -0,0 +1,11 @@
+# listings/management/commands/rotate_featured_listings.py
+from django.core.management.base import BaseCommand
+from listings import featured
+
+
+class Command(BaseCommand):
+    help = "Générer une nouvelle rotation des annonces à la une (à planifier, ex. cron toutes les 15 min)"
+
+    def handle(self, *args, **options):
+        rotation = featured.rotate()
+        self.stdout.write(f"✅ Rotation {rotation['seed']} : {len(rotation['ids'])} annonce(s) à la une")
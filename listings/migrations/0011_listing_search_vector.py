@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def populate_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Listing = apps.get_model('listings', 'Listing')
+    Listing.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='french')
+        + SearchVector('description', weight='B', config='french')
+        + SearchVector('location', weight='C', config='french')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_alter_category_name_alter_category_parent_and_more'),
+        ('listings', '0010_alter_listingview_session_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='listing_search_vector_gin'),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
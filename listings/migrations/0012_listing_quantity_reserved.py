@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0011_listing_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='quantity_reserved',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Quantité réservée'),
+        ),
+    ]
@@ -1,5 +1,10 @@
 # listings/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.lookups import LessThanOrEqual
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from users.models import User
@@ -7,6 +12,124 @@ from categories.models import Category
 import random
 from django.utils import timezone
 
+
+def stock_status(quantity, quantity_sold):
+    """
+    Statut dérivé dans le même UPDATE que le stock, selon la règle de
+    `update_status_based_on_quantity`. Les expressions reçues décrivent les
+    nouvelles valeurs de quantity / quantity_sold.
+    """
+    return Case(
+        When(LessThanOrEqual(quantity - quantity_sold, 0), then=Value('out_of_stock')),
+        When(status='out_of_stock', then=Value('active')),
+        default=F('status'),
+    )
+
+
+STOCK_FIELDS = ['quantity', 'quantity_sold', 'quantity_reserved', 'status', 'updated_at']
+
+# Colonnes lues par ListingCardSerializer (plus created_at / price pour le tri et le curseur)
+CARD_FIELDS = [
+    'id', 'title', 'price', 'location', 'status', 'is_featured', 'created_at',
+    'quantity', 'quantity_sold', 'quantity_reserved',
+]
+
+
+class ListingQuerySet(models.QuerySet):
+    """
+    Mises à jour atomiques du stock et des compteurs : un seul UPDATE
+    conditionnel, sans lecture préalable ni `save()` de toute la ligne.
+    Chaque méthode retourne le nombre d'annonces modifiées.
+    """
+
+    def sell(self, quantity=1):
+        """Vendre `quantity` unités, seulement si elles sont encore disponibles (hors réservations)"""
+        if quantity <= 0:
+            return 0
+        new_sold = F('quantity_sold') + quantity
+        return self.filter(quantity__gte=new_sold + F('quantity_reserved')).update(
+            quantity_sold=new_sold,
+            status=stock_status(F('quantity'), new_sold),
+            updated_at=timezone.now(),
+        )
+
+    def reserve(self, quantity=1):
+        """Bloquer `quantity` unités pendant un paiement, si elles sont disponibles"""
+        if quantity <= 0:
+            return 0
+        new_reserved = F('quantity_reserved') + quantity
+        return self.filter(quantity__gte=F('quantity_sold') + new_reserved).update(
+            quantity_reserved=new_reserved,
+        )
+
+    def unreserve(self, quantity=1):
+        """Libérer des unités bloquées (réservation expirée ou annulée)"""
+        return self.update(quantity_reserved=Greatest(F('quantity_reserved') - quantity, 0))
+
+    def sell_reserved(self, quantity=1):
+        """Transformer des unités bloquées en vente (le stock est déjà garanti)"""
+        new_sold = F('quantity_sold') + quantity
+        return self.filter(quantity_reserved__gte=quantity).update(
+            quantity_reserved=F('quantity_reserved') - quantity,
+            quantity_sold=new_sold,
+            status=stock_status(F('quantity'), new_sold),
+            updated_at=timezone.now(),
+        )
+
+    def release(self, quantity=1):
+        """Remettre en stock des unités vendues (annulation de commande)"""
+        new_sold = Greatest(F('quantity_sold') - quantity, 0)
+        return self.update(
+            quantity_sold=new_sold,
+            status=stock_status(F('quantity'), new_sold),
+            updated_at=timezone.now(),
+        )
+
+    def restock(self, quantity):
+        """Réapprovisionner le produit"""
+        new_quantity = F('quantity') + quantity
+        new_sold = Greatest(F('quantity_sold') - quantity, 0)
+        return self.update(
+            quantity=new_quantity,
+            quantity_sold=new_sold,
+            status=stock_status(new_quantity, new_sold),
+            updated_at=timezone.now(),
+        )
+
+    def add_views(self, views=1, unique_visitors=0):
+        """Incrémenter les compteurs de vues"""
+        return self.update(
+            views_count=F('views_count') + views,
+            unique_visitors=F('unique_visitors') + unique_visitors,
+            last_viewed=timezone.now(),
+        )
+
+    def for_listing_cards(self):
+        """
+        Relations lues par ListingSerializer (vendeur, catégorie et parent,
+        images triées) : 2 requêtes quel que soit le nombre d'annonces
+        """
+        return self.select_related('user', 'category__parent').prefetch_related(
+            models.Prefetch('images', queryset=Image.objects.order_by('created_at', 'id'))
+        )
+
+    def as_cards(self):
+        """
+        Projection des grilles du catalogue : colonnes de CARD_FIELDS, chemin
+        et miniatures de la première image (sous-requêtes), sans jointure ni prefetch
+        """
+        first_image = Image.objects.filter(listing=OuterRef('pk')).order_by('created_at', 'id')
+        return self.select_related(None).prefetch_related(None).only(*CARD_FIELDS).annotate(
+            first_image=Subquery(first_image.values('image')[:1]),
+            first_image_derivatives=Subquery(first_image.values('derivatives')[:1], output_field=models.JSONField()),
+        )
+
+
+def listing_cards_prefetch(lookup):
+    """Prefetch d'annonces imbriquées (panier, commande, favori...) prêtes pour ListingSerializer"""
+    return models.Prefetch(lookup, queryset=Listing.objects.for_listing_cards())
+
+
 class Listing(models.Model):
     TYPE_CHOICES = [
         ('sale', 'Vente'),
@@ -39,6 +162,8 @@ class Listing(models.Model):
 
     quantity = models.PositiveIntegerField('Quantité disponible', default=1)
     quantity_sold = models.PositiveIntegerField('Quantité vendue', default=0)
+    # Unités bloquées par des paiements en cours (voir payments.StockReservation)
+    quantity_reserved = models.PositiveIntegerField('Quantité réservée', default=0, editable=False)
 
     type = models.CharField(max_length=10, choices=TYPE_CHOICES, default='sale')
     condition = models.CharField(max_length=10, choices=CONDITION_CHOICES)
@@ -64,42 +189,70 @@ class Listing(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Vecteur plein texte (titre > description > localisation), maintenu par signal
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ListingQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Annonce'
         verbose_name_plural = 'Annonces'
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='listing_search_vector_gin'),
+        ]
 
     def __str__(self):
         return self.title
     @property
     def available_quantity(self):
-        """Quantité réellement disponible"""
-        return max(0, self.quantity - self.quantity_sold)
+        """Quantité réellement disponible (hors unités réservées par un paiement en cours)"""
+        return max(0, self.quantity - self.quantity_sold - self.quantity_reserved)
 
     @property
     def is_out_of_stock(self):
         """Vérifie si le produit est épuisé"""
         return self.available_quantity <= 0
 
+    @property
+    def is_sold_out(self):
+        """Tout le stock est vendu (les réservations en cours ne comptent pas)"""
+        return self.quantity_sold >= self.quantity
+
     def update_status_based_on_quantity(self):
         """Met à jour le statut en fonction de la quantité disponible"""
-        if self.available_quantity <= 0:
+        if self.is_sold_out:
             self.status = 'out_of_stock'
-        elif self.status == 'out_of_stock' and self.available_quantity > 0:
+        elif self.status == 'out_of_stock' and not self.is_sold_out:
             self.status = 'active'
         self.save()
 
     def mark_as_sold(self, quantity=1):
-        """Marquer une quantité comme vendue"""
-        if quantity <= self.available_quantity:
-            self.quantity_sold += quantity
-            self.save()
-            was_out_of_stock = self.is_out_of_stock
-            self.update_status_based_on_quantity()
-            if self.is_out_of_stock and not was_out_of_stock:
-                self.send_out_of_stock_notification()
-            return True
-        return False
+        """
+        Marquer une quantité comme vendue.
+        Retourne False si le stock ne suffit pas (pas de survente possible,
+        même avec des commandes simultanées).
+        """
+        with transaction.atomic():
+            if not Listing.objects.filter(pk=self.pk).sell(quantity):
+                return False
+            # La ligne reste verrouillée jusqu'au commit : on relit notre propre écriture
+            self.refresh_from_db(fields=STOCK_FIELDS)
+        # Le stock était disponible avant la vente : épuisé maintenant = transition
+        if self.is_sold_out:
+            self.send_out_of_stock_notification()
+        return True
+
+    def sell_reserved(self, quantity):
+        """Transformer une réservation en vente (confirmation de paiement)"""
+        with transaction.atomic():
+            if not Listing.objects.filter(pk=self.pk).sell_reserved(quantity):
+                return False
+            self.refresh_from_db(fields=STOCK_FIELDS)
+        if self.is_sold_out:
+            self.send_out_of_stock_notification()
+        return True
+
     def send_out_of_stock_notification(self):
         """Envoyer une notification d'épuisement de stock"""
         from notifications.models import Notification
@@ -134,9 +287,14 @@ class Listing(models.Model):
         self.save()
     def restock(self, new_quantity):
         """Réapprovisionner le produit"""
-        self.quantity_sold = max(0, self.quantity_sold - new_quantity)
-        self.quantity += new_quantity
-        self.update_status_based_on_quantity()
+        Listing.objects.filter(pk=self.pk).restock(new_quantity)
+        self.refresh_from_db(fields=STOCK_FIELDS)
+
+    def release_stock(self, quantity):
+        """Remettre en stock une quantité vendue (annulation)"""
+        Listing.objects.filter(pk=self.pk).release(quantity)
+        self.refresh_from_db(fields=STOCK_FIELDS)
+
     def clean(self):
         super().clean()
         if self.price > 99999999:
@@ -153,19 +311,17 @@ class Listing(models.Model):
     # Méthodes pour le suivi des vues
     def increment_views(self, user=None):
         """Incrémente le compteur de vues"""
-        self.views_count += 1
-        self.last_viewed = timezone.now()
-        
+        unique = 0
         # Si un utilisateur est fourni et que c'est un visiteur unique
         if user and user.is_authenticated:
-            # Vérifier si cette vue a déjà été comptabilisée pour cet utilisateur
-            view_key = f"listing_{self.id}_viewed_by_{user.id}"
+            # cache.add est atomique : une seule vue unique par utilisateur et par 24h
             from django.core.cache import cache
-            if not cache.get(view_key):
-                self.unique_visitors += 1
-                cache.set(view_key, True, 60*60*24)  # Cache pour 24h
-                
-        self.save()
+            view_key = f"listing_{self.id}_viewed_by_{user.id}"
+            if cache.add(view_key, True, 60*60*24):
+                unique = 1
+
+        Listing.objects.filter(pk=self.pk).add_views(1, unique)
+        self.refresh_from_db(fields=['views_count', 'unique_visitors', 'last_viewed'])
 
 class Image(models.Model):
     listing = models.ForeignKey(
@@ -174,6 +330,8 @@ class Image(models.Model):
         related_name='images'
     )
     image = models.ImageField(upload_to='listings/%Y/%m/%d/')
+    # Miniatures générées (voir listings/thumbnails.py) : {"320": {"webp": chemin, "jpeg": chemin}, ...}
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
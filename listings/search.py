@@ -0,0 +1,101 @@
+# listings/search.py
+"""
+Recherche plein texte des annonces (PostgreSQL tsvector + index GIN).
+
+La colonne `Listing.search_vector` est maintenue par le signal post_save
+(voir listings/signals.py) avec la configuration française et les poids
+titre (A) > description (B) > localisation (C).
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Q
+from rest_framework import filters
+
+SEARCH_CONFIG = 'french'
+
+# Champs qui alimentent le vecteur de recherche
+SEARCH_VECTOR_FIELDS = ('title', 'description', 'location')
+
+LISTING_SEARCH_VECTOR = (
+    SearchVector('title', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    + SearchVector('location', weight='C', config=SEARCH_CONFIG)
+)
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_search_backend_available():
+    """La recherche plein texte nécessite PostgreSQL"""
+    return connection.vendor == 'postgresql'
+
+
+def build_search_query(terms):
+    """
+    Construit une requête tsquery à partir de la saisie utilisateur.
+    Chaque mot est recherché en préfixe (`vil` trouve `villa`), ce qui convient
+    à la recherche au fil de la frappe du frontend.
+    """
+    words = _TERM_RE.findall(terms or '')
+    if not words:
+        return None
+    raw = ' & '.join(f"{word}:*" for word in words)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+def update_search_vector(listing_ids):
+    """Recalcule le vecteur de recherche pour les annonces données (un seul UPDATE)"""
+    from .models import Listing
+
+    if not is_search_backend_available():
+        return 0
+    return Listing.objects.filter(pk__in=listing_ids).update(search_vector=LISTING_SEARCH_VECTOR)
+
+
+def search_listings(queryset, terms):
+    """Filtre et classe un queryset d'annonces par pertinence"""
+    query = build_search_query(terms)
+    if query is None:
+        return queryset
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=SearchRank(F('search_vector'), query)
+    )
+
+
+def listing_search_q(terms, prefix=''):
+    """
+    Condition Q utilisant l'index GIN, pour les recherches qui traversent
+    une relation vers l'annonce (ex: prefix='listing__' depuis Order).
+    """
+    if is_search_backend_available():
+        query = build_search_query(terms)
+        if query is None:
+            return Q()
+        return Q(**{f'{prefix}search_vector': query})
+    return Q(**{f'{prefix}title__icontains': terms})
+
+
+class ListingSearchFilter(filters.SearchFilter):
+    """
+    Remplaçant de `SearchFilter` pour les annonces.
+    Utilise le paramètre `?search=` habituel ; les résultats sont classés par
+    pertinence sauf si un `?ordering=` explicite est fourni.
+    Hors PostgreSQL, retombe sur le comportement ILIKE de `SearchFilter`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not is_search_backend_available():
+            return super().filter_queryset(request, queryset, view)
+
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+
+        queryset = search_listings(queryset, terms)
+
+        ordering_param = getattr(view, 'ordering_param', None) or filters.OrderingFilter.ordering_param
+        if not request.query_params.get(ordering_param):
+            queryset = queryset.order_by('-search_rank', '-created_at')
+        return queryset
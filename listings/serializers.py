@@ -1,14 +1,37 @@
 # listings/serializers.py
 from rest_framework import serializers
 from .models import Listing, Image
+from . import thumbnails
+from .image_ingest import store_images
 from categories.models import Category
 from notifications.models import Notification 
 from commandes.models import Order
 
+def media_url(name, request=None):
+    """URL (absolue si la requête est connue) d'un fichier du stockage des images"""
+    if not name:
+        return None
+    url = Image._meta.get_field('image').storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
 class ImageSerializer(serializers.ModelSerializer):
+    thumbnail = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = Image
-        fields = ['id', 'image', 'created_at']
+        fields = ['id', 'image', 'thumbnail', 'srcset', 'created_at']
+
+    def get_thumbnail(self, obj):
+        return media_url(thumbnails.thumbnail(obj.derivatives), self.context.get('request'))
+
+    def get_srcset(self, obj):
+        # Vide tant que les miniatures ne sont pas générées : utiliser `image`
+        if not obj.derivatives:
+            return {}
+        request = self.context.get('request')
+        return thumbnails.srcset(obj.derivatives, lambda name: media_url(name, request))
 
 class ListingSerializer(serializers.ModelSerializer):
     images = ImageSerializer(many=True, read_only=True)
@@ -35,6 +58,41 @@ class ListingSerializer(serializers.ModelSerializer):
             return obj.category.name
         return None
 
+def card_view_requested(request):
+    """`?view=card` : rendu compact pour les grilles du catalogue"""
+    return request is not None and request.query_params.get('view') == 'card'
+
+
+class ListingCardSerializer(serializers.BaseSerializer):
+    """
+    Carte d'annonce des grilles du catalogue, rendue en dict simple (pas de
+    champs DRF). Prévu pour Listing.objects.as_cards() ; sur une annonce
+    complète, la première image est lue dans les images préchargées.
+    """
+
+    def first_image(self, listing):
+        """(chemin, miniatures) de la première image"""
+        if hasattr(listing, 'first_image'):
+            return listing.first_image, listing.first_image_derivatives
+        image = next(iter(listing.images.all()), None)
+        return (image.image.name, image.derivatives) if image else (None, None)
+
+    def to_representation(self, listing):
+        available = max(0, listing.quantity - listing.quantity_sold - listing.quantity_reserved)
+        request = self.context.get('request')
+        image, derivatives = self.first_image(listing)
+        return {
+            'id': listing.pk,
+            'title': listing.title,
+            'price': str(listing.price),
+            'location': listing.location,
+            'first_image': media_url(image, request),
+            'thumbnail': media_url(thumbnails.thumbnail(derivatives), request),
+            'available_quantity': available,
+            'is_out_of_stock': available <= 0,
+        }
+
+
 class ListingCreateSerializer(serializers.ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all()
@@ -69,8 +127,8 @@ class ListingCreateSerializer(serializers.ModelSerializer):
         if not user.can_create_listing():
             raise serializers.ValidationError("Statut vendeur invalide.")
         listing = Listing.objects.create(**validated_data, user=self.context['request'].user)
-        for image in images:
-            Image.objects.create(listing=listing, image=image)
+        # Fichiers déjà validés par ImageField : écriture parallèle et un seul INSERT
+        store_images(listing, images)
         return listing
     def validate_category(self, value):
         if not Category.objects.filter(id=value.id).exists():
@@ -1,15 +1,19 @@
 # listings/signals.py
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Listing
+from .models import Image, Listing
 from commandes.models import Order
 from notifications.models import Notification
+from .search import SEARCH_VECTOR_FIELDS, update_search_vector
+from . import featured, thumbnails
+
+FEATURED_FIELDS = {'is_featured', 'status'}
 
 @receiver(post_save, sender=Listing)
 def check_stock_after_save(sender, instance, **kwargs):
     """Vérifier le stock après chaque sauvegarde d'une annonce"""
-    if instance.is_out_of_stock and instance.status != 'out_of_stock':
+    if instance.is_sold_out and instance.status != 'out_of_stock':
         # Le produit vient de s'épuiser
         instance.status = 'out_of_stock'
         instance.save(update_fields=['status'])
@@ -21,6 +25,33 @@ def check_stock_after_save(sender, instance, **kwargs):
             content=f'⚠️ Stock épuisé ! Votre produit "{instance.title}" n\'est plus disponible. Veuillez réapprovisionner.'
         )
 
+@receiver(post_save, sender=Listing)
+def update_listing_search_vector(sender, instance, created, update_fields=None, **kwargs):
+    """Recalculer le vecteur de recherche quand le titre, la description ou la localisation changent"""
+    if update_fields is not None and not set(update_fields) & set(SEARCH_VECTOR_FIELDS):
+        return
+    update_search_vector([instance.pk])
+
+@receiver(post_save, sender=Listing)
+def refresh_featured_rotation(sender, instance, created, update_fields=None, **kwargs):
+    """L'ensemble des annonces à la une a pu changer : nouvelle rotation au prochain appel"""
+    if update_fields is not None and not set(update_fields) & FEATURED_FIELDS:
+        return
+    if created and not instance.is_featured:
+        return
+    featured.invalidate()
+
+@receiver(post_delete, sender=Listing)
+def refresh_featured_rotation_on_delete(sender, instance, **kwargs):
+    if instance.is_featured:
+        featured.invalidate()
+
+@receiver(post_save, sender=Image)
+def generate_image_derivatives(sender, instance, created, **kwargs):
+    """Miniatures d'une nouvelle image (après le commit, voir listings/thumbnails.py)"""
+    if created:
+        thumbnails.schedule(instance.pk)
+
 @receiver(post_save, sender=Order)
 def check_stock_after_order(sender, instance, created, **kwargs):
     """Vérifier le stock après chaque commande"""
@@ -28,7 +59,7 @@ def check_stock_after_order(sender, instance, created, **kwargs):
         listing = instance.listing
         
         # Vérifier si la commande épuise le stock
-        if listing.available_quantity <= 0:
+        if listing.is_sold_out:
             # Envoyer une notification d'épuisement
             Notification.objects.create(
                 user=listing.user,
@@ -0,0 +1,132 @@
+# listings/thumbnails.py
+"""
+Miniatures des images d'annonces (Pillow).
+
+Pour chaque image, des dérivés WebP et JPEG sont générés une seule fois à
+quelques largeurs fixes (IMAGE_DERIVATIVE_WIDTHS), sans métadonnées EXIF
+(l'orientation est appliquée avant), puis leurs chemins sont enregistrés
+dans Image.derivatives. L'API lit ce champ : aucune lecture de fichier à
+la sérialisation.
+
+Génération (LISTING_IMAGE_DERIVATIVES) :
+- 'async' : après le commit de l'upload, dans un pool de threads ;
+- 'sync'  : immédiatement (tests, scripts) ;
+- 'off'   : rien à l'upload, la commande `generate_image_derivatives`
+  s'en charge (elle sert aussi au rattrapage des images existantes).
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from e_sugu.workers import submit
+from PIL import Image as PILImage, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_DIR = 'listings/derivatives'
+# format : (format Pillow, extension, options d'encodage)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def derivative_widths():
+    return tuple(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 1024)))
+
+
+def derivative_mode():
+    return getattr(settings, 'LISTING_IMAGE_DERIVATIVES', 'async')
+
+
+def derivative_name(original, width, extension):
+    """listings/2025/01/02/photo.jpg -> listings/derivatives/2025/01/02/photo-320.webp"""
+    base, _ = os.path.splitext(original)
+    if base.startswith('listings/'):
+        base = base[len('listings/'):]
+    return f'{DERIVATIVE_DIR}/{base}-{width}.{extension}'
+
+
+def _encode(picture, fmt):
+    pil_format, _, options = FORMATS[fmt]
+    buffer = io.BytesIO()
+    # Pas de paramètre exif= : les métadonnées de l'original ne sont pas recopiées
+    picture.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_derivatives(image):
+    """
+    Générer les dérivés d'une instance listings.Image et les écrire dans le
+    stockage de l'image. Retourne la carte {largeur: {format: chemin}}.
+    """
+    storage = image.image.storage
+    with storage.open(image.image.name, 'rb') as handle:
+        source = PILImage.open(handle)
+        source.load()
+    source = ImageOps.exif_transpose(source).convert('RGB')
+
+    derivatives = {}
+    # Source plus étroite que toutes les largeurs : un seul dérivé, à sa largeur réelle
+    widths = [width for width in derivative_widths() if width < source.width] or [source.width]
+    for width in widths:
+        resized = source
+        if width < source.width:
+            height = max(1, round(source.height * width / source.width))
+            resized = source.resize((width, height), PILImage.LANCZOS)
+        key = str(resized.width)
+        derivatives[key] = {}
+        for fmt in FORMATS:
+            name = derivative_name(image.image.name, key, FORMATS[fmt][1])
+            if storage.exists(name):
+                storage.delete(name)
+            derivatives[key][fmt] = storage.save(name, ContentFile(_encode(resized, fmt)))
+    return derivatives
+
+
+def generate_for_image(image_id, force=False):
+    """Générer puis enregistrer les dérivés ; retourne True si l'image a été traitée"""
+    from .models import Image
+
+    image = Image.objects.filter(pk=image_id).first()
+    if image is None or not image.image or (image.derivatives and not force):
+        return False
+    try:
+        derivatives = build_derivatives(image)
+    except Exception as e:
+        logger.error(f"❌ Miniatures impossibles pour l'image {image_id}: {str(e)}")
+        return False
+    Image.objects.filter(pk=image_id).update(derivatives=derivatives)
+    return True
+
+
+def schedule(image_id):
+    """À appeler à la création d'une image : génération après le commit"""
+    mode = derivative_mode()
+    if mode == 'sync':
+        transaction.on_commit(lambda: generate_for_image(image_id))
+    elif mode == 'async':
+        transaction.on_commit(lambda: submit(
+            'image-derivatives', generate_for_image, image_id,
+            max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2),
+        ))
+
+
+def srcset(derivatives, url_for):
+    """{'webp': 'url 320w, url 640w', 'jpeg': ...} pour l'attribut srcset des <source>"""
+    sizes = sorted(derivatives.items(), key=lambda item: int(item[0]))
+    return {
+        fmt: ', '.join(f'{url_for(paths[fmt])} {width}w' for width, paths in sizes if fmt in paths)
+        for fmt in FORMATS
+    }
+
+
+def thumbnail(derivatives, fmt='webp'):
+    """Chemin du plus petit dérivé, ou None si les miniatures n'existent pas encore"""
+    if not derivatives:
+        return None
+    smallest = min(derivatives, key=int)
+    return derivatives[smallest].get(fmt)
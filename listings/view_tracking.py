@@ -0,0 +1,180 @@
+# listings/view_tracking.py
+"""
+Ingestion des vues d'annonces par lots.
+
+Chaque vue est dédupliquée en mémoire partagée (cache Django, compatible
+Redis), puis mise en tampon. Le tampon est vidé à intervalle fixe :
+un seul bulk_create pour ListingView et un UPDATE ... SET views_count =
+views_count + n par annonce. Le vidage est fait par la commande
+`flush_listing_views` (worker) ou, à défaut, par la première requête qui
+constate que l'intervalle est écoulé.
+
+Le tampon doit être partagé entre les processus web et le worker (Redis) :
+sans REDIS_URL, LISTING_VIEW_TRACKING_MODE vaut 'sync' par défaut, qui
+conserve l'écriture immédiate. Les événements ne sont retirés du tampon
+qu'une fois écrits en base.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SEQ_KEY = 'listing_views:seq'
+CURSOR_KEY = 'listing_views:cursor'
+EVENT_KEY = 'listing_views:event:{}'
+LOCK_KEY = 'listing_views:flush_lock'
+LAST_FLUSH_KEY = 'listing_views:last_flush'
+
+DEDUPE_WINDOW = 30 * 60  # même IP sur la même annonce : une vue par 30 min
+UNIQUE_VISITOR_WINDOW = 60 * 60 * 24
+EVENT_TIMEOUT = 60 * 60 * 24
+FLUSH_BATCH_SIZE = 5000
+
+
+def is_buffered():
+    return getattr(settings, 'LISTING_VIEW_TRACKING_MODE', 'sync') == 'buffered'
+
+
+def flush_interval():
+    return getattr(settings, 'LISTING_VIEW_FLUSH_INTERVAL', 10)
+
+
+def is_duplicate_view(listing_id, ip_address):
+    """cache.add est atomique : seule la première vue de la fenêtre passe"""
+    return not cache.add(f'listing_view_seen:{listing_id}:{ip_address}', True, DEDUPE_WINDOW)
+
+
+def is_unique_visitor(listing_id, user):
+    if not user or not user.is_authenticated:
+        return False
+    # Même clé que Listing.increment_views pour rester cohérent avec le mode 'sync'
+    return cache.add(f"listing_{listing_id}_viewed_by_{user.id}", True, UNIQUE_VISITOR_WINDOW)
+
+
+def enqueue_view(listing_id, user=None, ip_address=None, user_agent='', session_key=None):
+    """
+    Mettre une vue en tampon. Retourne False si elle a été dédupliquée.
+    """
+    if is_duplicate_view(listing_id, ip_address):
+        return False
+
+    user_id = user.id if user and user.is_authenticated else None
+    event = {
+        'listing_id': listing_id,
+        'user_id': user_id,
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'session_key': session_key,
+        'viewed_at': time.time(),
+        'unique': is_unique_visitor(listing_id, user),
+    }
+
+    cache.add(SEQ_KEY, 0, None)
+    seq = cache.incr(SEQ_KEY)
+    cache.set(EVENT_KEY.format(seq), event, EVENT_TIMEOUT)
+
+    maybe_flush()
+    return True
+
+
+def maybe_flush():
+    """Vidage opportuniste quand aucun worker n'est passé depuis l'intervalle"""
+    if cache.add(LAST_FLUSH_KEY, True, flush_interval()):
+        try:
+            flush_view_buffer()
+        except Exception as e:
+            logger.error(f"Erreur vidage tampon des vues: {str(e)}")
+
+
+def _pending(limit):
+    """(événements, dernier numéro lu, clés lues), sans rien retirer du tampon"""
+    cursor = cache.get(CURSOR_KEY, 0)
+    seq = cache.get(SEQ_KEY, 0)
+    if seq < cursor:
+        # Compteur perdu (éviction, redémarrage du cache) : repartir de zéro
+        # plutôt que d'ignorer toutes les vues jusqu'à ce qu'il rattrape le curseur
+        logger.warning(f"⚠️ Tampon des vues réinitialisé (seq {seq} < curseur {cursor})")
+        cache.set(CURSOR_KEY, 0, None)
+        cursor = 0
+    if seq <= cursor:
+        return [], cursor, []
+    last = min(seq, cursor + limit)
+    keys = [EVENT_KEY.format(n) for n in range(cursor + 1, last + 1)]
+    found = cache.get_many(keys)
+    # Un événement absent (expiré, ou entre incr et set) est ignoré : les
+    # compteurs de vues sont approximatifs par nature
+    return [found[key] for key in keys if key in found], last, keys
+
+
+def _acknowledge(last, keys):
+    """Retirer du tampon les événements écrits en base"""
+    cache.set(CURSOR_KEY, last, None)
+    cache.delete_many(keys)
+
+
+def flush_view_buffer(limit=FLUSH_BATCH_SIZE):
+    """
+    Écrire les vues en attente. Retourne le nombre de vues écrites.
+    Un verrou dans le cache évite deux vidages concurrents.
+    """
+    if not cache.add(LOCK_KEY, True, 60):
+        return 0
+    cache.set(LAST_FLUSH_KEY, True, flush_interval())
+    try:
+        events, last, keys = _pending(limit)
+        if events:
+            # En cas d'erreur, le curseur n'avance pas : le lot sera réessayé
+            write_views(events)
+        if keys:
+            _acknowledge(last, keys)
+        return len(events)
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def write_views(events):
+    from users.vendor_stats import schedule_refresh_for_views
+    from .models import Listing, ListingView
+
+    existing_ids = set(Listing.objects.filter(
+        pk__in={event['listing_id'] for event in events}
+    ).values_list('pk', flat=True))
+    events = [event for event in events if event['listing_id'] in existing_ids]
+
+    deltas = defaultdict(lambda: {'views': 0, 'unique': 0, 'last_viewed': 0})
+    for event in events:
+        delta = deltas[event['listing_id']]
+        delta['views'] += 1
+        delta['unique'] += 1 if event['unique'] else 0
+        delta['last_viewed'] = max(delta['last_viewed'], event['viewed_at'])
+
+    with transaction.atomic():
+        # viewed_at (auto_now_add) prend l'heure du vidage, à l'intervalle près
+        ListingView.objects.bulk_create([
+            ListingView(
+                listing_id=event['listing_id'],
+                user_id=event['user_id'],
+                ip_address=event['ip_address'],
+                user_agent=event['user_agent'],
+                session_key=event['session_key'],
+            )
+            for event in events
+        ], batch_size=1000)
+
+        for listing_id, delta in deltas.items():
+            Listing.objects.filter(pk=listing_id).update(
+                views_count=F('views_count') + delta['views'],
+                unique_visitors=F('unique_visitors') + delta['unique'],
+                last_viewed=datetime.fromtimestamp(delta['last_viewed'], tz=dt_timezone.utc),
+            )
+
+        # bulk_create ne déclenche pas post_save : rafraîchir le rollup vendeur
+        schedule_refresh_for_views(list(deltas), timezone.now())
@@ -1,17 +1,27 @@
 # listings/views.py
 from rest_framework import viewsets, status, filters
 from rest_framework.permissions import BasePermission, IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from .models import Listing, Image, ListingView
 from commandes.models import Order
 from rest_framework.permissions import IsAdminUser
 from rest_framework.exceptions import ValidationError
-from .serializers import ListingSerializer, ImageUploadSerializer, ListingCreateSerializer, OrderCreateSerializer
+from .serializers import (
+    ListingSerializer, ListingCardSerializer, ImageUploadSerializer, ListingCreateSerializer,
+    OrderCreateSerializer, card_view_requested,
+)
 from categories.models import Category
+from categories.cache import get_category_tree
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import ListingFilter
-from rest_framework.pagination import PageNumberPagination
+from .search import ListingSearchFilter, SEARCH_VECTOR_FIELDS, update_search_vector
+from . import view_tracking
+from .featured import FeaturedRotationPagination
+from . import image_ingest
+from administration.exports import export_response
+from e_sugu.pagination import KeysetPagination
+from e_sugu.throttling import ListingViewRateThrottle
 from notifications.models import Notification
 import random
 from .permissions import IsSellerPermission 
@@ -20,16 +30,7 @@ import logging
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 
-def get_all_subcategories(category):
-    """
-    Récupère récursivement toutes les sous-catégories d'une catégorie donnée.
-    """
-    subcategories = []
-    for subcat in category.subcategories.all():
-        subcategories.append(subcat)
-        subcategories.extend(get_all_subcategories(subcat))
-    return subcategories
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(KeysetPagination):
     page_size = 40
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -41,20 +42,27 @@ class IsOwner(BasePermission):
         return obj.user == request.user
 
 class ListingViewSet(viewsets.ModelViewSet):
-    queryset = Listing.objects.filter(status='active')
+    queryset = Listing.objects.filter(status='active').for_listing_cards()
     serializer_class = ListingSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = StandardResultsSetPagination
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # La recherche passe après le tri pour pouvoir classer par pertinence
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ListingSearchFilter]
     filterset_class = ListingFilter
     search_fields = ['title', 'description', 'location']
     ordering_fields = ['price', 'created_at']
     ordering = ['-created_at'] 
 
+    def card_view(self):
+        """Grilles du catalogue (`?view=card`) : liste et annonces à la une"""
+        return self.action in ('list', 'featured') and card_view_requested(self.request)
+
     def get_serializer_class(self):
         if self.action == 'create':
             return ListingCreateSerializer
+        if self.card_view():
+            return ListingCardSerializer
         return ListingSerializer
     
 
@@ -65,6 +73,8 @@ class ListingViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.card_view():
+            queryset = queryset.as_cards()
         category_name = self.request.query_params.get('category')
         my_listings = self.request.query_params.get('my_listings')
         if my_listings and self.request.user.is_authenticated:
@@ -72,36 +82,20 @@ class ListingViewSet(viewsets.ModelViewSet):
         
         category_name = self.request.query_params.get('category')
         if category_name:
-            try:
-                category = Category.objects.get(name=category_name)
-
-                # Fonction récursive pour récupérer toutes les sous-catégories
-                def get_all_subcategories(cat):
-                    subs = cat.subcategories.all()
-                    all_subs = list(subs)
-                    for sub in subs:
-                        all_subs.extend(get_all_subcategories(sub))
-                    return all_subs
-
-                # Inclure la catégorie et toutes ses sous-catégories
-                all_categories = [category] + get_all_subcategories(category)
-
-                # On filtre par leurs noms
-                category_names = [cat.name for cat in all_categories]
-                queryset = queryset.filter(category__name__in=category_names)
-
-            except Category.DoesNotExist:
-                queryset = queryset.none()
+            # Catégorie et toutes ses sous-catégories, depuis l'arbre en cache
+            category_ids = get_category_tree().descendant_ids_for_name(category_name)
+            queryset = queryset.filter(category_id__in=category_ids)
 
         if self.action == 'featured':
-            return queryset.filter(is_featured=True).order_by('?')
+            # L'ordre aléatoire vient de la rotation (voir listings/featured.py)
+            return queryset.filter(is_featured=True)
 
         return queryset
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy', 'upload_image']:
             return [IsAuthenticated()]
-        elif self.action in ['mark_as_sold', 'deactivate', 'restock']:
+        elif self.action in ['mark_as_sold', 'deactivate', 'restock', 'upload_images']:
             return [IsAuthenticated(), IsOwner()]
         return super().get_permissions()
 
@@ -114,6 +108,35 @@ class ListingViewSet(viewsets.ModelViewSet):
             return Response({'message': 'Image ajoutée'}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['post'], url_path='images/bulk')
+    def upload_images(self, request, pk=None):
+        """
+        Plusieurs images en une requête (champ `images` répété). Réponse :
+        201 si tout est enregistré, 207 si une partie est refusée, 400 sinon.
+        """
+        listing = self.get_object()
+        uploads = request.FILES.getlist('images')
+        if not uploads:
+            return Response({'error': 'Aucune image reçue (champ "images").'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(uploads) > image_ingest.MAX_FILES:
+            return Response(
+                {'error': f'Maximum {image_ingest.MAX_FILES} images par envoi.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        images, results = image_ingest.ingest_images(listing, uploads)
+        if len(images) == len(uploads):
+            response_status = status.HTTP_201_CREATED
+        elif images:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({
+            'created': len(images),
+            'failed': len(uploads) - len(images),
+            'results': results,
+        }, status=response_status)
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsOwner])
     def mark_as_sold(self, request, pk=None):
         listing = self.get_object()
@@ -128,13 +151,11 @@ class ListingViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def featured(self, request):
-        queryset = self.get_queryset().filter(is_featured=True).order_by('?')
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = FeaturedRotationPagination()
+        page = paginator.paginate_queryset(queryset, request, self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     @action(detail=True, methods=['get'])
     def details(self, request, pk=None):
         listing = self.get_object()
@@ -298,9 +319,14 @@ logger = logging.getLogger(__name__)
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([ListingViewRateThrottle])
 @csrf_exempt
 def track_listing_view(request, listing_id):
     """Suivre une vue sur une annonce"""
+    if view_tracking.is_buffered():
+        return _track_listing_view_buffered(request, listing_id)
+
+    # Mode 'sync' (repli) : écriture immédiate
     try:
         listing = Listing.objects.get(id=listing_id)
         
@@ -355,6 +381,33 @@ def track_listing_view(request, listing_id):
     except Exception as e:
         logger.error(f"Erreur suivi vue: {str(e)}")
         return Response({'error': 'Erreur interne'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _track_listing_view_buffered(request, listing_id):
+    """Mettre la vue en tampon : aucune écriture en base dans la requête"""
+    try:
+        counters = Listing.objects.filter(id=listing_id).values('id', 'views_count', 'unique_visitors').first()
+        if counters is None:
+            return Response({'error': 'Annonce non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+
+        session_key = request.session.session_key if hasattr(request, 'session') else None
+        view_tracking.enqueue_view(
+            listing_id,
+            user=request.user,
+            ip_address=get_client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            session_key=session_key,
+        )
+
+        return Response({
+            'status': 'success',
+            'listing_id': counters['id'],
+            'views_count': counters['views_count'],
+            'unique_visitors': counters['unique_visitors']
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"Erreur suivi vue: {str(e)}")
+        return Response({'error': 'Erreur interne'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 def get_client_ip(request):
     """Récupérer l'adresse IP du client"""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -482,6 +535,16 @@ def admin_products_stats(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_export_products(request):
+    """Exporter les annonces (CSV ou NDJSON, en flux)"""
+    queryset = Listing.objects.all()
+    status_filter = request.GET.get('status')
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    return export_response(request, 'listings', queryset)
+
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def admin_bulk_update_products(request):
@@ -511,6 +574,10 @@ def admin_bulk_update_products(request):
         
         # Mettre à jour les produits
         updated_count = products.update(**update_data)
+
+        # update() ne déclenche pas post_save : rafraîchir le vecteur de recherche
+        if set(update_data) & set(SEARCH_VECTOR_FIELDS):
+            update_search_vector(product_ids)
         
         return Response({
             'message': f'{updated_count} produit(s) mis à jour',
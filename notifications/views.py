@@ -6,11 +6,16 @@ from rest_framework import status
 from .models import Notification
 from .serializers import NotificationSerializer
 from rest_framework.permissions import AllowAny
+from e_sugu.pagination import KeysetPagination, pagination_requested
 class NotificationView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         notifications = Notification.objects.filter(user=request.user)
+        if pagination_requested(request):
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(notifications, request)
+            return paginator.get_paginated_response(NotificationSerializer(page, many=True).data)
         serializer = NotificationSerializer(notifications, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -0,0 +1,73 @@
+# paniers/batch.py
+"""
+Modification du panier en lot (synchronisation après connexion ou hors ligne).
+
+Toutes les annonces du lot sont lues en une requête, les lignes existantes
+du panier en une autre ; chaque opération est validée en mémoire (stock,
+propre annonce, doublons). Les lignes valides sont appliquées dans une
+seule transaction : un INSERT ... ON CONFLICT DO UPDATE pour les quantités
+(créations et mises à jour ensemble) et un DELETE pour les quantités à 0.
+Une ligne invalide est ignorée et signalée, les autres sont appliquées.
+"""
+from django.db import transaction
+
+from listings.models import Listing
+from .models import PanierItem
+
+MODES = ('set', 'add')
+LISTING_FIELDS = ['id', 'title', 'user_id', 'status', 'quantity', 'quantity_sold', 'quantity_reserved']
+
+
+def apply_batch(panier, user, operations, mode='set'):
+    """
+    `operations` : [{'listing_id': int, 'quantity': int}, ...]
+    mode 'set' : quantité finale de la ligne (0 = retirer) ;
+    mode 'add' : quantité ajoutée à celle déjà dans le panier.
+    Retourne (nombre de lignes appliquées, erreurs par ligne).
+    """
+    listing_ids = {operation['listing_id'] for operation in operations}
+    listings = Listing.objects.only(*LISTING_FIELDS).in_bulk(listing_ids)
+    current = dict(
+        PanierItem.objects.filter(panier=panier, listing_id__in=listing_ids).values_list('listing_id', 'quantity')
+    )
+
+    upserts, deletions, errors, seen = {}, set(), [], set()
+    for index, operation in enumerate(operations):
+        listing_id = operation['listing_id']
+        error = None
+        listing = listings.get(listing_id)
+        target = operation['quantity'] + (current.get(listing_id, 0) if mode == 'add' else 0)
+
+        if listing_id in seen:
+            error = "Produit en double dans le lot"
+        elif listing is None:
+            error = "Produit non trouvé"
+        elif listing.user_id == user.pk:
+            error = "Vous ne pouvez pas ajouter votre propre produit au panier"
+        elif target > 0 and listing.status != 'active':
+            error = "Ce produit n'est plus disponible"
+        elif target > listing.available_quantity:
+            error = f"Quantité non disponible. Stock restant: {listing.available_quantity}"
+        seen.add(listing_id)
+
+        if error:
+            errors.append({'index': index, 'listing_id': listing_id, 'error': error})
+        elif target <= 0:
+            if listing_id in current:
+                deletions.add(listing_id)
+        elif current.get(listing_id) != target:
+            upserts[listing_id] = target
+
+    with transaction.atomic():
+        if upserts:
+            PanierItem.objects.bulk_create(
+                [PanierItem(panier=panier, listing_id=listing_id, quantity=quantity)
+                 for listing_id, quantity in upserts.items()],
+                update_conflicts=True,
+                unique_fields=['panier', 'listing'],
+                update_fields=['quantity'],
+            )
+        if deletions:
+            PanierItem.objects.filter(panier=panier, listing_id__in=deletions).delete()
+
+    return len(upserts) + len(deletions), errors
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Panier, PanierItem
+from .summary import cart_summary
 from listings.serializers import ListingSerializer
 from listings.models import Listing
 
@@ -36,6 +37,17 @@ class PanierItemCreateSerializer(serializers.ModelSerializer):
         
         return data
 
+class PanierBatchLineSerializer(serializers.Serializer):
+    listing_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0)
+
+
+class PanierBatchSerializer(serializers.Serializer):
+    """Lot de modifications du panier (voir paniers/batch.py)"""
+    items = PanierBatchLineSerializer(many=True, allow_empty=False, max_length=100)
+    mode = serializers.ChoiceField(choices=['set', 'add'], default='set')
+
+
 class PanierItemSerializer(serializers.ModelSerializer):
     listing = ListingSerializer(read_only=True)
     is_available = serializers.SerializerMethodField()
@@ -76,14 +88,16 @@ class PanierSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'created_at', 'items', 'total_price', 'can_create_order', 'validation_message']
         read_only_fields = ['id', 'user', 'created_at']
 
+    def summary(self, obj):
+        """Total et validation calculés en une requête, partagés par les trois champs"""
+        return cart_summary(obj, self.context.get('request'))
+
     def get_total_price(self, obj):
-        return obj.total_price()
+        return self.summary(obj).total_price
     def get_can_create_order(self, obj):
         """Vérifie si une commande peut être créée depuis ce panier"""
-        can_create, _ = obj.can_create_order()
-        return can_create
+        return self.summary(obj).can_create_order
     
     def get_validation_message(self, obj):
         """Message de validation pour la création de commande"""
-        _, message = obj.can_create_order()
-        return message
\ No newline at end of file
+        return self.summary(obj).validation_message
\ No newline at end of file
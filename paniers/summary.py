@@ -0,0 +1,81 @@
+# paniers/summary.py
+"""
+Résumé du panier (total, nombre d'articles, validation) en une requête.
+
+Une seule agrégation sur PanierItem joint à Listing :
+total = SUM(quantity * prix), articles en rupture comparés en SQL au stock
+disponible (quantity - quantity_sold - quantity_reserved), et le premier
+article en rupture pour le message de validation. Le résultat est mémorisé
+sur la requête : la vue et le sérialiseur le partagent sans recalcul.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Count, F, Q, Sum
+
+from .models import PanierItem
+
+EMPTY_MESSAGE = 'Le panier est vide'
+AVAILABLE = F('listing__quantity') - F('listing__quantity_sold') - F('listing__quantity_reserved')
+
+
+@dataclass
+class CartSummary:
+    item_count: int
+    total_quantity: int
+    total_price: Decimal
+    unavailable_count: int
+    first_unavailable: tuple = None  # (titre, stock disponible)
+
+    @property
+    def can_create_order(self):
+        """Même règle que Panier.can_create_order : aucune quantité au-delà du stock"""
+        return self.unavailable_count == 0
+
+    @property
+    def validation_message(self):
+        if self.first_unavailable is None:
+            return ""
+        title, available = self.first_unavailable
+        return f"Quantité insuffisante pour {title}. Stock disponible: {max(0, available)}"
+
+
+def compute_summary(items):
+    """`items` : queryset de PanierItem (un panier, ou les paniers d'un utilisateur)"""
+    unavailable = Q(quantity__gt=AVAILABLE)
+    row = items.order_by().aggregate(
+        item_count=Count('id'),
+        total_quantity=Sum('quantity'),
+        total_price=Sum(F('quantity') * F('listing__price')),
+        unavailable_count=Count('id', filter=unavailable),
+        unavailable_titles=ArrayAgg('listing__title', filter=unavailable, order_by='id', default=[]),
+        unavailable_stock=ArrayAgg(AVAILABLE, filter=unavailable, order_by='id', default=[]),
+    )
+    first_unavailable = None
+    if row['unavailable_titles']:
+        first_unavailable = (row['unavailable_titles'][0], row['unavailable_stock'][0])
+    return CartSummary(
+        item_count=row['item_count'],
+        total_quantity=row['total_quantity'] or 0,
+        total_price=row['total_price'] or Decimal('0'),
+        unavailable_count=row['unavailable_count'],
+        first_unavailable=first_unavailable,
+    )
+
+
+def cart_summary(panier, request=None):
+    """Résumé d'un panier, mémorisé sur la requête si elle est fournie"""
+    if request is None:
+        return compute_summary(PanierItem.objects.filter(panier=panier))
+    memo = getattr(request, '_cart_summaries', None)
+    if memo is None:
+        memo = request._cart_summaries = {}
+    if panier.pk not in memo:
+        memo[panier.pk] = compute_summary(PanierItem.objects.filter(panier=panier))
+    return memo[panier.pk]
+
+
+def user_cart_summary(user):
+    """Résumé du panier d'un utilisateur sans charger le panier lui-même"""
+    return compute_summary(PanierItem.objects.filter(panier__user=user))
@@ -6,8 +6,10 @@ router = DefaultRouter()
 router.register('panier', PanierViewSet, basename='panier')
 
 urlpatterns = [
-    path('', include(router.urls)),
+    # Avant le routeur : sinon 'panier/<pk>/' capture 'total'
     path('panier/total/', PanierTotalView.as_view(), name='panier-total'),
+    path('', include(router.urls)),
     path('panier/validate/', PanierViewSet.as_view({'get': 'validate'}), name='panier-validate'),
     path('panier/clear/', PanierViewSet.as_view({'post': 'clear'}), name='panier-clear'),
+    path('batch/', PanierViewSet.as_view({'patch': 'batch'}), name='panier-batch'),
 ]
\ No newline at end of file
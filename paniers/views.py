@@ -3,8 +3,16 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from .models import Panier, PanierItem
-from .serializers import PanierSerializer, PanierItemSerializer, PanierItemCreateSerializer
-from listings.models import Listing
+from .serializers import PanierSerializer, PanierItemSerializer, PanierItemCreateSerializer, PanierBatchSerializer
+from .batch import apply_batch
+from .summary import EMPTY_MESSAGE, cart_summary, user_cart_summary
+from django.db.models import prefetch_related_objects
+from listings.models import Listing, listing_cards_prefetch
+
+
+def panier_items_prefetch():
+    """Articles du panier et annonces complètes (images, vendeur, catégorie)"""
+    return ['items', listing_cards_prefetch('items__listing')]
 
 
 class PanierViewSet(viewsets.ModelViewSet):
@@ -18,7 +26,7 @@ class PanierViewSet(viewsets.ModelViewSet):
         """
         Retourne le panier de l'utilisateur connecté
         """
-        return Panier.objects.filter(user=self.request.user).prefetch_related('items__listing')
+        return Panier.objects.filter(user=self.request.user).prefetch_related(*panier_items_prefetch())
     
 
     def get_or_create_panier(self):
@@ -33,6 +41,7 @@ class PanierViewSet(viewsets.ModelViewSet):
         Affiche le panier de l'utilisateur
         """
         panier = self.get_or_create_panier()
+        prefetch_related_objects([panier], *panier_items_prefetch())
         serializer = self.get_serializer(panier)
         return Response(serializer.data)
         try:
@@ -155,17 +164,41 @@ class PanierViewSet(viewsets.ModelViewSet):
         count, _ = panier.items.all().delete()
         return Response({'message': f'{count} article(s) supprimé(s) du panier'})
 
+    @action(detail=False, methods=['patch'])
+    def batch(self, request):
+        """
+        Appliquer plusieurs modifications en une requête :
+        {"items": [{"listing_id": 1, "quantity": 2}, ...], "mode": "set" | "add"}
+        (une liste seule est aussi acceptée). Renvoie le panier à jour et
+        les erreurs ligne par ligne.
+        """
+        data = {'items': request.data} if isinstance(request.data, list) else request.data
+        serializer = PanierBatchSerializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        panier = self.get_or_create_panier()
+        applied, errors = apply_batch(
+            panier, request.user, serializer.validated_data['items'], serializer.validated_data['mode']
+        )
+        prefetch_related_objects([panier], *panier_items_prefetch())
+        return Response({
+            'applied': applied,
+            'errors': errors,
+            'panier': self.get_serializer(panier).data,
+        })
+
     @action(detail=False, methods=['get'])
     def validate(self, request):
         """Valider le panier avant création de commande"""
         panier = self.get_or_create_panier()
-        can_create, message = panier.can_create_order()
+        summary = cart_summary(panier, request)
         
         return Response({
-            'can_create_order': can_create,
-            'message': message,
-            'total_items': panier.items.count(),
-            'total_price': panier.total_price()
+            'can_create_order': summary.can_create_order,
+            'message': summary.validation_message,
+            'total_items': summary.item_count,
+            'total_price': summary.total_price
         })
 
 
@@ -179,23 +212,20 @@ class PanierTotalView(APIView):
         """
         Calcule le prix total du panier
         """
-        try:
-            panier = Panier.objects.get(user=request.user)
-            total = panier.total_price()
-            item_count = panier.items.count()
-            can_create, validation_message = panier.can_create_order()
-            return Response({
-                'total_price': float(total),
-                'item_count': item_count,
-                'can_create_order': can_create,
-                'validation_message': validation_message,
-                'message': f'Panier avec {item_count} article(s)'
-            })
-        except Panier.DoesNotExist:
+        # Une seule requête, sans charger le panier ni ses articles
+        summary = user_cart_summary(request.user)
+        if not summary.item_count:
             return Response({
                 'total_price': 0,
                 'item_count': 0,
                 'can_create_order': False,
-                'validation_message': 'Le panier est vide',
+                'validation_message': EMPTY_MESSAGE,
                 'message': 'Panier vide'
-            })
\ No newline at end of file
+            })
+        return Response({
+            'total_price': float(summary.total_price),
+            'item_count': summary.item_count,
+            'can_create_order': summary.can_create_order,
+            'validation_message': summary.validation_message,
+            'message': f'Panier avec {summary.item_count} article(s)'
+        })
\ No newline at end of file
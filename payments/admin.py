@@ -1,8 +1,37 @@
 # payments/admin.py
 from django.contrib import admin
-from .models import Transaction
+from .models import LedgerEntry, Payout, SellerBalance, Transaction, StockReservation, StripeEvent
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ['id', 'listing', 'buyer', 'seller', 'amount', 'commission', 'status', 'created_at']
-    search_fields = ['listing__title', 'buyer__name', 'seller__name']
\ No newline at end of file
+    search_fields = ['listing__title', 'buyer__name', 'seller__name']
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'listing', 'buyer', 'quantity', 'status', 'expires_at', 'created_at']
+    list_filter = ['status']
+    search_fields = ['listing__title', 'stripe_payment_intent_id']
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'type', 'payment_intent_id', 'status', 'attempts', 'stripe_created', 'processed_at']
+    list_filter = ['status', 'type']
+    search_fields = ['event_id', 'payment_intent_id']
+
+@admin.register(Payout)
+class PayoutAdmin(admin.ModelAdmin):
+    list_display = ['id', 'seller', 'amount', 'commission', 'transaction_count', 'status', 'period_end', 'paid_at']
+    list_filter = ['status']
+    search_fields = ['seller__email', 'stripe_transfer_id']
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'account', 'amount', 'entry_type', 'reference', 'created_at']
+    list_filter = ['entry_type']
+    search_fields = ['account', 'reference']
+
+@admin.register(SellerBalance)
+class SellerBalanceAdmin(admin.ModelAdmin):
+    list_display = ['seller', 'balance', 'total_earned', 'total_commission', 'total_paid_out', 'updated_at']
+    search_fields = ['seller__email']
\ No newline at end of file
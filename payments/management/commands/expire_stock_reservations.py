@@ -0,0 +1,37 @@
+# payments/management/commands/expire_stock_reservations.py
+import time
+
+from django.core.management.base import BaseCommand
+from payments.services.reservation_service import ReservationService
+
+
+class Command(BaseCommand):
+    help = "Libérer les réservations de stock expirées (une fois, ou en boucle avec --loop)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Tourner en continu (worker)')
+        parser.add_argument('--interval', type=int, default=30, help='Intervalle entre deux passages (secondes)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.stdout.write(f"✅ {self._sweep(options['batch_size'])} réservation(s) expirée(s) libérée(s)")
+            return
+
+        self.stdout.write(f"🔄 Balayage des réservations toutes les {options['interval']}s (Ctrl+C pour arrêter)")
+        try:
+            while True:
+                released = self._sweep(options['batch_size'])
+                if released:
+                    self.stdout.write(f"✅ {released} réservation(s) expirée(s) libérée(s)")
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("🛑 Arrêt")
+
+    def _sweep(self, batch_size):
+        total = 0
+        while True:
+            released = ReservationService.expire(batch_size=batch_size)
+            total += released
+            if released < batch_size:
+                return total
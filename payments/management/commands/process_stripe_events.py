@@ -0,0 +1,43 @@
+# payments/management/commands/process_stripe_events.py
+import time
+
+from django.core.management.base import BaseCommand
+from payments.models import StripeEvent
+from payments.services import event_inbox
+
+
+class Command(BaseCommand):
+    help = "Traiter les webhooks Stripe en attente (une fois, ou en boucle avec --loop)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Tourner en continu (worker)')
+        parser.add_argument('--interval', type=int, default=5, help='Intervalle entre deux passages (secondes)')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--retry-failed', action='store_true', help='Remettre en file les événements en échec')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            requeued = StripeEvent.objects.filter(status='failed').update(status='pending', attempts=0)
+            self.stdout.write(f"🔁 {requeued} événement(s) en échec remis en file")
+
+        if not options['loop']:
+            self.stdout.write(f"✅ {self._drain(options['batch_size'])} événement(s) Stripe traité(s)")
+            return
+
+        self.stdout.write(f"🔄 Traitement des webhooks Stripe toutes les {options['interval']}s (Ctrl+C pour arrêter)")
+        try:
+            while True:
+                processed = self._drain(options['batch_size'])
+                if processed:
+                    self.stdout.write(f"✅ {processed} événement(s) Stripe traité(s)")
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("🛑 Arrêt")
+
+    def _drain(self, batch_size):
+        total = 0
+        while True:
+            processed = event_inbox.process_pending(batch_size=batch_size)
+            total += processed
+            if processed < batch_size:
+                return total
@@ -0,0 +1,165 @@
+# payments/management/commands/reconcile_ledger.py
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from payments.models import LedgerEntry, Payout, SellerBalance, Transaction
+from payments.services.ledger_service import LedgerService, reference
+from transactions.models import Transaction as LegacyTransaction
+
+# Statuts pour lesquels l'acheteur a payé (le paiement doit être au grand livre)
+PAID_STATUSES = ('completed', 'transferred', 'refunded')
+LEGACY_PAID_STATUSES = ('success', 'refunded')
+FIELDS = ('balance', 'total_earned', 'total_commission', 'total_refunded', 'total_paid_out')
+ZERO = Value(Decimal('0'), output_field=DecimalField())
+
+# Net vendeur avec les mêmes replis que ledger_service.figures() :
+# net_amount, sinon brut - commission (commission absente = 0)
+PAYMENTS_NET = Coalesce(
+    'net_amount',
+    Coalesce('total_amount', Coalesce('amount', ZERO) * F('quantity')) - Coalesce('commission', ZERO),
+    output_field=DecimalField(),
+)
+LEGACY_NET = Coalesce(
+    'net_amount', Coalesce('amount', ZERO) - Coalesce('commission', ZERO), output_field=DecimalField(),
+)
+
+
+class Command(BaseCommand):
+    help = "Vérifier le grand livre contre les transactions, les versements et les soldes vendeurs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true', help='Passer au grand livre les opérations manquantes')
+        parser.add_argument('--rebuild-snapshots', action='store_true', help='Recalculer les soldes à partir des écritures')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self._backfill()
+
+        problems = []
+        unbalanced = list(
+            LedgerEntry.objects.order_by().values('posting_id')
+            .annotate(total=Sum('amount')).exclude(total=0).values_list('posting_id', flat=True)
+        )
+        if unbalanced:
+            problems.append(f"{len(unbalanced)} opération(s) déséquilibrée(s): {', '.join(map(str, unbalanced[:5]))}")
+
+        missing = self._missing()
+        for kind, refs in missing.items():
+            if refs:
+                problems.append(f"{len(refs)} {kind} absent(s) du grand livre (ex. {refs[0]})")
+
+        ledger = self._ledger_totals()
+        expected = self._expected_totals()
+        for seller_id in sorted(set(ledger) | set(expected)):
+            for field in ('total_earned', 'total_refunded', 'total_paid_out'):
+                got, want = ledger[seller_id][field], expected[seller_id][field]
+                if got != want:
+                    problems.append(f"vendeur {seller_id}: {field} au grand livre {got}, attendu {want}")
+
+        if options['rebuild_snapshots']:
+            self._rebuild(ledger)
+        else:
+            snapshots = {balance.seller_id: balance for balance in SellerBalance.objects.all()}
+            for seller_id in sorted(set(ledger) | set(snapshots)):
+                snapshot = snapshots.get(seller_id)
+                for field in FIELDS:
+                    got = getattr(snapshot, field) if snapshot else Decimal('0')
+                    if got != ledger[seller_id][field]:
+                        problems.append(f"vendeur {seller_id}: solde {field} {got}, écritures {ledger[seller_id][field]}")
+
+        if problems:
+            for problem in problems:
+                self.stderr.write(f"❌ {problem}")
+            raise CommandError(f"{len(problems)} écart(s) dans le grand livre")
+        self.stdout.write(f"✅ Grand livre cohérent ({len(ledger)} vendeur(s))")
+
+    def _paid(self):
+        return [
+            Transaction.objects.filter(status__in=PAID_STATUSES),
+            LegacyTransaction.objects.filter(status__in=LEGACY_PAID_STATUSES),
+        ]
+
+    def _missing(self):
+        """Références attendues mais sans écriture, par type d'opération"""
+        posted = defaultdict(set)
+        for ref, entry_type in LedgerEntry.objects.values_list('reference', 'entry_type').distinct():
+            posted[entry_type].add(ref)
+        missing = {'paiement(s)': [], 'remboursement(s)': [], 'versement(s)': []}
+        for queryset in self._paid():
+            for transaction in queryset.only('pk', 'status'):
+                ref = reference(transaction)
+                if ref not in posted['payment']:
+                    missing['paiement(s)'].append(ref)
+                if transaction.status == 'refunded' and ref not in posted['refund']:
+                    missing['remboursement(s)'].append(ref)
+        for payout in Payout.objects.filter(status='paid').only('pk'):
+            if reference(payout) not in posted['payout']:
+                missing['versement(s)'].append(reference(payout))
+        return missing
+
+    def _backfill(self):
+        count = 0
+        for queryset in self._paid():
+            if queryset.model is LegacyTransaction:
+                queryset = queryset.select_related('order__listing')
+            for transaction in queryset.iterator(chunk_size=500):
+                with db_transaction.atomic():
+                    count += LedgerService.record_payments([transaction])
+                    if transaction.status == 'refunded':
+                        count += int(LedgerService.record_refund(transaction))
+        for payout in Payout.objects.filter(status='paid').iterator(chunk_size=500):
+            count += int(LedgerService.record_payout(payout))
+        self.stdout.write(f"🧾 {count} opération(s) ajoutée(s) au grand livre")
+
+    def _ledger_totals(self):
+        """Compteurs de chaque vendeur recalculés à partir de ses écritures"""
+        totals = defaultdict(lambda: dict.fromkeys(FIELDS, Decimal('0')))
+        rows = (
+            LedgerEntry.objects.filter(seller__isnull=False).order_by()
+            .values('seller_id', 'entry_type').annotate(total=Sum('amount'))
+        )
+        for row in rows:
+            seller, amount = totals[row['seller_id']], row['total']
+            seller['balance'] += amount
+            if row['entry_type'] in ('payment', 'commission'):
+                seller['total_earned'] += amount
+            if row['entry_type'] in ('refund', 'commission_reversal'):
+                seller['total_refunded'] -= amount
+            if row['entry_type'] in ('commission', 'commission_reversal'):
+                seller['total_commission'] -= amount
+            if row['entry_type'] == 'payout':
+                seller['total_paid_out'] -= amount
+        return totals
+
+    def _expected_totals(self):
+        """Mêmes compteurs attendus d'après les deux tables de transactions et les versements"""
+        totals = defaultdict(lambda: dict.fromkeys(FIELDS, Decimal('0')))
+        payments, legacy = self._paid()
+        for seller_field, queryset, net in (
+            ('seller_id', payments, PAYMENTS_NET),
+            ('order__listing__user_id', legacy, LEGACY_NET),
+        ):
+            rows = queryset.order_by().values(seller_field, 'status').annotate(net=Sum(net))
+            for row in rows:
+                seller = totals[row[seller_field]]
+                seller['total_earned'] += row['net'] or Decimal('0')
+                if row['status'] == 'refunded':
+                    seller['total_refunded'] += row['net'] or Decimal('0')
+        rows = Payout.objects.filter(status='paid').order_by().values('seller_id').annotate(amount=Sum('amount'))
+        for row in rows:
+            totals[row['seller_id']]['total_paid_out'] += row['amount']
+        return totals
+
+    def _rebuild(self, ledger):
+        with db_transaction.atomic():
+            SellerBalance.objects.bulk_create(
+                [SellerBalance(seller_id=seller_id) for seller_id in ledger], ignore_conflicts=True
+            )
+            for seller_id, fields in ledger.items():
+                SellerBalance.objects.filter(seller_id=seller_id).update(**fields)
+            SellerBalance.objects.exclude(seller_id__in=list(ledger)).update(**dict.fromkeys(FIELDS, Decimal('0')))
+        self.stdout.write(f"🔄 {len(ledger)} solde(s) vendeur recalculé(s)")
@@ -0,0 +1,72 @@
+# payments/management/commands/settle_payouts.py
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, time as dt_time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from e_sugu.workers import run_in_worker
+from payments.models import Payout
+from payments.services.payout_service import PayoutService, settlement_cutoff
+
+
+class Command(BaseCommand):
+    help = "Verser aux vendeurs leurs transactions complétées (un transfert Stripe par vendeur)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help='Fin de la fenêtre de règlement (AAAA-MM-JJ), par défaut maintenant - délai de rétention')
+        parser.add_argument('--seller', type=int, action='append', dest='sellers', help='Limiter à un vendeur (répétable)')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'PAYOUT_WORKERS', 4))
+        parser.add_argument('--dry-run', action='store_true', help='Afficher les totaux sans rien verser')
+
+    def handle(self, *args, **options):
+        until = self._until(options['until'])
+        plan = PayoutService.plan(until, options['sellers'])
+
+        if options['dry_run']:
+            total = sum((row.amount or Decimal('0') for row in plan), Decimal('0'))
+            for row in plan:
+                self.stdout.write(
+                    f"  vendeur {row.seller_id}: {row.transaction_count} transaction(s), "
+                    f"brut {row.gross_amount}, commission {row.commission}, net {row.amount}"
+                )
+            self.stdout.write(f"🔎 [dry-run] {len(plan)} vendeur(s), {total} à verser (fenêtre jusqu'au {until:%Y-%m-%d %H:%M})")
+            return
+
+        pending = Payout.objects.filter(status='pending')
+        if options['sellers']:
+            pending = pending.filter(seller_id__in=options['sellers'])
+        seller_ids = sorted({row.seller_id for row in plan} | set(pending.values_list('seller_id', flat=True)))
+        if not seller_ids:
+            self.stdout.write("✅ Aucun versement à effectuer")
+            return
+
+        self.stdout.write(f"🔄 Règlement de {len(seller_ids)} vendeur(s) avec {options['workers']} worker(s)")
+        paid, failed, amount = 0, 0, Decimal('0')
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='payouts') as executor:
+            futures = {executor.submit(run_in_worker, PayoutService.settle_seller, seller_id, until): seller_id for seller_id in seller_ids}
+            for future in as_completed(futures):
+                try:
+                    payouts = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"❌ Vendeur {futures[future]}: {e}")
+                    continue
+                for payout in payouts:
+                    if payout.status == 'paid':
+                        paid += 1
+                        amount += payout.amount
+                    elif payout.status == 'failed':
+                        failed += 1
+
+        self.stdout.write(f"✅ {paid} versement(s) effectué(s) pour {amount}, {failed} échec(s)")
+
+    def _until(self, value):
+        if not value:
+            return settlement_cutoff()
+        try:
+            day = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError("--until attend une date AAAA-MM-JJ")
+        return timezone.make_aware(datetime.combine(day, dt_time.min))
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0011_stripeevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('gross_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('commission', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('currency', models.CharField(default='xof', max_length=3)),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'En cours'), ('paid', 'Versé'), ('failed', 'Échoué')], default='pending', max_length=10)),
+                ('stripe_transfer_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('failure_reason', models.TextField(blank=True)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payouts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Versement vendeur',
+                'verbose_name_plural': 'Versements vendeurs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='payout',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='payments.payout'),
+        ),
+        migrations.AddIndex(
+            model_name='payout',
+            index=models.Index(fields=['seller', 'status'], name='payout_seller_status_idx'),
+        ),
+    ]
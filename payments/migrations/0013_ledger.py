@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:50
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0012_payout'),
+        ('users', '0024_vendordailystats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerBalance',
+            fields=[
+                ('seller', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger_balance', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12)),
+                ('total_earned', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12)),
+                ('total_commission', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12)),
+                ('total_refunded', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12)),
+                ('total_paid_out', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Solde vendeur',
+                'verbose_name_plural': 'Soldes vendeurs',
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posting_id', models.UUIDField(db_index=True)),
+                ('account', models.CharField(max_length=64)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('entry_type', models.CharField(choices=[('payment', 'Paiement'), ('commission', 'Commission'), ('refund', 'Remboursement'), ('commission_reversal', 'Commission remboursée'), ('payout', 'Versement')], max_length=20)),
+                ('reference', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('seller', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Écriture comptable',
+                'verbose_name_plural': 'Écritures comptables',
+                'indexes': [models.Index(fields=['seller', 'entry_type'], name='ledger_seller_type_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reference', 'entry_type', 'account'), name='ledger_entry_once')],
+            },
+        ),
+    ]
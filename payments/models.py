@@ -37,7 +37,8 @@ class Transaction(models.Model):
             ('requires_action', 'Action requise'),
             ('processing', 'En traitement'),
             ('canceled', 'Annulé'),
-            ('transferred', 'Transféré au vendeur')  # Nouveau statut
+            ('transferred', 'Transféré au vendeur'),  # Nouveau statut
+            ('refund_required', 'À rembourser'),  # Payée mais stock épuisé à la finalisation
         ],
         default='pending' 
     )
@@ -100,6 +101,13 @@ class Transaction(models.Model):
         blank=True,
         related_name='transactions'
     )
+    payout = models.ForeignKey(
+        'payments.Payout',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='transactions'
+    )
     
     def create_order_after_payment(self):
         """Créer une commande après paiement réussi"""
@@ -130,7 +138,8 @@ class Transaction(models.Model):
                     quantity=self.quantity,
                     price=self.amount
                 )
-                self.listing.mark_as_sold(self.quantity)
+                from .services.reservation_service import ReservationService
+                ReservationService.commit(self)
                 self.order = order
                 self.save()
                 from notifications.models import Notification
@@ -147,6 +156,197 @@ class Transaction(models.Model):
                 return self.create_order_fallback()
         return self.order
     
+class StockReservation(models.Model):
+    """
+    Unités bloquées pendant la fenêtre de paiement Stripe.
+    Le compteur dénormalisé `Listing.quantity_reserved` est tenu à jour par
+    `ReservationService` ; les réservations actives expirées sont libérées
+    par la commande `expire_stock_reservations`.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('converted', 'Convertie en vente'),
+        ('released', 'Libérée'),
+        ('expired', 'Expirée'),
+    ]
+
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='stock_reservations')
+    buyer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+    transaction = models.OneToOneField(
+        Transaction,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reservation'
+    )
+    quantity = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    stripe_payment_intent_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Réservation de stock'
+        verbose_name_plural = 'Réservations de stock'
+        indexes = [
+            # Balayage des réservations expirées
+            models.Index(fields=['status', 'expires_at'], name='stock_resa_status_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Réservation {self.id} - {self.listing_id} x{self.quantity} ({self.status})"
+
+    @property
+    def is_expired(self):
+        return self.status == 'active' and self.expires_at <= timezone.now()
+
+
+class StripeEvent(models.Model):
+    """
+    Boîte de réception des webhooks Stripe : l'événement brut est enregistré
+    puis acquitté tout de suite, et traité ensuite par un worker
+    (voir payments/services/event_inbox.py). La contrainte unique sur
+    `event_id` absorbe les renvois de Stripe.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('processed', 'Traité'),
+        ('ignored', 'Ignoré'),
+        ('failed', 'Échoué'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payment_intent_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    stripe_created = models.DateTimeField(null=True, blank=True)  # Horodatage Stripe : ordre de traitement
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Événement Stripe'
+        verbose_name_plural = 'Événements Stripe'
+        indexes = [
+            # File du worker
+            models.Index(fields=['status', 'stripe_created'], name='stripe_event_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} - {self.type} ({self.status})"
+
+
+class Payout(models.Model):
+    """
+    Versement groupé à un vendeur : toutes ses transactions complétées d'une
+    fenêtre de règlement, payées par un seul transfert Stripe Connect
+    (voir payments/services/payout_service.py).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'En cours'),
+        ('paid', 'Versé'),
+        ('failed', 'Échoué'),
+    ]
+
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payouts')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)  # Total net versé au vendeur
+    gross_amount = models.DecimalField(max_digits=12, decimal_places=2)  # Total payé par les acheteurs
+    commission = models.DecimalField(max_digits=12, decimal_places=2)
+    transaction_count = models.PositiveIntegerField(default=0)
+    currency = models.CharField(max_length=3, default='xof')
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    stripe_transfer_id = models.CharField(max_length=255, null=True, blank=True)
+    failure_reason = models.TextField(blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Versement vendeur'
+        verbose_name_plural = 'Versements vendeurs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['seller', 'status'], name='payout_seller_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Versement {self.id} - {self.seller_id} {self.amount} {self.currency} ({self.status})"
+
+    @property
+    def idempotency_key(self):
+        """Stable pour un versement : relancer le transfert ne paie jamais deux fois"""
+        return f"payout:{self.pk}"
+
+
+class LedgerEntry(models.Model):
+    """
+    Écriture du grand livre en partie double (voir payments/services/ledger_service.py).
+    Les écritures d'une même opération partagent un `posting_id` et leur somme
+    est nulle. Montant signé : positif = crédit du compte.
+    """
+    TYPE_CHOICES = [
+        ('payment', 'Paiement'),
+        ('commission', 'Commission'),
+        ('refund', 'Remboursement'),
+        ('commission_reversal', 'Commission remboursée'),
+        ('payout', 'Versement'),
+    ]
+
+    posting_id = models.UUIDField(db_index=True)
+    account = models.CharField(max_length=64)  # 'seller:<id>', 'platform:clearing', ...
+    seller = models.ForeignKey(
+        User,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='ledger_entries'
+    )
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    entry_type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    reference = models.CharField(max_length=100)  # 'payments.transaction:<id>', 'payments.payout:<id>', ...
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Écriture comptable'
+        verbose_name_plural = 'Écritures comptables'
+        constraints = [
+            # Une opération n'est jamais passée deux fois
+            models.UniqueConstraint(fields=['reference', 'entry_type', 'account'], name='ledger_entry_once'),
+        ]
+        indexes = [
+            models.Index(fields=['seller', 'entry_type'], name='ledger_seller_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.account} {self.amount:+} ({self.entry_type} {self.reference})"
+
+
+class SellerBalance(models.Model):
+    """
+    Solde courant d'un vendeur, tenu à jour à chaque écriture sur son compte :
+    le portefeuille se lit en une ligne au lieu d'agréger tout l'historique.
+    """
+    seller = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='ledger_balance')
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))  # Dû au vendeur
+    total_earned = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))  # Net des ventes
+    total_commission = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))
+    total_refunded = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))
+    total_paid_out = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Solde vendeur'
+        verbose_name_plural = 'Soldes vendeurs'
+
+    def __str__(self):
+        return f"Solde {self.seller_id}: {self.balance}"
+
+
 def create_order_fallback(self):
     """Approche simple pour créer une commande (fallback)"""
     try:
@@ -0,0 +1,254 @@
+# payments/services/checkout_service.py
+"""
+Finalisation d'un paiement de panier : un PaymentIntent Stripe couvre
+plusieurs transactions (une par article du panier).
+
+Tout le lot est traité dans une seule transaction BDD :
+- verrou consultatif Postgres sur le PaymentIntent : la confirmation du
+  client et le webhook Stripe ne traitent jamais le même paiement en
+  parallèle, le second appel ne voit plus de transaction en attente ;
+- commandes et lignes de commande créées par bulk_create, numéro de
+  commande dérivé de la transaction (contrainte unique en dernier recours) ;
+- transactions passées en 'completed' en un bulk_update ;
+- stock décrémenté une seule fois, par un UPDATE conditionnel par annonce
+  (ListingQuerySet.sell_reserved pour les unités réservées, sell sinon) ;
+  si le stock manque, la commande passe en 'failed' et la transaction en
+  'refund_required' (payée mais à rembourser), l'acheteur est prévenu ;
+- notifications des vendeurs créées en un bulk_create ;
+- paiements et commissions passés au grand livre en un INSERT.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+
+from commandes.models import Order, OrderItem
+from listings.models import Listing
+from notifications.models import Notification
+from paniers.models import PanierItem
+from .ledger_service import LedgerService
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = 'checkout:'
+# Statuts d'une transaction dont le paiement n'est pas encore finalisé.
+# 'failed' en fait partie : Stripe accepte une nouvelle tentative sur le même PaymentIntent
+OPEN_STATUSES = ('pending', 'requires_payment_method', 'requires_confirmation', 'requires_action', 'processing', 'failed')
+# Statuts d'une transaction finalisée par CheckoutService
+FINALIZED_STATUSES = ('completed', 'refund_required')
+
+
+@dataclass
+class CheckoutResult:
+    orders: list
+    transactions_completed: int
+    items_removed: int = 0
+    already_processed: bool = False
+    refund_required: list = field(default_factory=list)  # commandes payées mais sans stock
+
+
+def order_number(transaction):
+    """Un seul numéro possible par transaction : une seconde commande violerait la contrainte unique"""
+    return f"ORD-{transaction.pk}"
+
+
+def lock_payment_intent(payment_intent_id):
+    """Verrou consultatif libéré automatiquement à la fin de la transaction BDD"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [LOCK_PREFIX + payment_intent_id])
+
+
+class CheckoutService:
+    """Transforme les transactions en attente d'un PaymentIntent réussi en commandes"""
+
+    @staticmethod
+    def finalize(payment_intent_id, buyer=None):
+        """
+        Idempotent : un PaymentIntent déjà finalisé renvoie ses commandes
+        existantes sans rien réécrire. `buyer` restreint aux transactions de
+        l'acheteur (confirmation côté client) ; None pour le webhook.
+        """
+        from payments.models import Transaction
+
+        transactions = Transaction.objects.filter(stripe_payment_intent_id=payment_intent_id)
+        if buyer is not None:
+            transactions = transactions.filter(buyer=buyer)
+
+        with db_transaction.atomic():
+            lock_payment_intent(payment_intent_id)
+            pending = list(
+                transactions.filter(status__in=OPEN_STATUSES)
+                .select_related('listing', 'order')
+                .select_for_update(of=('self',))
+                .order_by('pk')
+            )
+            if not pending:
+                orders = list(Order.objects.filter(
+                    pk__in=transactions.filter(status__in=FINALIZED_STATUSES).values('order_id')
+                ).order_by('pk'))
+                completed = [order for order in orders if order.status != 'failed']
+                return CheckoutResult(
+                    orders=completed, transactions_completed=len(completed), already_processed=True,
+                    refund_required=[order for order in orders if order.status == 'failed'],
+                )
+
+            now = timezone.now()
+            CheckoutService._create_orders(pending, now)
+            sold_out, unsold = CheckoutService._apply_stock(pending, now)
+            unsold_ids = {transaction.pk for transaction in unsold}
+            completed = [transaction for transaction in pending if transaction.pk not in unsold_ids]
+
+            for transaction in pending:
+                transaction.status = 'refund_required' if transaction.pk in unsold_ids else 'completed'
+                transaction.updated_at = now
+            Transaction.objects.bulk_update(pending, ['status', 'order', 'updated_at'])
+            if unsold:
+                Order.objects.filter(pk__in=[transaction.order_id for transaction in unsold]).update(
+                    status='failed', updated_at=now
+                )
+                for transaction in unsold:
+                    transaction.order.status = 'failed'
+                logger.warning(f"⚠️ Paiement {payment_intent_id}: {len(unsold)} commande(s) sans stock, à rembourser")
+            LedgerService.record_payments(completed)
+
+            CheckoutService._notify(completed, sold_out, unsold)
+            items_removed, _ = PanierItem.objects.filter(
+                panier__user_id=pending[0].buyer_id,
+                listing_id__in={transaction.listing_id for transaction in completed},
+            ).delete()
+            CheckoutService._schedule_refreshes(pending)
+
+        logger.info(f"✅ Paiement {payment_intent_id} finalisé - {len(completed)} commande(s)")
+        return CheckoutResult(
+            orders=[transaction.order for transaction in completed],
+            transactions_completed=len(completed),
+            items_removed=items_removed,
+            refund_required=[transaction.order for transaction in unsold],
+        )
+
+    @staticmethod
+    def _create_orders(pending, now):
+        """Créer les commandes manquantes et confirmer celles qui existent déjà"""
+        existing = [transaction.order_id for transaction in pending if transaction.order_id]
+        if existing:
+            Order.objects.filter(pk__in=existing).update(status='confirmed', updated_at=now)
+
+        new = [transaction for transaction in pending if not transaction.order_id]
+        orders = Order.objects.bulk_create([
+            Order(
+                buyer_id=transaction.buyer_id,
+                user_id=transaction.buyer_id,
+                listing_id=transaction.listing_id,
+                quantity=transaction.quantity,
+                total_price=transaction.total_amount or transaction.amount * transaction.quantity,
+                status='confirmed',
+                order_number=order_number(transaction),
+                shipping_address="À définir",
+                customer_notes="Paiement en ligne",
+            )
+            for transaction in new
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, listing_id=transaction.listing_id, quantity=transaction.quantity, price=transaction.amount)
+            for transaction, order in zip(new, orders)
+        ])
+        for transaction, order in zip(new, orders):
+            transaction.order = order
+
+    @staticmethod
+    def _apply_stock(pending, now):
+        """
+        Réservations actives → vente (sell_reserved), transactions sans
+        réservation → vente classique (sell). Une réservation déjà convertie
+        a déjà été vendue. Retourne (annonces épuisées par ce paiement,
+        transactions dont le stock n'a pas pu être vendu).
+        """
+        from payments.models import StockReservation
+
+        reservations = list(
+            StockReservation.objects.select_for_update()
+            .filter(transaction__in=pending, status__in=['active', 'converted'])
+            .only('id', 'listing_id', 'quantity', 'status', 'transaction_id')
+        )
+        covered = {reservation.transaction_id for reservation in reservations}
+        active = [reservation for reservation in reservations if reservation.status == 'active']
+        if active:
+            StockReservation.objects.filter(pk__in=[reservation.pk for reservation in active]).update(
+                status='converted', updated_at=now
+            )
+
+        held = {reservation.transaction_id: reservation.quantity for reservation in active}
+        reserved, direct = defaultdict(list), defaultdict(list)
+        for transaction in pending:
+            if transaction.pk in held:
+                reserved[transaction.listing_id].append(transaction)
+            elif transaction.pk not in covered:
+                direct[transaction.listing_id].append(transaction)
+
+        def quantity(transactions):
+            return sum(held.get(transaction.pk, transaction.quantity) for transaction in transactions)
+
+        sold, unsold = [], []
+        # Ordre stable des verrous de ligne, comme ReservationService.hold
+        for listing_id in sorted(set(reserved) | set(direct)):
+            listings = Listing.objects.filter(pk=listing_id)
+            to_sell = list(direct[listing_id])
+            if reserved[listing_id]:
+                if listings.sell_reserved(quantity(reserved[listing_id])):
+                    sold.append(listing_id)
+                else:
+                    # Compteur de réservation incohérent : on retombe sur une vente classique
+                    to_sell += reserved[listing_id]
+            if not to_sell:
+                continue
+            if listings.sell(quantity(to_sell)):
+                sold.append(listing_id)
+            else:
+                logger.error(f"❌ Stock épuisé à la confirmation du paiement pour l'annonce {listing_id}")
+                unsold += to_sell
+
+        sold_out = set(Listing.objects.filter(pk__in=sold, status='out_of_stock').values_list('pk', flat=True))
+        return sold_out, unsold
+
+    @staticmethod
+    def _notify(completed, sold_out, unsold):
+        """Vendeurs : nouvelles commandes et ruptures ; acheteur : commandes à rembourser"""
+        notifications = [
+            Notification(
+                user_id=transaction.seller_id,
+                type='order',
+                content=f'Nouvelle commande #{transaction.order.id} pour "{transaction.listing.title}"',
+            )
+            for transaction in completed
+        ]
+        notifications += [
+            Notification(
+                user_id=transaction.buyer_id,
+                type='order',
+                content=f'❌ Commande #{transaction.order.id} annulée : "{transaction.listing.title}" n\'est plus en stock. Vous allez être remboursé.',
+            )
+            for transaction in unsold
+        ]
+        listings = {transaction.listing_id: transaction.listing for transaction in completed}
+        notifications += [
+            Notification(
+                user_id=listings[listing_id].user_id,
+                type='listing',
+                content=f'⚠️ Votre produit "{listings[listing_id].title}" est maintenant épuisé. Veuillez réapprovisionner.',
+            )
+            for listing_id in sorted(sold_out)
+        ]
+        Notification.objects.bulk_create(notifications)
+
+    @staticmethod
+    def _schedule_refreshes(pending):
+        """bulk_create / update ne déclenchent pas post_save : rollups vendeurs et dashboards"""
+        from administration.dashboard_cache import invalidate
+        from users.vendor_stats import schedule_refresh
+
+        now = timezone.now()
+        for seller_id in {transaction.listing.user_id for transaction in pending}:
+            schedule_refresh(seller_id, now, 'orders')
+        db_transaction.on_commit(lambda: invalidate('orders', 'transactions', 'listings'))
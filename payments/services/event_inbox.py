@@ -0,0 +1,144 @@
+# payments/services/event_inbox.py
+"""
+Boîte de réception des webhooks Stripe.
+
+Le webhook ne fait qu'enregistrer l'événement brut (StripeEvent, unique par
+id Stripe) et répond 200 immédiatement ; le traitement se fait ensuite :
+- après le commit, dans un thread ('async'), ou dans la requête ('sync') ;
+- par la commande `process_stripe_events` (worker, et rattrapage des
+  événements en échec) ; avec STRIPE_EVENT_PROCESSING='off' c'est le seul.
+
+Chaque événement met à jour en un UPDATE toutes les transactions du
+PaymentIntent (un panier = plusieurs transactions). payment_intent.succeeded
+déclenche la finalisation des commandes (CheckoutService, idempotent).
+Les événements sont traités dans l'ordre de leur création chez Stripe.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from e_sugu.workers import submit
+
+from .checkout_service import OPEN_STATUSES, CheckoutService
+from .reservation_service import ReservationService
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+
+# Statut local des transactions pour les événements qui ne finalisent pas le paiement
+INTENT_STATUSES = {
+    'payment_intent.processing': 'processing',
+    'payment_intent.requires_action': 'requires_action',
+    'payment_intent.payment_failed': 'failed',
+    'payment_intent.canceled': 'canceled',
+}
+# Le stock bloqué est libéré sans attendre l'expiration de la réservation
+RELEASING_EVENTS = ('payment_intent.payment_failed', 'payment_intent.canceled')
+
+
+def processing_mode():
+    return getattr(settings, 'STRIPE_EVENT_PROCESSING', 'async')
+
+
+def payment_intent_of(event):
+    obj = event['data']['object']
+    if obj.get('object') == 'payment_intent':
+        return obj.get('id')
+    return obj.get('payment_intent')
+
+
+def record(event):
+    """
+    Persister un événement Stripe (dict déjà vérifié par la signature).
+    Retourne (StripeEvent, created) ; un renvoi du même événement n'est pas dupliqué.
+    """
+    from payments.models import StripeEvent
+
+    created_at = event.get('created')
+    stripe_event, created = StripeEvent.objects.get_or_create(
+        event_id=event['id'],
+        defaults={
+            'type': event['type'],
+            'payment_intent_id': payment_intent_of(event),
+            'payload': event,
+            'stripe_created': datetime.fromtimestamp(created_at, tz=dt_timezone.utc) if created_at else None,
+        },
+    )
+    if created:
+        schedule()
+    return stripe_event, created
+
+
+def apply(stripe_event):
+    """Appliquer un événement aux transactions de son PaymentIntent"""
+    from payments.models import Transaction
+
+    payment_intent_id = stripe_event.payment_intent_id
+    if not payment_intent_id or not (
+        stripe_event.type == 'payment_intent.succeeded' or stripe_event.type in INTENT_STATUSES
+    ):
+        return False
+
+    if stripe_event.type == 'payment_intent.succeeded':
+        CheckoutService.finalize(payment_intent_id)
+        return True
+
+    # Un paiement finalisé (ou remboursé) ne revient jamais en arrière
+    updated = Transaction.objects.filter(
+        stripe_payment_intent_id=payment_intent_id, status__in=OPEN_STATUSES
+    ).update(status=INTENT_STATUSES[stripe_event.type], updated_at=timezone.now())
+    if stripe_event.type in RELEASING_EVENTS:
+        ReservationService.release_for_payment_intent(payment_intent_id)
+    logger.info(f"💳 {stripe_event.type} - {updated} transaction(s) du paiement {payment_intent_id}")
+    return True
+
+
+def process(stripe_event):
+    """Traiter un événement verrouillé ; une erreur est comptée et retentée plus tard"""
+    try:
+        with db_transaction.atomic():
+            handled = apply(stripe_event)
+    except Exception as e:
+        stripe_event.attempts += 1
+        stripe_event.last_error = str(e)
+        if stripe_event.attempts >= MAX_ATTEMPTS:
+            stripe_event.status = 'failed'
+        stripe_event.save(update_fields=['attempts', 'last_error', 'status'])
+        logger.error(f"❌ Événement Stripe {stripe_event.event_id} ({stripe_event.type}): {e}")
+        return False
+
+    stripe_event.status = 'processed' if handled else 'ignored'
+    stripe_event.processed_at = timezone.now()
+    stripe_event.save(update_fields=['status', 'processed_at'])
+    return True
+
+
+def process_pending(batch_size=100, payment_intent_id=None):
+    """
+    Traiter un lot d'événements en attente (tous, ou ceux d'un PaymentIntent).
+    Les lignes déjà prises par un autre worker sont ignorées (SKIP LOCKED).
+    Retourne le nombre d'événements traités avec succès.
+    """
+    from payments.models import StripeEvent
+
+    queryset = StripeEvent.objects.filter(status='pending')
+    if payment_intent_id:
+        queryset = queryset.filter(payment_intent_id=payment_intent_id)
+
+    with db_transaction.atomic():
+        events = list(
+            queryset.order_by('stripe_created', 'pk').select_for_update(skip_locked=True)[:batch_size]
+        )
+        return sum(process(stripe_event) for stripe_event in events)
+
+
+def schedule():
+    """Traitement après le commit de l'enregistrement, selon STRIPE_EVENT_PROCESSING"""
+    mode = processing_mode()
+    if mode == 'sync':
+        db_transaction.on_commit(process_pending)
+    elif mode == 'async':
+        db_transaction.on_commit(lambda: submit('stripe-events', process_pending))
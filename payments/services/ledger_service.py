@@ -0,0 +1,197 @@
+# payments/services/ledger_service.py
+"""
+Grand livre en partie double des paiements.
+
+Comptes :
+- 'seller:<id>'         : ce que la plateforme doit au vendeur ;
+- 'platform:clearing'   : fonds encaissés chez Stripe pour le compte des vendeurs ;
+- 'platform:commission' : commissions de la plateforme ;
+- 'platform:payouts'    : montants transférés aux vendeurs (Stripe Connect).
+
+Opérations (chacune = écritures de somme nulle sous un même posting_id) :
+- paiement      : clearing -brut, vendeur +brut ; vendeur -commission, commission +commission
+- remboursement : l'inverse (refund + commission_reversal)
+- versement     : vendeur -montant, payouts +montant
+
+Les deux modèles de transaction (payments.Transaction pour Stripe,
+transactions.Transaction pour l'ancien flux de commande) sont passés au
+grand livre. Chaque écriture sur un compte vendeur met à jour SellerBalance
+dans la même transaction BDD : le solde se lit en O(1).
+La contrainte unique (référence, type, compte) rend chaque opération
+idempotente ; `reconcile_ledger` vérifie le tout contre les deux tables.
+"""
+import logging
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+CLEARING = 'platform:clearing'
+COMMISSION = 'platform:commission'
+PAYOUTS = 'platform:payouts'
+ZERO = Decimal('0')
+
+
+def seller_account(seller_id):
+    return f"seller:{seller_id}"
+
+
+def reference(obj):
+    """'payments.transaction:12', 'transactions.transaction:3', 'payments.payout:5'"""
+    return f"{obj._meta.label_lower}:{obj.pk}"
+
+
+def figures(transaction):
+    """(vendeur, brut payé par l'acheteur, net vendeur) pour les deux modèles de transaction"""
+    if transaction._meta.label_lower == 'transactions.transaction':
+        seller_id = transaction.order.listing.user_id
+        gross = transaction.amount or ZERO
+        commission = transaction.commission or ZERO
+    else:
+        seller_id = transaction.seller_id
+        gross = transaction.total_amount
+        if gross is None:
+            gross = (transaction.amount or ZERO) * transaction.quantity
+        commission = transaction.commission or ZERO
+    net = transaction.net_amount if transaction.net_amount is not None else gross - commission
+    return seller_id, Decimal(gross), Decimal(net)
+
+
+class Posting:
+    """Écritures équilibrées d'une opération, et leur effet sur les soldes vendeurs"""
+
+    def __init__(self, entry_type, ref):
+        from payments.models import LedgerEntry
+
+        self.model = LedgerEntry
+        self.ref = ref
+        self.entry_type = entry_type
+        self.posting_id = uuid.uuid4()
+        self.entries = []
+
+    def add(self, account, amount, entry_type=None, seller_id=None):
+        if amount:
+            self.entries.append(self.model(
+                posting_id=self.posting_id,
+                account=account,
+                seller_id=seller_id,
+                amount=amount,
+                entry_type=entry_type or self.entry_type,
+                reference=self.ref,
+            ))
+        return self
+
+    def transfer(self, debit, credit, amount, entry_type=None, seller_id=None):
+        """Débiter `debit` et créditer `credit` du même montant ; `seller_id` va au compte vendeur"""
+        self.add(debit, -amount, entry_type, seller_id if debit.startswith('seller:') else None)
+        self.add(credit, amount, entry_type, seller_id if credit.startswith('seller:') else None)
+        return self
+
+
+def _apply_balances(deltas):
+    """Un UPDATE par vendeur : incréments des compteurs du solde"""
+    from payments.models import SellerBalance
+
+    SellerBalance.objects.bulk_create(
+        [SellerBalance(seller_id=seller_id) for seller_id in deltas], ignore_conflicts=True
+    )
+    for seller_id, fields in deltas.items():
+        SellerBalance.objects.filter(seller_id=seller_id).update(
+            **{field: F(field) + amount for field, amount in fields.items()}
+        )
+
+
+def _post(postings, deltas):
+    """Écrire des opérations et leurs soldes ; False si l'une d'elles existe déjà"""
+    from payments.models import LedgerEntry
+
+    entries = [entry for posting in postings for entry in posting.entries]
+    for posting in postings:
+        if sum(entry.amount for entry in posting.entries) != 0:
+            raise ValueError(f"Écritures déséquilibrées: {posting.ref}")
+    try:
+        with db_transaction.atomic():
+            LedgerEntry.objects.bulk_create(entries)
+            _apply_balances(deltas)
+    except IntegrityError:
+        return False
+    return True
+
+
+def _already_posted(refs, entry_type):
+    from payments.models import LedgerEntry
+    return set(
+        LedgerEntry.objects.filter(reference__in=refs, entry_type=entry_type)
+        .values_list('reference', flat=True).distinct()
+    )
+
+
+class LedgerService:
+
+    @staticmethod
+    def record_payments(transactions):
+        """Paiements (et commissions) d'un lot de transactions, en un INSERT ; les déjà passés sont ignorés"""
+        transactions = list(transactions)
+        done = _already_posted([reference(transaction) for transaction in transactions], 'payment')
+        postings, deltas = [], defaultdict(lambda: defaultdict(Decimal))
+        for transaction in transactions:
+            ref = reference(transaction)
+            if ref in done:
+                continue
+            seller_id, gross, net = figures(transaction)
+            account = seller_account(seller_id)
+            postings.append(
+                Posting('payment', ref)
+                .transfer(CLEARING, account, gross, seller_id=seller_id)
+                .transfer(account, COMMISSION, gross - net, 'commission', seller_id=seller_id)
+            )
+            deltas[seller_id]['balance'] += net
+            deltas[seller_id]['total_earned'] += net
+            deltas[seller_id]['total_commission'] += gross - net
+        if not postings:
+            return 0
+        if _post(postings, deltas):
+            return len(postings)
+        if len(transactions) == 1:
+            return 0
+        # Écriture concurrente sur l'un des paiements : reprise un par un
+        return sum(LedgerService.record_payments([transaction]) for transaction in transactions)
+
+    @staticmethod
+    def record_refund(transaction):
+        """Contre-passation d'un paiement remboursé (le paiement est passé d'abord s'il manque)"""
+        LedgerService.record_payments([transaction])
+        ref = reference(transaction)
+        if _already_posted([ref], 'refund'):
+            return False
+        seller_id, gross, net = figures(transaction)
+        account = seller_account(seller_id)
+        posting = (
+            Posting('refund', ref)
+            .transfer(account, CLEARING, gross, seller_id=seller_id)
+            .transfer(COMMISSION, account, gross - net, 'commission_reversal', seller_id=seller_id)
+        )
+        return _post([posting], {seller_id: {
+            'balance': -net, 'total_refunded': net, 'total_commission': -(gross - net),
+        }})
+
+    @staticmethod
+    def record_payout(payout):
+        """Versement au vendeur : son solde diminue du montant transféré"""
+        ref = reference(payout)
+        if _already_posted([ref], 'payout'):
+            return False
+        posting = Posting('payout', ref).transfer(
+            seller_account(payout.seller_id), PAYOUTS, payout.amount, seller_id=payout.seller_id
+        )
+        return _post([posting], {payout.seller_id: {'balance': -payout.amount, 'total_paid_out': payout.amount}})
+
+    @staticmethod
+    def balance(seller):
+        """Solde courant du vendeur (une ligne), à zéro s'il n'a encore rien vendu"""
+        from payments.models import SellerBalance
+        return SellerBalance.objects.filter(seller=seller).first() or SellerBalance(seller=seller)
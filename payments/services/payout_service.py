@@ -0,0 +1,178 @@
+# payments/services/payout_service.py
+"""
+Versements groupés aux vendeurs (Stripe Connect).
+
+Une fenêtre de règlement regroupe, par vendeur, toutes les transactions
+'completed' pas encore versées et complétées avant `until` (délai de
+rétention pour les remboursements : PAYOUT_SETTLEMENT_DELAY_DAYS).
+
+Pour chaque vendeur :
+1. claim()   : verrouille ses transactions (SKIP LOCKED), crée le Payout et
+               les y rattache en un UPDATE, puis commit ;
+2. execute() : un seul transfert Stripe, clé d'idempotence dérivée du Payout,
+               hors transaction BDD (pas de verrou pendant l'appel réseau) ;
+               puis Payout 'paid' et transactions 'transferred' en un UPDATE.
+
+Un Payout resté 'pending' (arrêt entre le transfert et l'écriture, Stripe
+indisponible) est repris par execute() avec la même clé : Stripe renvoie
+le transfert déjà créé au lieu d'en créer un second. Seul un refus définitif
+de Stripe (REFUSAL_ERRORS) passe le Payout en 'failed' et libère ses
+transactions pour la fenêtre suivante ; après une erreur réseau, 5xx ou 429,
+le transfert a pu être créé : le Payout reste 'pending' et sera repris.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+import stripe
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from users.models import User
+from .ledger_service import LedgerService
+from .stripe_service import StripeService, StripeUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Refus définitifs (4xx) : aucun transfert n'a été créé avec cette clé d'idempotence
+REFUSAL_ERRORS = (stripe.InvalidRequestError, stripe.PermissionError, stripe.CardError)
+
+
+@dataclass
+class SellerTotals:
+    seller_id: int
+    amount: Decimal
+    gross_amount: Decimal
+    commission: Decimal
+    transaction_count: int
+    period_start: object
+    period_end: object
+
+
+def settlement_cutoff(now=None):
+    """Fin de la fenêtre : les transactions plus récentes restent remboursables"""
+    return (now or timezone.now()) - timedelta(days=getattr(settings, 'PAYOUT_SETTLEMENT_DELAY_DAYS', 7))
+
+
+def eligible_transactions(until):
+    from payments.models import Transaction
+    return Transaction.objects.filter(status='completed', payout__isnull=True, updated_at__lt=until)
+
+
+class PayoutService:
+
+    @staticmethod
+    def plan(until, seller_ids=None):
+        """Totaux par vendeur de la fenêtre, en une agrégation (sert aussi au dry-run)"""
+        transactions = eligible_transactions(until)
+        if seller_ids:
+            transactions = transactions.filter(seller_id__in=seller_ids)
+        rows = (
+            transactions.order_by().values('seller_id')
+            .annotate(
+                amount=Sum('net_amount'),
+                gross_amount=Sum('total_amount'),
+                commission=Sum('commission'),
+                transaction_count=Count('id'),
+                period_start=Min('updated_at'),
+                period_end=Max('updated_at'),
+            )
+            .order_by('seller_id')
+        )
+        return [SellerTotals(**row) for row in rows]
+
+    @staticmethod
+    def claim(seller_id, until):
+        """Créer le Payout du vendeur et y rattacher ses transactions ; None s'il n'y a rien à verser"""
+        from payments.models import Payout, Transaction
+
+        seller = User.objects.only('id', 'stripe_account_id').get(pk=seller_id)
+        if not seller.stripe_account_id:
+            logger.warning(f"⚠️ Vendeur {seller_id} sans compte Stripe Connect : versement reporté")
+            return None
+
+        with db_transaction.atomic():
+            rows = list(
+                eligible_transactions(until).filter(seller_id=seller_id)
+                .select_for_update(skip_locked=True)
+                .values_list('pk', 'net_amount', 'total_amount', 'commission', 'updated_at')
+            )
+            if not rows:
+                return None
+            payout = Payout.objects.create(
+                seller_id=seller_id,
+                amount=sum((row[1] or Decimal('0') for row in rows), Decimal('0')),
+                gross_amount=sum((row[2] or Decimal('0') for row in rows), Decimal('0')),
+                commission=sum((row[3] or Decimal('0') for row in rows), Decimal('0')),
+                transaction_count=len(rows),
+                period_start=min(row[4] for row in rows),
+                period_end=until,
+            )
+            Transaction.objects.filter(pk__in=[row[0] for row in rows]).update(payout=payout)
+        return payout
+
+    @staticmethod
+    def execute(payout):
+        """Transférer le montant du Payout et marquer ses transactions ; rejouable sans double paiement"""
+        from payments.models import Payout, Transaction
+
+        if payout.status != 'pending':
+            return payout
+        seller = User.objects.only('id', 'stripe_account_id').get(pk=payout.seller_id)
+
+        try:
+            transfer = StripeService.transfer_to_seller(
+                payout.amount,
+                seller.stripe_account_id,
+                currency=payout.currency,
+                idempotency_key=payout.idempotency_key,
+                metadata={'payout_id': str(payout.pk), 'transactions': str(payout.transaction_count)},
+            )
+        except StripeUnavailableError:
+            # Stripe indisponible : le Payout reste en cours, repris au prochain passage
+            logger.warning(f"⏸️ Versement {payout.pk} reporté : Stripe indisponible")
+            return payout
+        except ValidationError as e:
+            if not isinstance(e.__cause__, REFUSAL_ERRORS):
+                # Issue inconnue : le transfert a pu être créé, la reprise réutilise la même clé
+                logger.warning(f"⏸️ Versement {payout.pk} reporté, transfert à reprendre: {e}")
+                return payout
+            with db_transaction.atomic():
+                Payout.objects.filter(pk=payout.pk).update(
+                    status='failed', failure_reason=str(e), updated_at=timezone.now()
+                )
+                Transaction.objects.filter(payout=payout).update(payout=None)
+            payout.status, payout.failure_reason = 'failed', str(e)
+            logger.error(f"❌ Versement {payout.pk} échoué pour le vendeur {payout.seller_id}: {e}")
+            return payout
+
+        now = timezone.now()
+        with db_transaction.atomic():
+            Payout.objects.filter(pk=payout.pk).update(
+                status='paid', stripe_transfer_id=transfer.id, paid_at=now, updated_at=now
+            )
+            Transaction.objects.filter(payout=payout).update(
+                status='transferred', stripe_transfer_id=transfer.id, updated_at=now
+            )
+            LedgerService.record_payout(payout)
+        payout.status, payout.stripe_transfer_id, payout.paid_at = 'paid', transfer.id, now
+        logger.info(f"✅ Versement {payout.pk}: {payout.amount} {payout.currency} → vendeur {payout.seller_id} ({transfer.id})")
+        return payout
+
+    @staticmethod
+    def settle_seller(seller_id, until):
+        """Reprendre les versements en cours du vendeur, puis verser la nouvelle fenêtre"""
+        from payments.models import Payout
+
+        payouts = [
+            PayoutService.execute(payout)
+            for payout in Payout.objects.filter(seller_id=seller_id, status='pending').order_by('pk')
+        ]
+        payout = PayoutService.claim(seller_id, until)
+        if payout:
+            payouts.append(PayoutService.execute(payout))
+        return payouts
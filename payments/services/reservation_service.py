@@ -0,0 +1,154 @@
+# payments/services/reservation_service.py
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from listings.models import Listing
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStockError(ValidationError):
+    """Le stock disponible (hors réservations) ne suffit pas"""
+
+    def __init__(self, listing, quantity):
+        self.listing = listing
+        self.quantity = quantity
+        super().__init__(f"Quantité insuffisante pour {listing.title}. Stock disponible: {listing.available_quantity}")
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 900))
+
+
+class ReservationService:
+    """
+    Réservations de stock pendant la fenêtre de paiement Stripe.
+
+    hold()    : bloque les quantités (UPDATE conditionnel sur Listing.quantity_reserved)
+    commit()  : transforme la réservation en vente à la confirmation du paiement
+    release() : libère les unités (nouvelle tentative, échec, expiration)
+    """
+
+    @staticmethod
+    def hold(buyer, items, ttl=None):
+        """
+        Réserver atomiquement une liste de (listing, quantité).
+        Tout ou rien : lève InsufficientStockError si une annonce n'a plus assez de stock.
+        """
+        from payments.models import StockReservation
+
+        expires_at = timezone.now() + (ttl or reservation_ttl())
+        # Ordre stable des verrous de ligne : évite les interblocages entre deux paniers
+        items = sorted(items, key=lambda item: item[0].pk)
+
+        with db_transaction.atomic():
+            reservations = []
+            for listing, quantity in items:
+                if not Listing.objects.filter(pk=listing.pk).reserve(quantity):
+                    listing.refresh_from_db(fields=['quantity', 'quantity_sold', 'quantity_reserved'])
+                    raise InsufficientStockError(listing, quantity)
+                reservations.append(StockReservation(
+                    listing=listing,
+                    buyer=buyer,
+                    quantity=quantity,
+                    expires_at=expires_at,
+                ))
+            StockReservation.objects.bulk_create(reservations)
+
+        logger.info(f"🔒 {len(reservations)} réservation(s) de stock jusqu'à {expires_at:%H:%M:%S} - User: {buyer.id}")
+        return reservations
+
+    @staticmethod
+    def attach(reservations, transactions, payment_intent_id):
+        """Rattacher chaque réservation à la transaction de la même annonce"""
+        from payments.models import StockReservation
+
+        by_listing = {transaction.listing_id: transaction for transaction in transactions}
+        for reservation in reservations:
+            reservation.transaction = by_listing.get(reservation.listing_id)
+            reservation.stripe_payment_intent_id = payment_intent_id
+        StockReservation.objects.bulk_update(reservations, ['transaction', 'stripe_payment_intent_id'])
+
+    @staticmethod
+    def commit(transaction):
+        """
+        Transformer la réservation de la transaction en vente. Idempotent :
+        une réservation déjà convertie n'est pas vendue deux fois.
+        Si la réservation a expiré, on retombe sur une vente classique.
+        """
+        from payments.models import StockReservation
+
+        with db_transaction.atomic():
+            reservation = StockReservation.objects.select_for_update().filter(transaction=transaction).first()
+            if reservation and reservation.status == 'converted':
+                return True
+            if reservation and reservation.status == 'active':
+                reservation.status = 'converted'
+                reservation.save(update_fields=['status', 'updated_at'])
+                if transaction.listing.sell_reserved(reservation.quantity):
+                    return True
+
+        sold = transaction.listing.mark_as_sold(transaction.quantity)
+        if not sold:
+            logger.error(f"❌ Réservation expirée et stock épuisé pour transaction {transaction.id} ({transaction.listing_id})")
+        return sold
+
+    @staticmethod
+    def release(reservations, status='released', limit=None):
+        """
+        Libérer les réservations actives d'un queryset (ou d'une liste).
+        Les lignes verrouillées par une confirmation en cours sont ignorées.
+        Retourne le nombre de réservations libérées.
+        """
+        from payments.models import StockReservation
+
+        if not hasattr(reservations, 'filter'):
+            reservations = StockReservation.objects.filter(pk__in=[r.pk for r in reservations])
+
+        with db_transaction.atomic():
+            queryset = reservations.filter(status='active').order_by('pk').select_for_update(skip_locked=True)
+            if limit:
+                queryset = queryset[:limit]
+            rows = list(queryset.values_list('pk', 'listing_id', 'quantity'))
+            if not rows:
+                return 0
+
+            StockReservation.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+                status=status, updated_at=timezone.now()
+            )
+            per_listing = defaultdict(int)
+            for _, listing_id, quantity in rows:
+                per_listing[listing_id] += quantity
+            for listing_id in sorted(per_listing):
+                Listing.objects.filter(pk=listing_id).unreserve(per_listing[listing_id])
+
+        return len(rows)
+
+    @staticmethod
+    def release_for_buyer(buyer):
+        """Une nouvelle tentative de paiement remplace les réservations précédentes"""
+        from payments.models import StockReservation
+        return ReservationService.release(StockReservation.objects.filter(buyer=buyer))
+
+    @staticmethod
+    def release_for_payment_intent(payment_intent_id):
+        from payments.models import StockReservation
+        return ReservationService.release(
+            StockReservation.objects.filter(stripe_payment_intent_id=payment_intent_id)
+        )
+
+    @staticmethod
+    def expire(now=None, batch_size=1000):
+        """Libérer les réservations actives dont le délai est dépassé (par lots)"""
+        from payments.models import StockReservation
+        return ReservationService.release(
+            StockReservation.objects.filter(expires_at__lte=now or timezone.now()),
+            status='expired',
+            limit=batch_size,
+        )
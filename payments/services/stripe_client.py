@@ -0,0 +1,204 @@
+# payments/services/stripe_client.py
+"""
+Client HTTP partagé pour les appels à l'API Stripe.
+
+- un seul StripeClient par processus, sur une session requests dont le pool
+  de connexions keep-alive est partagé entre les threads ;
+- délais bornés (connexion / lecture) et nouvelles tentatives du SDK
+  (backoff exponentiel, en-tête Stripe-Should-Retry respecté) ;
+- clé d'idempotence sur chaque écriture : une nouvelle tentative ne crée
+  jamais un second objet chez Stripe ;
+- disjoncteur partagé via le cache : après STRIPE_CIRCUIT_THRESHOLD erreurs
+  réseau / 5xx / 429 consécutives, les appels échouent immédiatement pendant
+  STRIPE_CIRCUIT_COOLDOWN secondes au lieu d'attendre les délais ;
+- histogramme des latences par opération (compteurs dans le cache, lus par
+  `latency_histograms()` et exposés par StripeMetricsView).
+
+STRIPE_API_BASE permet de viser un serveur local (stripe-mock, tests).
+"""
+import logging
+import threading
+import time
+import uuid
+
+import requests
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = (
+    'payment_intents.create',
+    'payment_intents.retrieve',
+    'payment_intents.confirm',
+    'payment_intents.cancel',
+    'refunds.create',
+    'transfers.create',
+    'accounts.create',
+)
+# Bornes supérieures des classes de l'histogramme (millisecondes)
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+LATENCY_KEY = 'stripe:latency:{operation}:{bucket}'
+FAILURES_KEY = 'stripe:circuit:failures'
+OPEN_KEY = 'stripe:circuit:open'
+
+# Erreurs qui traduisent une dégradation de Stripe (et non une requête refusée)
+DEGRADED_ERRORS = (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class StripeUnavailableError(ValidationError):
+    """Disjoncteur ouvert : Stripe est considéré comme indisponible"""
+
+    def __init__(self):
+        super().__init__("Service de paiement momentanément indisponible, réessayez dans quelques instants")
+
+
+def build_client():
+    pool_size = getattr(settings, 'STRIPE_HTTP_POOL_SIZE', 10)
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    base_addresses = {}
+    if getattr(settings, 'STRIPE_API_BASE', ''):
+        base_addresses['api'] = settings.STRIPE_API_BASE
+    return stripe.StripeClient(
+        settings.STRIPE_SECRET_KEY,
+        base_addresses=base_addresses,
+        max_network_retries=getattr(settings, 'STRIPE_MAX_NETWORK_RETRIES', 2),
+        http_client=stripe.RequestsClient(
+            timeout=(
+                getattr(settings, 'STRIPE_CONNECT_TIMEOUT', 3),
+                getattr(settings, 'STRIPE_READ_TIMEOUT', 15),
+            ),
+            session=session,
+        ),
+    )
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = build_client()
+        return _client
+
+
+def reset_client():
+    """Oublier le client (changement de configuration, tests)"""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+# =============================================
+# DISJONCTEUR
+# =============================================
+
+def circuit_is_open():
+    return bool(cache.get(OPEN_KEY))
+
+
+def record_success():
+    cache.delete(FAILURES_KEY)
+
+
+def record_failure():
+    threshold = getattr(settings, 'STRIPE_CIRCUIT_THRESHOLD', 5)
+    cooldown = getattr(settings, 'STRIPE_CIRCUIT_COOLDOWN', 30)
+    cache.add(FAILURES_KEY, 0, cooldown * 2)
+    try:
+        failures = cache.incr(FAILURES_KEY)
+    except ValueError:
+        cache.set(FAILURES_KEY, 1, cooldown * 2)
+        failures = 1
+    if failures >= threshold:
+        cache.set(OPEN_KEY, True, cooldown)
+        # Demi-ouvert après le délai : le premier échec suivant rouvre aussitôt
+        cache.set(FAILURES_KEY, threshold - 1, cooldown * 2)
+        logger.error(f"🔌 Disjoncteur Stripe ouvert pour {cooldown}s après {failures} erreur(s)")
+
+
+# =============================================
+# LATENCES
+# =============================================
+
+def bucket_for(elapsed_ms):
+    for bound in LATENCY_BUCKETS:
+        if elapsed_ms <= bound:
+            return str(bound)
+    return '+Inf'
+
+
+def _incr(key, delta=1):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+
+
+def observe(operation, elapsed_ms):
+    _incr(LATENCY_KEY.format(operation=operation, bucket=bucket_for(elapsed_ms)))
+    _incr(LATENCY_KEY.format(operation=operation, bucket='sum_ms'), int(elapsed_ms))
+
+
+def latency_histograms():
+    """{opération: {'buckets': {borne: cumul}, 'count': n, 'sum_ms': total}} (format Prometheus)"""
+    bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+    keys = {
+        (operation, bucket): LATENCY_KEY.format(operation=operation, bucket=bucket)
+        for operation in OPERATIONS for bucket in bounds + ['sum_ms']
+    }
+    values = cache.get_many(keys.values())
+    histograms = {}
+    for operation in OPERATIONS:
+        cumulative, buckets = 0, {}
+        for bound in bounds:
+            cumulative += values.get(keys[(operation, bound)], 0)
+            buckets[bound] = cumulative
+        histograms[operation] = {
+            'buckets': buckets,
+            'count': cumulative,
+            'sum_ms': values.get(keys[(operation, 'sum_ms')], 0),
+        }
+    return histograms
+
+
+# =============================================
+# APPELS
+# =============================================
+
+def call(operation, *args, idempotency_key=None, **params):
+    """
+    Appeler `client.v1.<operation>` (ex. 'payment_intents.create').
+    Les écritures reçoivent une clé d'idempotence (générée si absente).
+    Lève StripeUnavailableError si le disjoncteur est ouvert ; les erreurs
+    Stripe sont propagées telles quelles à l'appelant.
+    """
+    if circuit_is_open():
+        raise StripeUnavailableError()
+
+    service = get_client().v1
+    resource, method = operation.split('.')
+    options = {}
+    if method not in ('retrieve', 'list'):
+        options['idempotency_key'] = idempotency_key or f"{operation}:{uuid.uuid4()}"
+
+    start = time.perf_counter()
+    try:
+        result = getattr(getattr(service, resource), method)(*args, params=params, options=options)
+    except DEGRADED_ERRORS:
+        record_failure()
+        raise
+    finally:
+        observe(operation, (time.perf_counter() - start) * 1000)
+    record_success()
+    return result
@@ -5,6 +5,8 @@ import logging
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from decimal import Decimal
+from . import stripe_client
+from .stripe_client import StripeUnavailableError
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
@@ -53,7 +55,7 @@ class StripeService:
             return int(amount * 100)
 
     @staticmethod
-    def create_payment_intent(amount, currency='xof', payment_method_types=['card'], **kwargs):
+    def create_payment_intent(amount, currency='xof', payment_method_types=['card'], idempotency_key=None, **kwargs):
         """
         Créer un PaymentIntent Stripe
         """
@@ -66,7 +68,9 @@ class StripeService:
             
             logger.info(f"🔄 Création PaymentIntent: {amount} {currency} (Stripe: {stripe_amount})")
             
-            payment_intent = stripe.PaymentIntent.create(
+            payment_intent = stripe_client.call(
+                'payment_intents.create',
+                idempotency_key=idempotency_key,
                 amount=stripe_amount,
                 currency=currency,
                 payment_method_types=payment_method_types,
@@ -91,9 +95,11 @@ class StripeService:
             raise ValidationError(f"Erreur lors du traitement du paiement: {str(e)}")
 
     @staticmethod
-    def create_payment_intent_for_mobile(amount, phone, payment_method, currency='xof'):
+    def create_payment_intent_for_mobile(amount, phone, payment_method, currency='xof', metadata=None, idempotency_key=None):
         """
-        Créer un PaymentIntent pour les paiements mobiles
+        Créer un PaymentIntent pour les paiements mobiles.
+        `metadata` complète (ou remplace) les métadonnées par défaut dans le
+        même appel : pas de PaymentIntent.modify ensuite.
         """
         try:
             logger.info(f"🔄 Création PaymentIntent mobile: {amount} {currency} pour {phone}")
@@ -102,10 +108,12 @@ class StripeService:
                 amount=amount,
                 currency=currency,
                 payment_method_types=['card'],
+                idempotency_key=idempotency_key,
                 metadata={
                     'phone': phone,
                     'payment_method': payment_method,
-                    'payment_type': 'mobile'
+                    'payment_type': 'mobile',
+                    **(metadata or {}),
                 }
             )
             
@@ -125,7 +133,8 @@ class StripeService:
             if payment_method_id:
                 confirm_params['payment_method'] = payment_method_id
                 
-            payment_intent = stripe.PaymentIntent.confirm(
+            payment_intent = stripe_client.call(
+                'payment_intents.confirm',
                 payment_intent_id,
                 **confirm_params
             )
@@ -139,12 +148,12 @@ class StripeService:
         Récupérer un PaymentIntent
         """
         try:
-            return stripe.PaymentIntent.retrieve(payment_intent_id)
+            return stripe_client.call('payment_intents.retrieve', payment_intent_id)
         except stripe.error.StripeError as e:
             raise ValidationError(f"Erreur de récupération: {str(e)}")
 
     @staticmethod
-    def create_refund(payment_intent_id, amount=None):
+    def create_refund(payment_intent_id, amount=None, idempotency_key=None):
         """
         Créer un remboursement
         """
@@ -154,7 +163,7 @@ class StripeService:
                 # Pour XOF, le montant est déjà en unités entières
                 refund_data['amount'] = int(amount)
                 
-            refund = stripe.Refund.create(**refund_data)
+            refund = stripe_client.call('refunds.create', idempotency_key=idempotency_key, **refund_data)
             return refund
         except stripe.error.StripeError as e:
             raise ValidationError(f"Erreur de remboursement: {str(e)}")
@@ -165,7 +174,8 @@ class StripeService:
         Créer un compte Connect pour un vendeur (pour les marketplaces)
         """
         try:
-            account = stripe.Account.create(
+            account = stripe_client.call(
+                'accounts.create',
                 type='express',
                 country=country,
                 email=email,
@@ -244,13 +254,13 @@ class StripeService:
         Annuler un PaymentIntent
         """
         try:
-            payment_intent = stripe.PaymentIntent.cancel(payment_intent_id)
+            payment_intent = stripe_client.call('payment_intents.cancel', payment_intent_id)
             return payment_intent
         except stripe.error.StripeError as e:
             raise ValidationError(f"Erreur d'annulation: {str(e)}")
     
     @staticmethod
-    def transfer_to_seller(amount, destination_account_id, currency='xof'):
+    def transfer_to_seller(amount, destination_account_id, currency='xof', idempotency_key=None, **kwargs):
         """
         Transférer de l'argent à un vendeur via Stripe Connect
         """
@@ -258,10 +268,13 @@ class StripeService:
             # Convertir le montant selon les règles Stripe
             stripe_amount = StripeService.get_stripe_amount(amount, currency)
             
-            transfer = stripe.Transfer.create(
+            transfer = stripe_client.call(
+                'transfers.create',
+                idempotency_key=idempotency_key,
                 amount=stripe_amount,
                 currency=currency,
                 destination=destination_account_id,
+                **kwargs
             )
             
             logger.info(f"✅ Transfert effectué: {transfer.id} - {amount} {currency} vers {destination_account_id}")
@@ -269,4 +282,5 @@ class StripeService:
             
         except stripe.error.StripeError as e:
             logger.error(f"❌ Erreur transfert: {e}")
-            raise ValidationError(f"Erreur lors du transfert: {str(e)}")
\ No newline at end of file
+            # L'erreur Stripe reste accessible (__cause__) : un refus n'est pas une panne réseau
+            raise ValidationError(f"Erreur lors du transfert: {str(e)}") from e
\ No newline at end of file
@@ -1,5 +1,6 @@
 from django.urls import path
 from .views import *
+from .webhooks import stripe_webhook
 
 urlpatterns = [
     path('', TransactionView.as_view(), name='transactions'),
@@ -8,5 +9,7 @@ urlpatterns = [
     path('<int:id>/refund/', RefundView.as_view(), name='refund'),
     path('confirm/', PaymentConfirmationView.as_view(), name='confirm-payment'),
     path('clear-cart/', ClearCartAfterPaymentView.as_view(), name='clear-cart'),  # Nouvelle route
+    path('webhook/', stripe_webhook, name='stripe-webhook'),
+    path('stripe-metrics/', StripeMetricsView.as_view(), name='stripe-metrics'),
    
 ]
\ No newline at end of file
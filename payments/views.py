@@ -22,7 +22,7 @@ import stripe
 import logging
 from decimal import Decimal
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
@@ -32,7 +32,12 @@ from .models import Transaction
 from listings.models import Listing
 from paniers.models import Panier, PanierItem  # Import des modèles panier
 from .serializers import TransactionSerializer, CreateTransactionSerializer, PaymentConfirmationSerializer
-from .services.stripe_service import StripeService
+from .services.stripe_service import StripeService, StripeUnavailableError
+from .services.reservation_service import ReservationService
+from .services import event_inbox, stripe_client
+from .services.checkout_service import FINALIZED_STATUSES, OPEN_STATUSES, CheckoutService
+from .services.ledger_service import LedgerService
+from e_sugu.pagination import KeysetPagination, pagination_requested
 
 logger = logging.getLogger(__name__)
 
@@ -109,6 +114,9 @@ class TransactionView(APIView):
             print(f"🛒 Panier trouvé: {panier_items.count()} articles")
             for item in panier_items:
                 print(f"  - {item.listing.title} x{item.quantity}")
+
+            # Une nouvelle tentative remplace les réservations de la précédente
+            ReservationService.release_for_buyer(request.user)
             
             # VALIDATION DU PANIER
             can_create, validation_message = panier.can_create_order()
@@ -139,21 +147,31 @@ class TransactionView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+            # RÉSERVATION DU STOCK pendant la fenêtre de paiement (tout ou rien)
+            reservations = ReservationService.hold(
+                request.user,
+                [(item.listing, item.quantity) for item in panier_items]
+            )
+
             # CRÉATION DU PAIEMENT STRIPE
             phone_full = f"{request.user.country_code}{request.user.phone}"
             
-            payment_intent = StripeService.create_payment_intent_for_mobile(
-                amount=total_amount,
-                phone=phone_full,  # Utilisation de 'phone' au lieu de 'phone_number'
-                payment_method=payment_method
-            )
-            stripe.PaymentIntent.modify(
-                payment_intent.id,
-                metadata={
-                    'user_id': str(request.user.id),
-                    'payment_type': 'panier'
-                }
-            )
+            try:
+                # Métadonnées envoyées avec la création (un seul aller-retour Stripe) ;
+                # la clé d'idempotence suit la réservation : un renvoi réseau ne crée pas un second paiement
+                payment_intent = StripeService.create_payment_intent_for_mobile(
+                    amount=total_amount,
+                    phone=phone_full,  # Utilisation de 'phone' au lieu de 'phone_number'
+                    payment_method=payment_method,
+                    metadata={
+                        'user_id': str(request.user.id),
+                        'payment_type': 'panier'
+                    },
+                    idempotency_key=f"panier:{request.user.id}:{reservations[0].pk}"
+                )
+            except Exception:
+                ReservationService.release(reservations)
+                raise
             
             # CRÉATION DES TRANSACTIONS DANS UNE TRANSACTION BDD
             with db_transaction.atomic():
@@ -192,6 +210,8 @@ class TransactionView(APIView):
                     
                     logger.info(f"✅ Transaction créée: {transaction.id} - {panier_item.listing.title} x{panier_item.quantity}")
                 
+                ReservationService.attach(reservations, transactions, payment_intent.id)
+
                 # VIDER LE PANIER après création des transactions
                
                 logger.info(f"🛒 Panier vidé après création des transactions")
@@ -207,6 +227,7 @@ class TransactionView(APIView):
                 'total_net_amount': float(total_net_amount),
                 'items_count': len(transactions),
                 'currency': 'xof',
+                'reservation_expires_at': reservations[0].expires_at.isoformat() if reservations else None,
                 'items': [
                     {
                         'listing_id': t.listing.id,
@@ -229,6 +250,12 @@ class TransactionView(APIView):
                 {'error': 'Panier non trouvé'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        except StripeUnavailableError as e:
+            logger.error(f"❌ Stripe indisponible: {e}")
+            return Response(
+                {'error': e.message},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
         except ValidationError as e:
             logger.error(f"❌ Erreur de validation: {e}")
             return Response(
@@ -250,6 +277,10 @@ class TransactionView(APIView):
         """
         try:
             transactions = Transaction.objects.filter(buyer=request.user) | Transaction.objects.filter(seller=request.user)
+            if pagination_requested(request):
+                paginator = KeysetPagination()
+                page = paginator.paginate_queryset(transactions.order_by('-created_at'), request)
+                return paginator.get_paginated_response(TransactionSerializer(page, many=True).data)
             serializer = TransactionSerializer(transactions, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Exception as e:
@@ -274,94 +305,46 @@ class PaymentConfirmationView(APIView):
         payment_intent_id = serializer.validated_data['payment_intent_id']
 
         try:
-            # 🔥 Toujours filtrer uniquement les transactions en attente
             transactions = Transaction.objects.filter(
                 stripe_payment_intent_id=payment_intent_id,
                 buyer=request.user,
-                status='pending'
             )
+            statuses = set(transactions.values_list('status', flat=True))
 
-            logger.info(f"📊 Transactions en attente trouvées: {transactions.count()}")
-
-            if not transactions.exists():
+            if not statuses & {*OPEN_STATUSES, *FINALIZED_STATUSES}:
                 logger.warning(f"⚠️ Aucune transaction en attente trouvée pour {payment_intent_id}")
                 return Response(
                     {'error': 'Aucune transaction en attente trouvée'},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # 🔥 Vérifier l'état Stripe
-            payment_intent = StripeService.retrieve_payment_intent(payment_intent_id)
+            # 🔥 État local, tenu à jour par les webhooks Stripe : pas d'appel réseau ici.
+            # Un événement déjà reçu mais pas encore traité l'est tout de suite
+            if not statuses & set(FINALIZED_STATUSES) and event_inbox.process_pending(payment_intent_id=payment_intent_id):
+                statuses = set(transactions.values_list('status', flat=True))
 
-            if payment_intent.status != 'succeeded':
+            if not statuses & set(FINALIZED_STATUSES):
+                local_status = next((s for s in ('failed', 'canceled', 'requires_action') if s in statuses), 'processing')
                 return Response({
-                    'status': payment_intent.status,
-                    'message': f"Paiement en statut: {payment_intent.status}"
+                    'status': local_status,
+                    'message': f"Paiement en statut: {local_status}"
                 }, status=status.HTTP_200_OK)
 
-            # 🔥 Paiement OK → traitement atomique
-            with db_transaction.atomic():
-
-                orders_created = []
-                order_numbers = []
-                
-                for transaction in transactions:
-                    # Mettre la transaction en completed
-                    transaction.status = 'completed'
-                    transaction.save()
-
-                    # 🎯 CASE 1 : Une commande existe déjà → on confirme juste
-                    if transaction.order:
-                        transaction.order.status = 'confirmed'
-                        transaction.order.save()
-
-                        orders_created.append(transaction.order)
-                        order_numbers.append(transaction.order.order_number)
-
-                    else:
-                        # 🎯 CASE 2 : Créer une nouvelle commande
-                        try:
-                            order = transaction.create_order_after_payment()
-                        
-
-                            if order:
-                                orders_created.append(order)
-                                order_numbers.append(order.order_number)
-                                logger.info(f"✅ Commande créée #{order.id}")
-                            else:
-                                logger.error(f"❌ Impossible de créer une commande pour transaction {transaction.id}")
-                        except Exception as e:
-                            logger.error(f"❌ Erreur création commande: {e}")
-                            logger.info("➡️ Tentative fallback…")
-                            order = transaction.create_order_fallback()
-                            continue
-                    # 🔥 Mise à jour du listing vendu
-                    try:
-                        transaction.listing.mark_as_sold(transaction.quantity)
-                    except Exception as e:
-                        logger.error(f"❌ Erreur mise à jour annonce: {e}")
-
-                # 🔥 Vider le panier
-                try:
-                    panier = Panier.objects.get(user=request.user)
-                    items_removed = panier.items.count()
-                    panier.items.all().delete()
-                    panier_vide = True
-                    logger.info(f"🛒 Panier vidé ({items_removed} articles)")
-                except Panier.DoesNotExist:
-                    panier_vide = False
-                    items_removed = 0
-                    logger.warning("⚠️ Aucun panier trouvé")
+            # 🔥 Paiement OK → commandes déjà créées par le webhook, ou finalisées ici.
+            # Idempotent : une nouvelle tentative renvoie les mêmes commandes
+            result = CheckoutService.finalize(payment_intent_id, buyer=request.user)
 
             # 🔥 Réponse complète
             return Response({
                 'status': 'succeeded',
-                'message': f'Paiement confirmé - {len(orders_created)} commande(s) traitée(s)',
-                'transactions_completed': transactions.count(),
-                'orders_created': [order.id for order in orders_created],
-                'orders_numbers': order_numbers,
-                'panier_vide': panier_vide,
-                'items_removed': items_removed
+                'message': f'Paiement confirmé - {len(result.orders)} commande(s) traitée(s)',
+                'transactions_completed': result.transactions_completed,
+                'orders_created': [order.id for order in result.orders],
+                'orders_numbers': [order.order_number for order in result.orders],
+                'panier_vide': result.items_removed > 0,
+                'items_removed': result.items_removed,
+                'already_processed': result.already_processed,
+                'refund_required': [order.id for order in result.refund_required],
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -371,6 +354,16 @@ class PaymentConfirmationView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+class StripeMetricsView(APIView):
+    """Latences des appels Stripe par opération et état du disjoncteur"""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'circuit_open': stripe_client.circuit_is_open(),
+            'latency': stripe_client.latency_histograms(),
+        }, status=status.HTTP_200_OK)
+
 class TransactionDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -412,24 +405,31 @@ class RefundView(APIView):
             if request.user != transaction.seller:  # Seul le vendeur peut initier un remboursement
                 return Response({'error': 'Non autorisé'}, status=status.HTTP_403_FORBIDDEN)
 
-            if transaction.status != 'completed':
+            if transaction.status not in ('completed', 'refund_required'):
                 return Response(
                     {'error': 'Seules les transactions complétées peuvent être remboursées'}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Effectuer le remboursement Stripe
-            refund = StripeService.create_refund(transaction.stripe_payment_intent_id)
-            
+            # Rembourser uniquement cette ligne : le PaymentIntent couvre tout le panier
+            refund = StripeService.create_refund(
+                transaction.stripe_payment_intent_id,
+                amount=transaction.total_amount,
+                idempotency_key=f"refund:{transaction.pk}",
+            )
+            was_sold = transaction.status == 'completed'
+
             # Mettre à jour la transaction
             transaction.status = 'refunded'
             transaction.stripe_refund_id = refund.id
             transaction.save()
+            LedgerService.record_refund(transaction)
 
-            # Réactiver l'annonce
-            listing = transaction.listing
-            listing.status = 'active'
-            listing.save()
+            # Réactiver l'annonce (refund_required : la vente n'a jamais eu lieu, rien à rétablir)
+            if was_sold:
+                listing = transaction.listing
+                listing.status = 'active'
+                listing.save()
 
             return Response({
                 'status': 'refunded',
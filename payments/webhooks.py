@@ -4,18 +4,25 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 import stripe
 import json
+import logging
 from django.conf import settings
-from .models import Transaction
+from .services import event_inbox
+
+logger = logging.getLogger(__name__)
 
 @csrf_exempt
 @require_POST
 def stripe_webhook(request):
+    """
+    Vérifier la signature, enregistrer l'événement et acquitter tout de suite.
+    Le traitement est fait hors de la requête (voir payments/services/event_inbox.py) :
+    Stripe n'attend pas, et un renvoi du même événement est sans effet.
+    """
     payload = request.body
-    sig_header = request.META['HTTP_STRIPE_SIGNATURE']
-    event = None
+    sig_header = request.META.get('HTTP_STRIPE_SIGNATURE', '')
 
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
     except ValueError as e:
@@ -23,36 +30,8 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError as e:
         return HttpResponse(status=400)
 
-    # Gérer les événements
-    if event['type'] == 'payment_intent.succeeded':
-        payment_intent = event['data']['object']
-        handle_payment_intent_succeeded(payment_intent)
-    elif event['type'] == 'payment_intent.payment_failed':
-        payment_intent = event['data']['object']
-        handle_payment_intent_failed(payment_intent)
+    stripe_event, created = event_inbox.record(json.loads(payload))
+    if not created:
+        logger.info(f"↩️ Événement Stripe déjà reçu: {stripe_event.event_id}")
 
     return HttpResponse(status=200)
-
-def handle_payment_intent_succeeded(payment_intent):
-    try:
-        transaction = Transaction.objects.get(
-            stripe_payment_intent_id=payment_intent['id']
-        )
-        transaction.status = 'completed'
-        transaction.save()
-        
-        # Marquer l'annonce comme vendue
-        transaction.listing.status = 'sold'
-        transaction.listing.save()
-    except Transaction.DoesNotExist:
-        pass
-
-def handle_payment_intent_failed(payment_intent):
-    try:
-        transaction = Transaction.objects.get(
-            stripe_payment_intent_id=payment_intent['id']
-        )
-        transaction.status = 'failed'
-        transaction.save()
-    except Transaction.DoesNotExist:
-        pass
\ No newline at end of file
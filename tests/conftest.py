@@ -0,0 +1,15 @@
+# tests/conftest.py
+
+import pytest
+from users.models import User
+
+
+@pytest.fixture
+def make_user(db):
+    """Créer un utilisateur ; le numéro complet est dérivé de `phone` (+223)"""
+    def make(email, phone, **kwargs):
+        kwargs.setdefault('first_name', "Test")
+        kwargs.setdefault('last_name', "User")
+        kwargs.setdefault('phone_full', f"+223{phone}")
+        return User.objects.create_user(email=email, password="testpass123", phone=phone, **kwargs)
+    return make
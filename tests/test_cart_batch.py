@@ -0,0 +1,78 @@
+# tests/test_cart_batch.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from categories.models import Category
+from listings.models import Listing
+from paniers.models import Panier, PanierItem
+
+URL = "/api/paniers/batch/"
+
+
+@pytest.fixture
+def cart(make_user):
+    seller = make_user("vendeur@example.com", "70000001")
+    buyer = make_user("acheteur@example.com", "70000002")
+    category = Category.objects.create(name="Mode")
+    listings = [
+        Listing.objects.create(
+            user=seller, category=category, title=f"Robe {i}", description="Annonce de test",
+            price=1000, condition='new', quantity=3,
+        )
+        for i in range(4)
+    ]
+    own = Listing.objects.create(
+        user=buyer, category=category, title="Mon sac", description="Annonce de test",
+        price=500, condition='new', quantity=3,
+    )
+    panier = Panier.objects.create(user=buyer)
+    PanierItem.objects.create(panier=panier, listing=listings[0], quantity=1)
+    PanierItem.objects.create(panier=panier, listing=listings[1], quantity=2)
+    client = APIClient()
+    client.force_authenticate(buyer)
+    return client, panier, listings, own
+
+
+@pytest.mark.django_db
+def test_batch_applies_valid_lines_in_one_transaction(cart):
+    client, panier, listings, own = cart
+    operations = [
+        {'listing_id': listings[0].pk, 'quantity': 3},   # mise à jour
+        {'listing_id': listings[1].pk, 'quantity': 0},   # suppression
+        {'listing_id': listings[2].pk, 'quantity': 2},   # ajout
+        {'listing_id': listings[3].pk, 'quantity': 9},   # stock insuffisant
+        {'listing_id': own.pk, 'quantity': 1},           # propre annonce
+        {'listing_id': 999999, 'quantity': 1},           # inexistante
+    ]
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.patch(URL, {'items': operations}, format='json')
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['applied'] == 3
+    assert [error['index'] for error in data['errors']] == [3, 4, 5]
+    assert data['errors'][0]['error'] == "Quantité non disponible. Stock restant: 3"
+    assert dict(panier.items.values_list('listing_id', 'quantity')) == {listings[0].pk: 3, listings[2].pk: 2}
+    assert {item['listing']['id'] for item in data['panier']['items']} == {listings[0].pk, listings[2].pk}
+    # Un seul INSERT ... ON CONFLICT pour l'ajout et la mise à jour
+    writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+    assert len([sql for sql in writes if 'paniers_panieritem' in sql]) == 2
+
+
+@pytest.mark.django_db
+def test_batch_add_mode_and_malformed_payload(cart):
+    client, panier, listings, own = cart
+
+    response = client.patch(URL, [{'listing_id': listings[0].pk, 'quantity': 1}], format='json')
+    assert response.status_code == 200
+    assert response.json()['panier']['items']
+
+    response = client.patch(URL, {'items': [{'listing_id': listings[0].pk, 'quantity': 1}], 'mode': 'add'}, format='json')
+    assert response.json()['errors'] == []
+    assert panier.items.get(listing=listings[0]).quantity == 2
+
+    assert client.patch(URL, {'items': []}, format='json').status_code == 400
+    assert client.patch(URL, {'items': [{'listing_id': 1, 'quantity': -1}]}, format='json').status_code == 400
@@ -0,0 +1,53 @@
+# tests/test_cart_summary.py
+
+import pytest
+from decimal import Decimal
+from rest_framework.test import APIClient
+from categories.models import Category
+from listings.models import Listing
+from paniers.models import Panier, PanierItem
+from paniers.summary import cart_summary
+
+
+@pytest.fixture
+def panier(make_user):
+    seller = make_user("vendeur@example.com", "70000001")
+    buyer = make_user("acheteur@example.com", "70000002")
+    category = Category.objects.create(name="Mode")
+    panier = Panier.objects.create(user=buyer)
+    for title, price, stock, wanted in [("Robe", 1000, 5, 2), ("Pagne", 2500, 3, 4), ("Sac", 500, 1, 1)]:
+        listing = Listing.objects.create(
+            user=seller, category=category, title=title, description="Annonce de test",
+            price=price, condition='new', quantity=stock,
+        )
+        PanierItem.objects.create(panier=panier, listing=listing, quantity=wanted)
+    return panier
+
+
+@pytest.mark.django_db
+def test_summary_matches_the_item_loop_in_one_query(panier, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        summary = cart_summary(panier)
+
+    assert summary.item_count == 3
+    assert summary.total_quantity == 7
+    assert summary.total_price == Decimal('12500') == panier.total_price()
+    assert (summary.can_create_order, summary.validation_message) == panier.can_create_order()
+    assert summary.validation_message == "Quantité insuffisante pour Pagne. Stock disponible: 3"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url, budget', [
+    ("/api/paniers/panier/total/", 1),
+    ("/api/paniers/panier/validate/", 2),
+    ("/api/paniers/panier/", 5),
+])
+def test_cart_endpoints_share_the_summary(panier, url, budget, django_assert_max_num_queries):
+    client = APIClient()
+    client.force_authenticate(panier.user)
+
+    with django_assert_max_num_queries(budget):
+        data = client.get(url).json()
+
+    assert data['can_create_order'] is False
+    assert float(data['total_price']) == 12500
@@ -0,0 +1,60 @@
+# tests/test_category_cache.py
+
+import pytest
+from rest_framework.test import APIClient
+from categories.models import Category
+from categories.cache import get_category_tree
+
+
+@pytest.fixture
+def tree():
+    root = Category.objects.create(name="Électronique")
+    child = Category.objects.create(name="Téléphones", parent=root)
+    return root, child
+
+
+@pytest.mark.django_db
+def test_category_endpoints_are_served_from_cache(tree, django_assert_num_queries):
+    root, child = tree
+    client = APIClient()
+    client.get("/api/categories/")  # construit l'arbre
+
+    with django_assert_num_queries(0):
+        listing = client.get("/api/categories/")
+        by_name = client.get("/api/categories/categories/électronique/")
+
+    assert [item["id"] for item in listing.json()["results"]] == [root.id]
+    assert by_name.json()["subcategories"] == [{"id": child.id, "name": "Téléphones"}]
+
+
+@pytest.mark.django_db
+def test_save_and_delete_invalidate_the_tree(tree):
+    root, child = tree
+    assert get_category_tree().descendant_ids(root.id) == [root.id, child.id]
+
+    grandchild = Category.objects.create(name="Smartphones", parent=child)
+    assert set(get_category_tree().descendant_ids_for_name("ÉLECTRONIQUE")) == {root.id, child.id, grandchild.id}
+
+    child.delete()
+    tree = get_category_tree()
+    assert tree.get(child.id) is None
+    assert tree.get(root.id)["subcategories"] == []
+
+
+@pytest.mark.django_db
+def test_process_local_cache_expires_the_version(tree, monkeypatch):
+    """Sans Redis, l'invalidation d'un autre worker est vue après LOCAL_VERSION_TIMEOUT au plus"""
+    import time
+    from types import SimpleNamespace
+    from django.core.cache.backends import locmem
+    from categories.cache import LOCAL_VERSION_TIMEOUT
+
+    root, child = tree
+    assert get_category_tree().get(child.id)["name"] == "Téléphones"
+    # Écriture faite par un autre processus : pas de signal ici, ni d'incrément visible
+    Category.objects.filter(pk=child.pk).update(name="Mobiles")
+    assert get_category_tree().get(child.id)["name"] == "Téléphones"
+
+    later = time.time() + LOCAL_VERSION_TIMEOUT + 1
+    monkeypatch.setattr(locmem, 'time', SimpleNamespace(time=lambda: later))
+    assert get_category_tree().get(child.id)["name"] == "Mobiles"
@@ -0,0 +1,67 @@
+# tests/test_category_closure.py
+
+import pytest
+from rest_framework.test import APIClient
+from categories.models import Category, CategoryClosure
+from listings.models import Listing
+
+
+@pytest.fixture
+def tree():
+    root = Category.objects.create(name="Immobilier")
+    child = Category.objects.create(name="Maisons", parent=root)
+    grandchild = Category.objects.create(name="Villas", parent=child)
+    other = Category.objects.create(name="Véhicules")
+    return root, child, grandchild, other
+
+
+@pytest.mark.django_db
+def test_descendant_ids_covers_every_level(tree):
+    root, child, grandchild, other = tree
+
+    assert set(Category.objects.descendant_ids(root)) == {root.id, child.id, grandchild.id}
+    assert set(Category.objects.descendant_ids(child)) == {child.id, grandchild.id}
+    assert set(Category.objects.descendant_ids(other)) == {other.id}
+    assert CategoryClosure.objects.get(ancestor=root, descendant=grandchild).depth == 2
+
+
+@pytest.mark.django_db
+def test_moving_a_subtree_updates_the_closure(tree):
+    root, child, grandchild, other = tree
+
+    child.parent = other
+    child.save()
+
+    assert set(Category.objects.descendant_ids(root)) == {root.id}
+    assert set(Category.objects.descendant_ids(other)) == {other.id, child.id, grandchild.id}
+    assert CategoryClosure.objects.get(ancestor=other, descendant=grandchild).depth == 2
+
+
+@pytest.mark.django_db
+def test_delete_and_rebuild(tree):
+    root, child, grandchild, other = tree
+
+    child.delete()
+    assert set(Category.objects.descendant_ids(root)) == {root.id}
+
+    CategoryClosure.objects.all().delete()
+    CategoryClosure.rebuild()
+    assert set(Category.objects.descendant_ids(root)) == {root.id}
+    assert CategoryClosure.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_category_filter_includes_deep_subcategories(tree, make_user):
+    root, child, grandchild, other = tree
+    seller = make_user("vendeur@example.com", "70000001")
+    villa = Listing.objects.create(
+        user=seller, category=grandchild, title="Villa", description="Villa", price=1000, condition='new'
+    )
+    Listing.objects.create(
+        user=seller, category=other, title="Moto", description="Moto", price=1000, condition='used'
+    )
+
+    response = APIClient().get("/api/listings/listings/", {"category": "immobilier"})
+
+    ids = [item["id"] for item in response.json()["results"]]
+    assert ids == [villa.id]
@@ -0,0 +1,138 @@
+# tests/test_checkout_finalization.py
+
+from types import SimpleNamespace
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from categories.models import Category
+from commandes.models import Order, OrderItem
+from listings.models import Listing
+from notifications.models import Notification
+from paniers.models import Panier, PanierItem
+from payments.models import LedgerEntry, StockReservation, Transaction
+from payments.services.checkout_service import CheckoutService
+from payments.services.reservation_service import ReservationService
+
+
+@pytest.fixture
+def paid_cart(make_user):
+    """Panier de 3 articles réservés et payé avec le PaymentIntent pi_test"""
+    seller = make_user("vendeur@example.com", "70000001")
+    buyer = make_user("acheteur@example.com", "70000002")
+    category = Category.objects.create(name="Mode")
+    panier = Panier.objects.create(user=buyer)
+    lines = []
+    for title, stock, wanted in [("Robe", 5, 2), ("Pagne", 1, 1), ("Sac", 3, 1)]:
+        listing = Listing.objects.create(
+            user=seller, category=category, title=title, description="Annonce de test",
+            price=1000, condition='new', quantity=stock,
+        )
+        PanierItem.objects.create(panier=panier, listing=listing, quantity=wanted)
+        lines.append((listing, wanted))
+
+    reservations = ReservationService.hold(buyer, lines)
+    transactions = [
+        Transaction.objects.create(
+            listing=listing, buyer=buyer, seller=seller, quantity=wanted,
+            amount=listing.price, stripe_payment_intent_id="pi_test",
+        )
+        for listing, wanted in lines
+    ]
+    ReservationService.attach(reservations, transactions, "pi_test")
+    return buyer, [listing for listing, _ in lines]
+
+
+@pytest.mark.django_db
+def test_finalize_creates_orders_in_bulk_and_sells_once(paid_cart):
+    buyer, listings = paid_cart
+
+    with CaptureQueriesContext(connection) as queries:
+        result = CheckoutService.finalize("pi_test", buyer=buyer)
+
+    assert (result.transactions_completed, result.items_removed) == (3, 3)
+    assert len(result.orders) == 3
+    assert OrderItem.objects.count() == 3
+    assert not Transaction.objects.exclude(status='completed').exists()
+    assert not StockReservation.objects.exclude(status='converted').exists()
+
+    stock = {pk: rest for pk, *rest in Listing.objects.values_list('pk', 'quantity_sold', 'quantity_reserved', 'status')}
+    assert stock == {
+        listings[0].pk: [2, 0, 'active'],
+        listings[1].pk: [1, 0, 'out_of_stock'],
+        listings[2].pk: [1, 0, 'active'],
+    }
+    assert Notification.objects.filter(type='order').count() == 3
+    assert Notification.objects.filter(type='listing').count() == 1
+
+    writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+    assert sum(sql.startswith('INSERT INTO "commandes_order"') for sql in writes) == 1
+    assert sum(sql.startswith('INSERT INTO "notifications_notification"') for sql in writes) == 1
+    # Un UPDATE de stock par annonce
+    assert sum(sql.startswith('UPDATE "listings_listing"') for sql in writes) == 3
+
+
+@pytest.mark.django_db
+def test_retries_and_webhook_do_not_process_twice(paid_cart):
+    buyer, listings = paid_cart
+    first = CheckoutService.finalize("pi_test", buyer=buyer)
+
+    retry = CheckoutService.finalize("pi_test", buyer=buyer)
+    webhook = CheckoutService.finalize("pi_test")
+
+    assert retry.already_processed and webhook.already_processed
+    assert retry.orders == first.orders == webhook.orders
+    assert Order.objects.count() == 3
+    listings[0].refresh_from_db()
+    assert listings[0].quantity_sold == 2
+
+
+@pytest.mark.django_db
+def test_missing_stock_fails_the_order_and_flags_it_for_refund(paid_cart):
+    buyer, listings = paid_cart
+    # Le Sac est vendu ailleurs entre-temps et la réservation du paiement n'existe plus
+    StockReservation.objects.filter(listing=listings[2]).delete()
+    Listing.objects.filter(pk=listings[2].pk).update(quantity_sold=3, quantity_reserved=0)
+
+    result = CheckoutService.finalize("pi_test", buyer=buyer)
+
+    assert (result.transactions_completed, len(result.refund_required)) == (2, 1)
+    [failed] = result.refund_required
+    assert Order.objects.get(pk=failed.pk).status == 'failed'
+    assert Transaction.objects.get(listing=listings[2]).status == 'refund_required'
+    assert Notification.objects.filter(user=buyer, type='order', content__contains="plus en stock").count() == 1
+    # Pas de paiement au grand livre ni de ligne retirée du panier pour la commande échouée
+    assert not LedgerEntry.objects.filter(reference=f"payments.transaction:{failed.transactions.get().pk}").exists()
+    assert PanierItem.objects.filter(listing=listings[2]).exists()
+
+    retry = CheckoutService.finalize("pi_test", buyer=buyer)
+    assert retry.already_processed and retry.refund_required == [failed]
+
+
+@pytest.mark.django_db
+def test_refund_covers_only_the_failed_line_of_the_cart(paid_cart, monkeypatch):
+    buyer, listings = paid_cart
+    StockReservation.objects.filter(listing=listings[2]).delete()
+    Listing.objects.filter(pk=listings[2].pk).update(quantity_sold=3, quantity_reserved=0, status='out_of_stock')
+    CheckoutService.finalize("pi_test", buyer=buyer)
+    failed = Transaction.objects.get(listing=listings[2])
+
+    calls = []
+
+    def call(operation, *args, idempotency_key=None, **params):
+        calls.append((operation, idempotency_key, params))
+        return SimpleNamespace(id="re_1")
+
+    monkeypatch.setattr('payments.services.stripe_service.stripe_client.call', call)
+    client = APIClient()
+    client.force_authenticate(failed.seller)
+    response = client.post(f"/api/payments/{failed.pk}/refund/")
+
+    assert response.status_code == 200
+    # Le montant de la ligne (1 × 1000), pas les 4000 du PaymentIntent
+    assert calls == [('refunds.create', f"refund:{failed.pk}", {'payment_intent': "pi_test", 'amount': 1000})]
+    assert Transaction.objects.get(pk=failed.pk).status == 'refunded'
+    assert Transaction.objects.filter(status='completed').count() == 2
+    # Jamais vendue : l'annonce épuisée n'est pas remise en vente
+    assert Listing.objects.get(pk=listings[2].pk).status == 'out_of_stock'
@@ -0,0 +1,58 @@
+# tests/test_dashboard_cache.py
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from administration.dashboard_cache import LOCK_KEY, cache_key
+from categories.models import Category
+from commandes.models import Order
+from listings.models import Listing
+
+URL = "/api/commandes/comprehensive/dashboard"
+
+
+@pytest.fixture
+def admin_client(make_user):
+    cache.clear()
+    client = APIClient()
+    client.force_authenticate(make_user("admin@example.com", "70000003", is_staff=True))
+    return client
+
+
+def create_order(make_user, number):
+    buyer = make_user(f"acheteur{number}@example.com", f"7100000{number}")
+    listing = Listing.objects.create(
+        user=buyer, category=Category.objects.get_or_create(name="Mode")[0], title="Robe",
+        description="Annonce de test", price=10000, condition='new', quantity=5,
+    )
+    return Order.objects.create(buyer=buyer, user=buyer, listing=listing, order_number=f"D{number}")
+
+
+@pytest.mark.django_db
+def test_dashboard_is_cached_and_invalidated_by_orders(admin_client, make_user, django_assert_num_queries, django_capture_on_commit_callbacks):
+    first = admin_client.get(URL)
+    assert first['X-Dashboard-Cache'] == 'miss'
+
+    with django_assert_num_queries(0):
+        second = admin_client.get(URL)
+    assert second['X-Dashboard-Cache'] == 'hit'
+    assert second.json() == first.json()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        create_order(make_user, 1)
+
+    third = admin_client.get(URL)
+    assert third['X-Dashboard-Cache'] == 'miss'
+    assert third.json()['summary']['total_orders'] == first.json()['summary']['total_orders'] + 1
+
+
+@pytest.mark.django_db
+def test_stale_entry_is_served_while_another_request_recomputes(admin_client, make_user):
+    request = admin_client.get(URL).wsgi_request
+    create_order(make_user, 2)
+
+    # Un autre processus a déjà pris le verrou de recalcul
+    cache.add(LOCK_KEY.format(cache_key('admin_comprehensive_dashboard', request)), True, 60)
+
+    response = admin_client.get(URL)
+    assert response['X-Dashboard-Cache'] == 'stale'
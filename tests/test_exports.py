@@ -0,0 +1,68 @@
+# tests/test_exports.py
+
+import gzip
+import json
+import os
+import pytest
+from rest_framework.test import APIClient
+from administration.exports import run_background_export
+from categories.models import Category
+from commandes.models import Order
+from listings.models import Listing
+from notifications.models import Notification
+from transactions.models import Transaction
+
+
+@pytest.fixture
+def buyer(make_user):
+    buyer = make_user("acheteur@example.com", "70000002")
+    listing = Listing.objects.create(
+        user=buyer, category=Category.objects.create(name="Mode"), title="Robe",
+        description="Annonce de test", price=10000, condition='new', quantity=50,
+    )
+    for number in range(5):
+        order = Order.objects.create(buyer=buyer, user=buyer, listing=listing, order_number=f"E{number}")
+        Transaction.objects.create(order=order, buyer=buyer, amount=10000, paymenet_method='momo')
+    return buyer
+
+
+def read(response):
+    content = b''.join(response.streaming_content)
+    if response['Content-Type'] == 'application/gzip':
+        content = gzip.decompress(content)
+    return content.decode('utf-8')
+
+
+@pytest.mark.django_db
+def test_order_export_streams_csv_in_one_query_per_chunk(buyer, django_assert_max_num_queries):
+    client = APIClient()
+    client.force_authenticate(buyer)
+
+    with django_assert_max_num_queries(1):
+        lines = read(client.get("/api/commandes/export/", {"compress": "gzip"})).splitlines()
+
+    assert lines[0].startswith("ID,Numéro de commande")
+    assert len(lines) == 6
+    assert lines[1].split(',')[5] == 'momo'
+
+
+@pytest.mark.django_db
+def test_ndjson_export_resumes_after_cursor(buyer):
+    client = APIClient()
+    client.force_authenticate(buyer)
+
+    first = [json.loads(line) for line in read(client.get("/api/commandes/export/", {"output": "ndjson"})).splitlines()]
+    resumed = read(client.get("/api/commandes/export/", {"output": "ndjson", "after": first[2]['id']})).splitlines()
+
+    assert [json.loads(line)['id'] for line in resumed] == [row['id'] for row in first[3:]]
+
+
+@pytest.mark.django_db
+def test_background_export_writes_file_and_notifies(buyer, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+    path = run_background_export(buyer, 'orders', Order.objects.all(), output='csv')
+
+    with open(os.path.join(tmp_path, path), encoding='utf-8') as handle:
+        assert len(handle.read().splitlines()) == 6
+    assert Notification.objects.filter(user=buyer, content__contains=path).exists()
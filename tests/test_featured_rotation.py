@@ -0,0 +1,60 @@
+# tests/test_featured_rotation.py
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from categories.models import Category
+from listings import featured
+from listings.models import Listing
+
+URL = "/api/listings/listings/featured/"
+
+
+@pytest.fixture
+def featured_listings(make_user):
+    cache.clear()
+    seller = make_user("vendeur@example.com", "70000001")
+    category = Category.objects.create(name="Mode")
+    listings = [
+        Listing.objects.create(
+            user=seller, category=category, title=f"Robe {i}", description="Annonce de test",
+            price=1000, condition='new', is_featured=i < 9,
+        )
+        for i in range(11)
+    ]
+    return [listing.pk for listing in listings[:9]]
+
+
+@pytest.mark.django_db
+def test_pages_of_a_rotation_have_no_duplicates_or_gaps(featured_listings, django_assert_max_num_queries):
+    client = APIClient()
+    first = client.get(URL + "?page_size=4").json()
+    seen, url = [item['id'] for item in first['results']], first['next']
+    while url:
+        # Rotation en cache : seulement la page (WHERE id IN ...)
+        with django_assert_max_num_queries(2):
+            data = client.get(url).json()
+        assert data['rotation'] == first['rotation']
+        seen.extend(item['id'] for item in data['results'])
+        url = data['next']
+
+    assert first['count'] == 9
+    assert len(seen) == 9
+    assert set(seen) == set(featured_listings)
+
+
+@pytest.mark.django_db
+def test_rotation_is_replayable_and_refreshed_when_featured_set_changes(featured_listings):
+    client = APIClient()
+    first = client.get(URL).json()
+    seed = first['rotation']
+
+    Listing.objects.filter(pk=featured_listings[0]).first().deactivate()
+    assert cache.get(featured.ROTATION_KEY) is None
+
+    # Une ancienne graine redonne le même ordre, sans l'annonce retirée
+    replay = client.get(URL + f"?rotation={seed}").json()
+    assert [item['id'] for item in replay['results']] == [
+        item['id'] for item in first['results'] if item['id'] != featured_listings[0]
+    ]
+    assert client.get(URL).json()['count'] == 8
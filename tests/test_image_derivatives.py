@@ -0,0 +1,76 @@
+# tests/test_image_derivatives.py
+
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image as PILImage
+from rest_framework.test import APIClient
+from categories.models import Category
+from listings.models import Image, Listing
+
+
+def jpeg_with_exif(width=1600, height=900):
+    exif = PILImage.Exif()
+    exif[0x0112] = 6  # Orientation : rotation de 90°
+    exif[0x010F] = "Appareil photo"
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (width, height), (200, 40, 40)).save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def listing(settings, tmp_path, make_user):
+    settings.MEDIA_ROOT = str(tmp_path)
+    seller = make_user("vendeur@example.com", "70000001")
+    return Listing.objects.create(
+        user=seller, category=Category.objects.create(name="Mode"), title="Robe",
+        description="Annonce de test", price=1000, condition='new',
+    )
+
+
+@pytest.mark.django_db
+def test_upload_generates_exif_free_derivatives(listing, settings, django_capture_on_commit_callbacks):
+    settings.LISTING_IMAGE_DERIVATIVES = 'sync'
+    client = APIClient()
+    client.force_authenticate(listing.user)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/listings/listings/{listing.pk}/images/",
+            {'image': SimpleUploadedFile("photo.jpg", jpeg_with_exif(), content_type="image/jpeg")},
+            format='multipart',
+        )
+    assert response.status_code == 201
+
+    image = Image.objects.get(listing=listing)
+    # Portrait une fois l'orientation appliquée : 900 px de large, donc pas de 1024
+    assert sorted(image.derivatives, key=int) == ['320', '640']
+    with image.image.storage.open(image.derivatives['320']['jpeg']) as handle:
+        thumb = PILImage.open(handle)
+        assert thumb.width == 320 and thumb.height > thumb.width
+        assert not thumb.getexif()
+
+    data = client.get(f"/api/listings/listings/{listing.pk}/").json()['images'][0]
+    assert data['thumbnail'].endswith("-320.webp")
+    assert data['srcset']['webp'].count('w,') == 1
+    assert data['srcset']['jpeg'].endswith("-640.jpg 640w")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_backfill_command_fills_missing_derivatives(listing, settings):
+    settings.LISTING_IMAGE_DERIVATIVES = 'off'
+    image = Image.objects.create(
+        listing=listing, image=SimpleUploadedFile("ancienne.jpg", jpeg_with_exif(400, 300), content_type="image/jpeg")
+    )
+    assert image.derivatives == {}
+
+    call_command('generate_image_derivatives', workers=2)
+
+    image.refresh_from_db()
+    # 300 px de large une fois redressée : plus étroite que toutes les largeurs,
+    # un seul dérivé, à sa largeur réelle et sans agrandissement
+    assert list(image.derivatives) == ['300']
+    assert set(image.derivatives['300']) == {'webp', 'jpeg'}
+    assert image.derivatives['300']['webp'].endswith("-300.webp")
@@ -0,0 +1,68 @@
+# tests/test_image_upload.py
+
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image as PILImage
+from rest_framework.test import APIClient
+from categories.models import Category
+from listings.models import Image, Listing
+
+
+def photo(name, fmt='JPEG'):
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (64, 48), (10, 120, 200)).save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{fmt.lower()}")
+
+
+@pytest.fixture
+def listing(settings, tmp_path, make_user):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.LISTING_IMAGE_DERIVATIVES = 'off'
+    seller = make_user("vendeur@example.com", "70000001")
+    return Listing.objects.create(
+        user=seller, category=Category.objects.create(name="Mode"), title="Robe",
+        description="Annonce de test", price=1000, condition='new',
+    )
+
+
+@pytest.mark.django_db
+def test_bulk_upload_reports_each_file_and_inserts_once(listing):
+    client = APIClient()
+    client.force_authenticate(listing.user)
+    files = [
+        photo("face.jpg"),
+        SimpleUploadedFile("casse.jpg", b"pas une image", content_type="image/jpeg"),
+        photo("dos.png", 'PNG'),
+        photo("detail.webp", 'WEBP'),
+    ]
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(
+            f"/api/listings/listings/{listing.pk}/images/bulk/", {'images': files}, format='multipart'
+        )
+
+    assert response.status_code == 207
+    data = response.json()
+    assert (data['created'], data['failed']) == (3, 1)
+    assert [result['status'] for result in data['results']] == ['created', 'error', 'created', 'created']
+    assert data['results'][1]['errors'] == ["Fichier image invalide ou corrompu."]
+    assert Image.objects.filter(listing=listing).count() == 3
+    assert sum(query['sql'].startswith('INSERT INTO "listings_image"') for query in queries.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_bulk_upload_is_reserved_to_the_owner(listing, make_user):
+    other = make_user("autre@example.com", "70000002")
+    client = APIClient()
+    client.force_authenticate(other)
+
+    response = client.post(
+        f"/api/listings/listings/{listing.pk}/images/bulk/", {'images': [photo("face.jpg")]}, format='multipart'
+    )
+
+    assert response.status_code == 403
+    assert not Image.objects.exists()
@@ -0,0 +1,99 @@
+# tests/test_ledger.py
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.test import APIClient
+from categories.models import Category
+from listings.models import Listing
+from payments.models import LedgerEntry, SellerBalance, Transaction
+from payments.services.ledger_service import LedgerService
+from payments.services.payout_service import PayoutService
+
+
+@pytest.fixture
+def sales(make_user):
+    """Un vendeur et trois ventes complétées (1000, 2000, 3000) il y a 10 jours"""
+    buyer = make_user("acheteur@example.com", "70000001")
+    seller = make_user("vendeur@example.com", "70000002", role='seller', stripe_account_id="acct_v")
+    listing = Listing.objects.create(
+        user=seller, category=Category.objects.create(name="Mode"), title="Robe",
+        description="Annonce de test", price=1000, condition='new', quantity=10,
+    )
+    transactions = [
+        Transaction.objects.create(listing=listing, buyer=buyer, seller=seller, amount=price, status='completed')
+        for price in (1000, 2000, 3000)
+    ]
+    Transaction.objects.update(updated_at=timezone.now() - timedelta(days=10))
+    return seller, transactions
+
+
+@pytest.mark.django_db
+def test_balance_follows_payments_refunds_and_payouts(sales, monkeypatch):
+    seller, transactions = sales
+    monkeypatch.setattr(
+        'payments.services.payout_service.StripeService.transfer_to_seller',
+        lambda *args, **kwargs: SimpleNamespace(id="tr_1"),
+    )
+
+    assert LedgerService.record_payments(transactions) == 3
+    assert LedgerService.record_payments(transactions) == 0  # idempotent
+    refunded = transactions[0]
+    refunded.status = 'refunded'
+    refunded.save()
+    assert LedgerService.record_refund(refunded) is True
+    assert LedgerService.record_refund(refunded) is False
+
+    balance = LedgerService.balance(seller)
+    assert (balance.balance, balance.total_earned, balance.total_refunded, balance.total_commission) == (
+        Decimal('4750.00'), Decimal('5700.00'), Decimal('950.00'), Decimal('250.00'),
+    )
+
+    client = APIClient()
+    client.force_authenticate(seller)
+    payout = PayoutService.claim(seller.pk, timezone.now() - timedelta(days=7))
+    assert payout.amount == Decimal('4750.00')
+    # Versement en cours : compté une seule fois, hors du solde disponible
+    wallet = client.get("/api/users/vendor/stats/").json()['wallet']
+    assert (wallet['available_balance'], wallet['pending_payouts']) == (0.0, 4750.0)
+
+    PayoutService.execute(payout)
+    balance.refresh_from_db()
+    assert (balance.balance, balance.total_paid_out) == (Decimal('0.00'), Decimal('4750.00'))
+    # Partie double : la somme de toutes les écritures est nulle
+    assert LedgerEntry.objects.aggregate(total=Sum('amount'))['total'] == 0
+
+    wallet = client.get("/api/users/vendor/stats/").json()['wallet']
+    assert wallet == {'available_balance': 0.0, 'pending_payouts': 0, 'total_earnings': 4750.0, 'commission_paid': 250.0}
+
+
+@pytest.mark.django_db
+def test_reconcile_reports_gaps_backfills_and_rebuilds_snapshots(sales):
+    seller, transactions = sales
+    LedgerService.record_payments(transactions[:1])
+    # Ancienne ligne sans net ni commission : postée brute, attendue brute
+    Transaction.objects.filter(pk=transactions[1].pk).update(net_amount=None, commission=None)
+
+    with pytest.raises(CommandError):
+        call_command('reconcile_ledger', stdout=StringIO(), stderr=StringIO())
+
+    out = StringIO()
+    call_command('reconcile_ledger', '--backfill', stdout=out, stderr=StringIO())
+    assert "2 opération(s) ajoutée(s)" in out.getvalue()
+    assert "Grand livre cohérent (1 vendeur(s))" in out.getvalue()
+
+    SellerBalance.objects.filter(seller=seller).update(balance=Decimal('1.00'))
+    err = StringIO()
+    with pytest.raises(CommandError):
+        call_command('reconcile_ledger', stdout=StringIO(), stderr=err)
+    assert "solde balance 1.00, écritures 5800.00" in err.getvalue()
+
+    call_command('reconcile_ledger', '--rebuild-snapshots', stdout=StringIO(), stderr=StringIO())
+    assert LedgerService.balance(seller).balance == Decimal('5800.00')
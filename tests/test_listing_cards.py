@@ -0,0 +1,65 @@
+# tests/test_listing_cards.py
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+from categories.models import Category
+from events.models import Event, EventListing
+from favorites.models import FavoriteListing
+from listings.models import Image, Listing
+
+CARD_KEYS = {
+    'id', 'title', 'price', 'location', 'first_image', 'thumbnail', 'available_quantity', 'is_out_of_stock',
+}
+
+
+@pytest.fixture
+def catalog(make_user):
+    seller = make_user("vendeur@example.com", "70000001")
+    category = Category.objects.create(name="Mode")
+    event = Event.objects.create(user=seller, title="Live", description="Vente", start_time=timezone.now())
+    for number in range(4):
+        listing = Listing.objects.create(
+            user=seller, category=category, title=f"Robe {number}", description="Annonce de test",
+            price=1500, condition='new', quantity=5, quantity_sold=number, location="Bamako", is_featured=True,
+        )
+        Image.objects.create(listing=listing, image=f"listings/robe-{number}-1.jpg")
+        Image.objects.create(listing=listing, image=f"listings/robe-{number}-0.jpg")
+        FavoriteListing.objects.create(user=seller, listing=listing)
+        EventListing.objects.create(event=event, listing=listing)
+    return seller
+
+
+@pytest.mark.django_db
+def test_card_view_renders_compact_listings_in_one_query(catalog, django_assert_num_queries):
+    client = APIClient()
+
+    # COUNT + la page (la première image vient d'une sous-requête)
+    with django_assert_num_queries(2):
+        data = client.get("/api/listings/listings/?view=card&count=exact").json()
+
+    cards = {card['title']: card for card in data['results']}
+    assert set(cards["Robe 3"]) == CARD_KEYS
+    assert cards["Robe 3"]['price'] == '1500.00'
+    assert cards["Robe 3"]['first_image'].endswith("robe-3-1.jpg")
+    assert cards["Robe 3"]['available_quantity'] == 2
+    assert cards["Robe 3"]['is_out_of_stock'] is False
+
+    featured = client.get("/api/listings/listings/featured/?view=card").json()
+    assert set(featured['results'][0]) == CARD_KEYS
+
+
+@pytest.mark.django_db
+def test_favorites_and_events_card_view(catalog):
+    client = APIClient()
+    client.force_authenticate(catalog)
+
+    favorites = client.get("/api/favorites/listings/?view=card").json()
+    events = client.get("/api/events/?view=card").json()
+
+    assert set(favorites['results'][0]['listing']) == CARD_KEYS
+    event_listing = events['results'][0]['event_listings'][0]
+    assert set(event_listing['listing']) == CARD_KEYS
+    assert event_listing['listing']['first_image'].endswith("-1.jpg")
+    # Sans ?view=card, la réponse complète est inchangée
+    assert 'description' in client.get("/api/favorites/listings/").json()['results'][0]['listing']
@@ -0,0 +1,98 @@
+# tests/test_listing_queries.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from categories.models import Category
+from commandes.models import Order, OrderItem
+from events.models import Event, EventListing
+from favorites.models import FavoriteListing
+from listings.models import Image, Listing
+from paniers.models import Panier, PanierItem
+
+
+def add_listings(seller, buyer, count):
+    """`count` annonces avec images, présentes dans le panier, les favoris, une commande et un événement"""
+    parent = Category.objects.get_or_create(name="Mode")[0]
+    category = Category.objects.get_or_create(name="Robes", parent=parent)[0]
+    panier = Panier.objects.get_or_create(user=buyer)[0]
+    event = Event.objects.get_or_create(
+        user=seller, title="Live", defaults={'description': "Vente en direct", 'start_time': timezone.now()}
+    )[0]
+    start = Listing.objects.count()
+    for number in range(start, start + count):
+        listing = Listing.objects.create(
+            user=seller, category=category, title=f"Robe {number}", description="Annonce de test",
+            price=1000, condition='new', quantity=10, is_featured=True,
+        )
+        Image.objects.create(listing=listing, image=f"listings/robe-{number}-b.jpg")
+        Image.objects.create(listing=listing, image=f"listings/robe-{number}-a.jpg")
+        FavoriteListing.objects.create(user=buyer, listing=listing)
+        PanierItem.objects.create(panier=panier, listing=listing, quantity=1)
+        EventListing.objects.create(event=event, listing=listing)
+        order = Order.objects.create(
+            buyer=buyer, user=buyer, listing=listing, total_price=1000, order_number=f"Q{number}"
+        )
+        OrderItem.objects.create(order=order, listing=listing, quantity=1, price=1000)
+
+
+@pytest.fixture
+def marketplace(make_user):
+    seller = make_user("vendeur@example.com", "70000001", role='seller')
+    buyer = make_user("acheteur@example.com", "70000002")
+    add_listings(seller, buyer, 3)
+    return seller, buyer
+
+
+ENDPOINTS = [
+    ("/api/listings/listings/", 4),
+    ("/api/listings/listings/featured/", 3),
+    ("/api/favorites/listings/", 4),
+    ("/api/paniers/panier/", 5),
+    ("/api/commandes/commandes/", 6),
+    ("/api/commandes/my-orders/", 6),
+    ("/api/events/", 5),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url, budget', ENDPOINTS)
+def test_listing_endpoints_stay_within_query_budget(marketplace, url, budget, django_assert_max_num_queries):
+    seller, buyer = marketplace
+    client = APIClient()
+    client.force_authenticate(buyer)
+
+    with django_assert_max_num_queries(budget):
+        response = client.get(url)
+
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', [url for url, _ in ENDPOINTS])
+def test_query_count_does_not_grow_with_listings(marketplace, url, django_assert_num_queries):
+    seller, buyer = marketplace
+    client = APIClient()
+    client.force_authenticate(buyer)
+
+    with CaptureQueriesContext(connection) as before:
+        client.get(url)
+    add_listings(seller, buyer, 4)
+
+    with django_assert_num_queries(len(before)):
+        client.get(url)
+
+
+@pytest.mark.django_db
+def test_detail_images_are_ordered(marketplace):
+    listing = Listing.objects.first()
+
+    data = APIClient().get(f"/api/listings/listings/{listing.pk}/").json()
+
+    # Ordre d'ajout, pas l'ordre alphabétique des fichiers
+    assert [image['id'] for image in data['images']] == list(
+        listing.images.order_by('created_at', 'id').values_list('id', flat=True)
+    )
+    assert data['images'][0]['image'].endswith('-b.jpg')
@@ -0,0 +1,65 @@
+# tests/test_listing_search.py
+
+import pytest
+from rest_framework.test import APIClient
+from listings.models import Listing
+from categories.models import Category
+
+
+@pytest.fixture
+def seller(make_user):
+    return make_user("vendeur@example.com", "70000001")
+
+
+@pytest.fixture
+def category():
+    return Category.objects.create(name="Immobilier")
+
+
+def make_listing(seller, category, **kwargs):
+    data = {
+        'user': seller,
+        'category': category,
+        'price': 150000,
+        'condition': 'new',
+        'description': 'Annonce de test',
+    }
+    data.update(kwargs)
+    return Listing.objects.create(**data)
+
+
+@pytest.mark.django_db
+def test_search_vector_is_maintained_on_save(seller, category):
+    listing = make_listing(seller, category, title="Villa avec piscine", location="Bamako")
+
+    listing.refresh_from_db()
+    assert listing.search_vector is not None
+
+    listing.title = "Appartement meublé"
+    listing.save()
+
+    found = Listing.objects.filter(search_vector="appartement")
+    assert list(found) == [listing]
+
+
+@pytest.mark.django_db
+def test_search_ranks_title_above_description(seller, category):
+    in_description = make_listing(seller, category, title="Maison familiale", description="Proche d'une villa")
+    in_title = make_listing(seller, category, title="Villa moderne", description="Quartier calme")
+    make_listing(seller, category, title="Toyota Camry", description="Voiture d'occasion")
+
+    response = APIClient().get("/api/listings/listings/", {"search": "villa"})
+
+    assert response.status_code == 200
+    ids = [item["id"] for item in response.json()["results"]]
+    assert ids == [in_title.id, in_description.id]
+
+
+@pytest.mark.django_db
+def test_search_matches_prefix_while_typing(seller, category):
+    listing = make_listing(seller, category, title="Ordinateur portable", location="Kati")
+
+    response = APIClient().get("/api/listings/listings/", {"search": "ordin"})
+
+    ids = [item["id"] for item in response.json()["results"]]
+    assert ids == [listing.id]
@@ -0,0 +1,85 @@
+# tests/test_listing_stock.py
+
+import threading
+
+import pytest
+from django.db import connection
+from listings.models import Listing
+from categories.models import Category
+from commandes.models import Order
+from notifications.models import Notification
+
+
+@pytest.fixture
+def seller(make_user):
+    return make_user("vendeur@example.com", "70000001")
+
+
+def make_listing(seller, **kwargs):
+    data = {
+        'user': seller,
+        'category': Category.objects.create(name="Électronique"),
+        'title': "Téléphone",
+        'description': "Annonce de test",
+        'price': 50000,
+        'condition': 'new',
+    }
+    data.update(kwargs)
+    return Listing.objects.create(**data)
+
+
+@pytest.mark.django_db
+def test_sell_derives_status_in_a_single_update(seller, django_assert_num_queries):
+    listing = make_listing(seller, quantity=2)
+
+    with django_assert_num_queries(1):
+        assert Listing.objects.filter(pk=listing.pk).sell(2) == 1
+    assert Listing.objects.filter(pk=listing.pk).sell(1) == 0
+
+    listing.refresh_from_db()
+    assert (listing.quantity_sold, listing.status) == (2, 'out_of_stock')
+
+    listing.restock(3)
+    assert (listing.quantity, listing.quantity_sold, listing.status) == (5, 0, 'active')
+
+
+@pytest.mark.django_db
+def test_cancel_order_restocks_only_once(seller, make_user):
+    buyer = make_user("acheteur@example.com", "70000002")
+    listing = make_listing(seller, quantity=1)
+    order = Order.objects.create(buyer=buyer, user=buyer, listing=listing, quantity=1)
+    assert order.confirm_order()
+
+    assert order.cancel_order()
+    assert not Order.objects.get(pk=order.pk).cancel_order()
+
+    listing.refresh_from_db()
+    assert (listing.quantity_sold, listing.status) == (0, 'active')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_buyers_never_oversell(seller):
+    listing = make_listing(seller, quantity=5)
+    threads_count = 20
+    barrier = threading.Barrier(threads_count)
+    results = []
+
+    def buy():
+        try:
+            instance = Listing.objects.get(pk=listing.pk)
+            barrier.wait()
+            results.append(instance.mark_as_sold(1))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=buy) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    listing.refresh_from_db()
+    assert results.count(True) == 5
+    assert (listing.quantity_sold, listing.status) == (5, 'out_of_stock')
+    # Une seule notification d'épuisement, envoyée par l'acheteur de la dernière unité
+    assert Notification.objects.filter(user=seller, type='listing').count() == 1
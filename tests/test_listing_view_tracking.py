@@ -0,0 +1,77 @@
+# tests/test_listing_view_tracking.py
+
+import pytest
+from django.core.cache import cache
+from django.db import DatabaseError
+from rest_framework.test import APIClient
+from listings.models import Listing, ListingView
+from listings import view_tracking
+from listings.view_tracking import flush_view_buffer
+from categories.models import Category
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def listing(make_user):
+    seller = make_user("vendeur@example.com", "70000001")
+    return Listing.objects.create(
+        user=seller,
+        category=Category.objects.create(name="Immobilier"),
+        title="Villa",
+        description="Annonce de test",
+        price=150000,
+        condition='new',
+    )
+
+
+def track(listing, ip):
+    return APIClient().post(
+        f"/api/listings/listings/{listing.id}/track-view/", REMOTE_ADDR=ip
+    )
+
+
+@pytest.mark.django_db
+def test_buffered_views_are_deduplicated_and_written_in_batch(listing, settings, monkeypatch, django_assert_max_num_queries):
+    settings.LISTING_VIEW_TRACKING_MODE = 'buffered'
+    settings.LISTING_VIEW_FLUSH_INTERVAL = 3600
+    cache.add('listing_views:last_flush', True, 3600)  # pas de vidage opportuniste
+
+    for ip in ["10.0.0.1", "10.0.0.2", "10.0.0.1", "10.0.0.3"]:
+        assert track(listing, ip).status_code == 200
+
+    assert ListingView.objects.count() == 0
+
+    # Échec d'écriture : les vues restent dans le tampon pour le vidage suivant
+    def fail(events):
+        raise DatabaseError("base indisponible")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(view_tracking, 'write_views', fail)
+        with pytest.raises(DatabaseError):
+            flush_view_buffer()
+
+    # Un INSERT groupé + un UPDATE par annonce, quel que soit le nombre de vues
+    with django_assert_max_num_queries(6):
+        assert flush_view_buffer() == 3
+
+    listing.refresh_from_db()
+    assert listing.views_count == 3
+    assert ListingView.objects.filter(listing=listing).count() == 3
+    assert flush_view_buffer() == 0
+
+
+@pytest.mark.django_db
+def test_sync_mode_writes_immediately(listing, settings):
+    settings.LISTING_VIEW_TRACKING_MODE = 'sync'
+
+    response = track(listing, "10.0.0.1")
+
+    assert response.status_code == 200
+    assert response.json()["views_count"] == 1
+    assert ListingView.objects.filter(listing=listing).count() == 1
@@ -0,0 +1,58 @@
+# tests/test_order_stats.py
+
+import pytest
+from decimal import Decimal
+from rest_framework.test import APIClient
+from categories.models import Category
+from commandes.models import Order
+from commandes.stats import OrderStatsAggregator
+from listings.models import Listing
+
+
+@pytest.fixture
+def orders(make_user):
+    seller = make_user("vendeur@example.com", "70000001", role='seller')
+    buyer = make_user("acheteur@example.com", "70000002")
+    listing = Listing.objects.create(
+        user=seller, category=Category.objects.create(name="Mode"), title="Robe",
+        description="Annonce de test", price=10000, condition='new', quantity=50,
+    )
+    for number, status in enumerate(['pending', 'pending', 'delivered', 'cancelled']):
+        Order.objects.create(buyer=buyer, user=buyer, listing=listing, status=status, order_number=f"S{number}")
+    return seller, buyer
+
+
+@pytest.mark.django_db
+def test_aggregator_computes_everything_in_one_query(orders, django_assert_num_queries):
+    seller, buyer = orders
+
+    with django_assert_num_queries(1):
+        stats = OrderStatsAggregator(Order.objects.filter(user=buyer)).compute()
+
+    assert stats.total_orders == 4
+    assert stats.total_revenue == Decimal('40000')
+    assert stats.orders_last_7_days == 4
+    assert stats.monthly_orders == 4
+    assert stats.count('pending') == 2
+    assert stats.status_stats()['Livré'] == 1
+    assert stats.average_order_value == 10000
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url, admin, budget', [
+    ("/api/commandes/stats/", False, 2),
+    ("/api/commandes/stats/", True, 3),
+    ("/api/commandes/stats/admin/", True, 3),
+    ("/api/commandes/stats/user/", False, 3),
+    ("/api/commandes/stats/admin/dashboard/", True, 5),
+])
+def test_stats_endpoints_stay_within_query_budget(orders, url, admin, budget, django_assert_max_num_queries, make_user):
+    seller, buyer = orders
+    user = make_user("admin@example.com", "70000003", is_staff=True) if admin else seller
+    client = APIClient()
+    client.force_authenticate(user)
+
+    with django_assert_max_num_queries(budget):
+        response = client.get(url)
+
+    assert response.status_code == 200
@@ -0,0 +1,59 @@
+# tests/test_pagination.py
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+from categories.models import Category
+from listings.models import Listing
+
+URL = "/api/listings/listings/"
+
+
+@pytest.fixture
+def listings(make_user):
+    seller = make_user("vendeur@example.com", "70000001")
+    category = Category.objects.create(name="Mode")
+    created = [
+        Listing.objects.create(
+            user=seller, category=category, title=f"Robe {i}", description="Annonce de test",
+            price=1000 + i, condition='new',
+        )
+        for i in range(7)
+    ]
+    # Même created_at pour une partie des annonces : l'id départage
+    Listing.objects.filter(pk__in=[item.pk for item in created[:4]]).update(created_at=timezone.now())
+    return Listing.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)
+
+
+@pytest.mark.django_db
+def test_cursor_pages_walk_forward_and_back(listings):
+    client = APIClient()
+    seen, pages, url = [], [], URL + "?page_size=3"
+    while url:
+        data = client.get(url).json()
+        pages.append(data)
+        seen.extend(item['id'] for item in data['results'])
+        url = data['next']
+
+    assert seen == list(listings)
+    assert 'count' in pages[0]
+    assert pages[0]['previous'] is None
+
+    previous = client.get(pages[2]['previous']).json()
+    assert previous['results'] == pages[1]['results']
+
+
+@pytest.mark.django_db
+def test_page_number_mode_is_kept_for_compatibility(listings):
+    data = APIClient().get(URL, {"page": 2, "page_size": 3}).json()
+
+    assert data['count'] == 7
+    assert len(data['results']) == 3
+    assert 'page=3' in data['next']
+
+
+@pytest.mark.django_db
+def test_tampered_cursor_is_rejected(listings):
+    response = APIClient().get(URL, {"cursor": "not-a-signed-cursor"})
+
+    assert response.status_code == 404
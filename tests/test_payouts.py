@@ -0,0 +1,129 @@
+# tests/test_payouts.py
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+import stripe
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from categories.models import Category
+from listings.models import Listing
+from payments.models import Payout, Transaction
+from payments.services.payout_service import PayoutService
+
+
+@pytest.fixture
+def sales(make_user):
+    """Deux vendeurs avec des ventes complétées il y a 10 jours, et une vente récente"""
+    buyer = make_user("acheteur@example.com", "70000001")
+    category = Category.objects.create(name="Mode")
+    sellers = [make_user("a@example.com", "70000002", stripe_account_id="acct_a"), make_user("b@example.com", "70000003", stripe_account_id="acct_b")]
+    for seller, prices in zip(sellers, [(1000, 2000, 3000), (5000,)]):
+        listing = Listing.objects.create(
+            user=seller, category=category, title="Robe", description="Annonce de test",
+            price=1000, condition='new', quantity=10,
+        )
+        for price in prices:
+            Transaction.objects.create(
+                listing=listing, buyer=buyer, seller=seller, amount=price, status='completed',
+                stripe_payment_intent_id="pi_test",
+            )
+    Transaction.objects.update(updated_at=timezone.now() - timedelta(days=10))
+    recent = Transaction.objects.create(
+        listing=listing, buyer=buyer, seller=sellers[0], amount=700, status='completed',
+    )
+    return sellers, recent
+
+
+@pytest.fixture
+def transfers(monkeypatch):
+    calls = []
+
+    def transfer_to_seller(amount, destination_account_id, **kwargs):
+        calls.append((amount, destination_account_id, kwargs['idempotency_key']))
+        return SimpleNamespace(id=f"tr_{len(calls)}")
+
+    monkeypatch.setattr('payments.services.payout_service.StripeService.transfer_to_seller', transfer_to_seller)
+    return calls
+
+
+@pytest.mark.django_db
+def test_one_transfer_per_seller_and_one_update_for_its_transactions(sales, transfers):
+    (seller_a, seller_b), recent = sales
+    until = timezone.now() - timedelta(days=7)
+
+    with CaptureQueriesContext(connection) as queries:
+        [payout] = PayoutService.settle_seller(seller_a.pk, until)
+    PayoutService.settle_seller(seller_b.pk, until)
+
+    assert transfers == [
+        (Decimal('5700.00'), "acct_a", f"payout:{payout.pk}"),   # 6000 - 5% de commission
+        (Decimal('4750.00'), "acct_b", f"payout:{payout.pk + 1}"),
+    ]
+    payout.refresh_from_db()
+    assert (payout.status, payout.transaction_count, payout.stripe_transfer_id) == ('paid', 3, "tr_1")
+    assert set(payout.transactions.values_list('status', 'stripe_transfer_id')) == {('transferred', "tr_1")}
+    recent.refresh_from_db()
+    assert (recent.status, recent.payout_id) == ('completed', None)
+    # Rattachement puis marquage : deux UPDATE quel que soit le nombre de transactions
+    updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "payments_transaction"')]
+    assert len(updates) == 2
+
+    # Rien de plus à verser
+    assert PayoutService.settle_seller(seller_a.pk, until) == []
+
+
+@pytest.mark.django_db
+def test_dry_run_reports_totals_and_refused_transfer_releases_transactions(sales, monkeypatch):
+    (seller_a, seller_b), recent = sales
+    out = StringIO()
+
+    call_command('settle_payouts', '--dry-run', stdout=out)
+
+    assert "2 vendeur(s), 10450.00 à verser" in out.getvalue()
+    assert f"vendeur {seller_a.pk}: 3 transaction(s), brut 6000.00, commission 300.00, net 5700.00" in out.getvalue()
+    assert not Payout.objects.exists()
+
+    def refuse(operation, *args, **kwargs):
+        raise stripe.InvalidRequestError("compte restreint", param='destination')
+
+    monkeypatch.setattr('payments.services.stripe_service.stripe_client.call', refuse)
+    [payout] = PayoutService.settle_seller(seller_b.pk, timezone.now() - timedelta(days=7))
+
+    assert Payout.objects.get().status == 'failed'
+    assert "compte restreint" in payout.failure_reason
+    assert not Transaction.objects.filter(payout__isnull=False).exists()
+    assert Transaction.objects.filter(seller=seller_b, status='completed').count() == 1
+
+
+@pytest.mark.django_db
+def test_network_error_keeps_the_payout_pending_for_a_retry_with_the_same_key(sales, monkeypatch):
+    (seller_a, seller_b), recent = sales
+    until = timezone.now() - timedelta(days=7)
+
+    def unreachable(operation, *args, **kwargs):
+        raise stripe.APIConnectionError("Connexion interrompue")
+
+    with monkeypatch.context() as patch:
+        patch.setattr('payments.services.stripe_service.stripe_client.call', unreachable)
+        [payout] = PayoutService.settle_seller(seller_a.pk, until)
+
+    # Le transfert a pu partir : ni échec, ni transactions libérées pour une autre fenêtre
+    assert payout.status == 'pending'
+    assert Payout.objects.get().status == 'pending'
+    assert Transaction.objects.filter(payout=payout, status='completed').count() == 3
+
+    calls = []
+
+    def transfer(operation, *args, idempotency_key=None, **params):
+        calls.append(idempotency_key)
+        return SimpleNamespace(id="tr_1")
+
+    monkeypatch.setattr('payments.services.stripe_service.stripe_client.call', transfer)
+    [retried] = PayoutService.settle_seller(seller_a.pk, until)
+    assert (retried.pk, retried.status, calls) == (payout.pk, 'paid', [f"payout:{payout.pk}"])
@@ -0,0 +1,76 @@
+# tests/test_stock_reservation.py
+
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from listings.models import Listing
+from categories.models import Category
+from payments.models import StockReservation, Transaction
+from payments.services.reservation_service import InsufficientStockError, ReservationService
+
+
+@pytest.fixture
+def listing(make_user):
+    return Listing.objects.create(
+        user=make_user("vendeur@example.com", "70000001"),
+        category=Category.objects.create(name="Électronique"),
+        title="Téléphone",
+        description="Annonce de test",
+        price=50000,
+        condition='new',
+        quantity=2,
+    )
+
+
+def pay(buyer, listing, reservation):
+    transaction = Transaction.objects.create(
+        listing=listing, buyer=buyer, seller=listing.user, quantity=reservation.quantity,
+        amount=listing.price, stripe_payment_intent_id="pi_test",
+    )
+    ReservationService.attach([reservation], [transaction], "pi_test")
+    return transaction
+
+
+@pytest.mark.django_db
+def test_hold_blocks_stock_for_other_buyers(listing, make_user):
+    first = make_user("a@example.com", "70000002")
+    second = make_user("b@example.com", "70000003")
+
+    ReservationService.hold(first, [(listing, 2)])
+
+    listing.refresh_from_db()
+    assert listing.available_quantity == 0
+    assert listing.status == 'active'
+    with pytest.raises(InsufficientStockError):
+        ReservationService.hold(second, [(listing, 1)])
+    assert not listing.mark_as_sold(1)
+
+
+@pytest.mark.django_db
+def test_commit_converts_hold_into_sale_once(listing, make_user):
+    buyer = make_user("a@example.com", "70000002")
+    [reservation] = ReservationService.hold(buyer, [(listing, 2)])
+    transaction = pay(buyer, listing, reservation)
+
+    assert ReservationService.commit(transaction)
+    assert ReservationService.commit(transaction)
+
+    listing.refresh_from_db()
+    assert (listing.quantity_sold, listing.quantity_reserved, listing.status) == (2, 0, 'out_of_stock')
+    assert StockReservation.objects.get().status == 'converted'
+
+
+@pytest.mark.django_db
+def test_sweeper_releases_expired_holds(listing, make_user):
+    buyer = make_user("a@example.com", "70000002")
+    ReservationService.hold(buyer, [(listing, 1)], ttl=timedelta(minutes=15))
+    ReservationService.hold(buyer, [(listing, 1)], ttl=timedelta(seconds=-1))
+
+    call_command('expire_stock_reservations')
+
+    listing.refresh_from_db()
+    assert listing.quantity_reserved == 1
+    assert StockReservation.objects.filter(status='expired').count() == 1
+    assert StockReservation.objects.filter(status='active', expires_at__gt=timezone.now()).count() == 1
@@ -0,0 +1,104 @@
+# tests/test_stripe_client.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from rest_framework.test import APIClient
+from payments.services import stripe_client
+from payments.services.stripe_service import StripeService, StripeUnavailableError
+
+
+class StubStripe(BaseHTTPRequestHandler):
+    """Serveur local qui imite l'API Stripe (réponses minimales)"""
+    protocol_version = "HTTP/1.1"  # keep-alive
+    requests = []
+    fail = False
+
+    def _respond(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        StubStripe.requests.append({
+            'method': self.command, 'path': self.path, 'form': form,
+            'idempotency_key': self.headers.get("Idempotency-Key"), 'port': self.client_address[1],
+        })
+        if StubStripe.fail:
+            return self._respond(500, {'error': {'type': 'api_error', 'message': "Erreur Stripe simulée"}})
+        self._respond(200, {
+            'id': "pi_stub", 'object': "payment_intent", 'status': "requires_payment_method",
+            'client_secret': "pi_stub_secret", 'amount': int(form.get('amount', ['0'])[0]),
+            'metadata': {key[9:-1]: values[0] for key, values in form.items() if key.startswith('metadata[')},
+        })
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(settings):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubStripe)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.STRIPE_API_BASE = f"http://127.0.0.1:{server.server_port}"
+    settings.STRIPE_MAX_NETWORK_RETRIES = 0
+    settings.STRIPE_CIRCUIT_THRESHOLD = 2
+    StubStripe.requests, StubStripe.fail = [], False
+    stripe_client.reset_client()
+    cache.clear()
+    yield StubStripe
+    server.shutdown()
+    server.server_close()
+    stripe_client.reset_client()
+
+
+def test_create_sends_metadata_and_idempotency_key_in_one_call(stub):
+    payment_intent = StripeService.create_payment_intent_for_mobile(
+        amount=3000, phone="+22370000002", payment_method='card',
+        metadata={'user_id': "2", 'payment_type': 'panier'}, idempotency_key="panier:2:10",
+    )
+    StripeService.retrieve_payment_intent(payment_intent.id)
+    StripeService.retrieve_payment_intent(payment_intent.id)
+
+    create = stub.requests[0]
+    assert (create['method'], create['path']) == ('POST', '/v1/payment_intents')
+    assert create['idempotency_key'] == "panier:2:10"
+    assert dict(payment_intent.metadata) == {
+        'phone': "+22370000002", 'payment_method': 'card', 'payment_type': 'panier', 'user_id': "2",
+    }
+    # Connexion keep-alive réutilisée d'un appel à l'autre
+    assert len({request['port'] for request in stub.requests}) == 1
+    histograms = stripe_client.latency_histograms()
+    assert histograms['payment_intents.create']['count'] == 1
+    assert histograms['payment_intents.retrieve']['buckets']['+Inf'] == 2
+
+
+@pytest.mark.django_db
+def test_circuit_opens_after_repeated_failures(stub, make_user):
+    stub.fail = True
+
+    for _ in range(2):
+        with pytest.raises(ValidationError):
+            StripeService.retrieve_payment_intent("pi_stub")
+    with pytest.raises(StripeUnavailableError):
+        StripeService.retrieve_payment_intent("pi_stub")
+    assert len(stub.requests) == 2  # le troisième appel n'a pas atteint Stripe
+
+    admin = make_user("admin@example.com", "70000009", is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+    data = client.get("/api/payments/stripe-metrics/").json()
+    assert data['circuit_open'] is True
+    assert data['latency']['payment_intents.retrieve']['count'] == 2
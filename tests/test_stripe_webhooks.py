@@ -0,0 +1,100 @@
+# tests/test_stripe_webhooks.py
+
+import hashlib
+import hmac
+import time
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from categories.models import Category
+from commandes.models import Order
+from listings.models import Listing
+from payments.models import StockReservation, StripeEvent, Transaction
+from payments.services.reservation_service import ReservationService
+
+FIXTURES = Path(__file__).parent / "fixtures" / "stripe_events"
+WEBHOOK_URL = "/api/payments/webhook/"
+CONFIRM_URL = "/api/payments/confirm/"
+SECRET = "whsec_test"
+PAYMENT_INTENT = "pi_3QxCartFixture0001"
+
+
+def replay(client, event_type, secret=SECRET):
+    """Rejouer un événement enregistré, signé comme le ferait Stripe"""
+    payload = (FIXTURES / f"{event_type}.json").read_text()
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return client.post(
+        WEBHOOK_URL, payload, content_type="application/json",
+        HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}",
+    )
+
+
+@pytest.fixture
+def checkout(settings, make_user):
+    """Panier de 2 articles réservés, en attente du paiement PAYMENT_INTENT"""
+    settings.STRIPE_WEBHOOK_SECRET = SECRET
+    settings.STRIPE_EVENT_PROCESSING = 'off'
+    seller = make_user("vendeur@example.com", "70000001")
+    buyer = make_user("acheteur@example.com", "70000002")
+    category = Category.objects.create(name="Mode")
+    lines = [
+        (Listing.objects.create(
+            user=seller, category=category, title=title, description="Annonce de test",
+            price=1000, condition='new', quantity=3,
+        ), wanted)
+        for title, wanted in [("Robe", 2), ("Sac", 1)]
+    ]
+    reservations = ReservationService.hold(buyer, lines)
+    transactions = [
+        Transaction.objects.create(
+            listing=listing, buyer=buyer, seller=seller, quantity=wanted,
+            amount=listing.price, stripe_payment_intent_id=PAYMENT_INTENT,
+        )
+        for listing, wanted in lines
+    ]
+    ReservationService.attach(reservations, transactions, PAYMENT_INTENT)
+    client = APIClient()
+    client.force_authenticate(buyer)
+    return client
+
+
+@pytest.mark.django_db
+def test_events_are_stored_once_and_confirmation_reads_local_state(checkout):
+    client = checkout
+
+    assert replay(client, "payment_intent.processing").status_code == 200
+    call_command('process_stripe_events')
+    assert set(Transaction.objects.values_list('status', flat=True)) == {'processing'}
+    assert client.post(CONFIRM_URL, {'payment_intent_id': PAYMENT_INTENT}, format='json').json()['status'] == 'processing'
+
+    # Stripe renvoie le même événement : une seule ligne, traitée une seule fois
+    assert replay(client, "payment_intent.succeeded").status_code == 200
+    assert replay(client, "payment_intent.succeeded").status_code == 200
+    assert StripeEvent.objects.filter(status='pending').count() == 1
+
+    # L'événement reçu est traité localement par la confirmation, sans appel à Stripe
+    data = client.post(CONFIRM_URL, {'payment_intent_id': PAYMENT_INTENT}, format='json').json()
+    assert data['status'] == 'succeeded'
+    assert len(data['orders_created']) == 2 == Order.objects.count()
+    assert set(Transaction.objects.values_list('status', flat=True)) == {'completed'}
+    assert set(StripeEvent.objects.values_list('status', flat=True)) == {'processed'}
+    assert sorted(Listing.objects.values_list('quantity_sold', flat=True)) == [1, 2]
+
+
+@pytest.mark.django_db
+def test_failed_payment_releases_stock_and_rejects_bad_signatures(checkout, settings, django_capture_on_commit_callbacks):
+    client = checkout
+    settings.STRIPE_EVENT_PROCESSING = 'sync'
+
+    assert replay(client, "payment_intent.succeeded", secret="whsec_autre").status_code == 400
+    with django_capture_on_commit_callbacks(execute=True):
+        assert replay(client, "payment_intent.payment_failed").status_code == 200
+
+    assert StripeEvent.objects.get().status == 'processed'
+    assert set(Transaction.objects.values_list('status', flat=True)) == {'failed'}
+    assert set(StockReservation.objects.values_list('status', flat=True)) == {'released'}
+    assert set(Listing.objects.values_list('quantity_reserved', flat=True)) == {0}
+    assert client.post(CONFIRM_URL, {'payment_intent_id': PAYMENT_INTENT}, format='json').json()['status'] == 'failed'
@@ -0,0 +1,109 @@
+# tests/test_throttling.py
+
+import time
+
+import pytest
+from django.core import mail
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from categories.models import Category
+from e_sugu.throttling import CacheRateThrottle, check_throttle_cache, fixed_window, sliding_window
+from listings.models import Listing
+
+
+@pytest.fixture
+def frozen(monkeypatch):
+    """Cache vide et horloge figée : tout le test tombe dans la même fenêtre"""
+    caches['default'].clear()
+    monkeypatch.setattr(CacheRateThrottle, 'timer', lambda self: 1_000_000.0)
+    yield
+    caches['default'].clear()
+
+
+def test_sliding_window_does_not_double_the_rate_at_a_window_boundary():
+    cache = caches['default']
+    cache.clear()
+    burst = lambda algorithm, key, now: [algorithm(cache, key, 5, 60, now)[0] for _ in range(5)]
+
+    # Fenêtre fixe : 5 requêtes en fin de fenêtre, 5 de plus deux secondes après
+    assert burst(fixed_window, "fixed", 59) == [True] * 5
+    assert fixed_window(cache, "fixed", 5, 60, 59) == (False, 1)
+    assert burst(fixed_window, "fixed", 61) == [True] * 5
+
+    # Fenêtre glissante : la fenêtre précédente compte encore presque entièrement
+    assert burst(sliding_window, "sliding", 59) == [True] * 5
+    allowed, wait = sliding_window(cache, "sliding", 5, 60, 61)
+    assert not allowed and 0 < wait <= 60
+    assert sliding_window(cache, "sliding", 5, 60, 61 + wait + 1)[0] is True
+
+
+@pytest.mark.django_db
+def test_login_abuse_is_rejected_before_any_query_or_password_check(frozen, monkeypatch, make_user):
+    make_user("cible@example.com", "70000001")
+    checks = []
+    from users import serializers
+
+    def authenticate(request, **credentials):
+        checks.append(credentials['email'])
+        return None
+
+    monkeypatch.setattr(serializers, 'authenticate', authenticate)
+    monkeypatch.setattr(serializers.time, 'sleep', lambda seconds: None)
+    client = APIClient()
+    payload = {'email': "cible@example.com", 'password': "mauvais"}
+
+    statuses = [client.post("/api/users/login/", payload, format='json').status_code for _ in range(10)]
+    assert statuses == [400] * 10
+
+    # 200 tentatives de plus : refusées sans SQL ni vérification de mot de passe
+    start = time.process_time()
+    with CaptureQueriesContext(connection) as queries:
+        responses = [client.post("/api/users/login/", payload, format='json') for _ in range(200)]
+    cpu = time.process_time() - start
+
+    assert {response.status_code for response in responses} == {429}
+    assert int(responses[-1]['Retry-After']) > 0
+    assert len(checks) == 10
+    assert len(queries) == 0
+    assert cpu / len(responses) < 0.01  # budget CPU : < 10 ms par requête refusée
+
+
+@pytest.mark.django_db
+def test_otp_resend_per_email_and_view_tracking_per_ip(frozen, make_user):
+    user = make_user("otp@example.com", "70000002")
+    listing = Listing.objects.create(
+        user=user, category=Category.objects.create(name="Mode"), title="Robe",
+        description="Annonce de test", price=1000, condition='new', quantity=10,
+    )
+    client = APIClient()
+
+    # Le même email depuis 20 IP différentes : 3 envois par heure au plus
+    statuses = [
+        client.post("/api/users/resend-otp/", {'email': "otp@example.com"}, format='json',
+                    REMOTE_ADDR=f"10.0.0.{i}").status_code
+        for i in range(20)
+    ]
+    assert statuses == [200] * 3 + [429] * 17
+    assert len(mail.outbox) == 3
+
+    url = f"/api/listings/listings/{listing.pk}/track-view/"
+    statuses = [client.post(url, REMOTE_ADDR="10.0.1.1").status_code for _ in range(130)]
+    assert statuses.count(429) == 10
+    # Une autre IP n'est pas concernée
+    assert client.post(url, REMOTE_ADDR="10.0.1.2").status_code == 200
+
+
+def test_process_local_throttle_cache_is_reported_outside_debug(settings):
+    settings.DEBUG = False
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': "redis://localhost:6379"},
+    }
+    assert [warning.id for warning in check_throttle_cache()] == ['e_sugu.W001']
+
+    settings.THROTTLE_CACHE = 'shared'
+    assert check_throttle_cache() == []
+    settings.THROTTLE_CACHE, settings.DEBUG = 'default', True
+    assert check_throttle_cache() == []
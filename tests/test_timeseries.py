@@ -0,0 +1,69 @@
+# tests/test_timeseries.py
+
+import pytest
+from datetime import date, datetime, timedelta
+from django.utils import timezone
+from rest_framework.test import APIClient
+from categories.models import Category
+from commandes.models import Order
+from commandes.timeseries import bucket_range, time_series
+from listings.models import Listing
+
+
+@pytest.fixture
+def listing(make_user):
+    seller = make_user("vendeur@example.com", "70000001", role='seller')
+    return Listing.objects.create(
+        user=seller, category=Category.objects.create(name="Mode"), title="Robe",
+        description="Annonce de test", price=10000, condition='new', quantity=50,
+    )
+
+
+def order_on(listing, buyer, day, number, quantity=1):
+    order = Order.objects.create(buyer=buyer, user=buyer, listing=listing, quantity=quantity, order_number=number)
+    # created_at est auto_now_add : le déplacer à 23h30 heure locale
+    created_at = timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=23, minutes=30))
+    Order.objects.filter(pk=order.pk).update(created_at=created_at)
+
+
+def test_bucket_range_aligns_weeks_and_months():
+    assert bucket_range(date(2025, 1, 8), date(2025, 1, 20), 'week') == [
+        date(2025, 1, 6), date(2025, 1, 13), date(2025, 1, 20)
+    ]
+    assert bucket_range(date(2024, 12, 15), date(2025, 2, 1), 'month') == [
+        date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)
+    ]
+
+
+@pytest.mark.django_db
+def test_series_is_zero_filled_from_one_grouped_query(listing, django_assert_num_queries, make_user):
+    buyer = make_user("acheteur@example.com", "70000002")
+    start = date(2025, 3, 1)
+    order_on(listing, buyer, start, "T1", quantity=2)
+    order_on(listing, buyer, start, "T2")
+    order_on(listing, buyer, start + timedelta(days=3), "T3")
+
+    with django_assert_num_queries(1):
+        chart = time_series(
+            Order.objects.all(), start, start + timedelta(days=4), metrics=['orders', 'revenue', 'units']
+        ).as_chart()
+
+    assert chart['labels'] == ['2025-03-01', '2025-03-02', '2025-03-03', '2025-03-04', '2025-03-05']
+    assert chart['series']['orders'] == [2, 0, 0, 1, 0]
+    assert chart['series']['revenue'] == [30000.0, 0, 0, 10000.0, 0]
+    assert chart['series']['units'] == [3, 0, 0, 1, 0]
+
+
+@pytest.mark.django_db
+def test_admin_time_series_endpoint(listing, make_user):
+    admin = make_user("admin@example.com", "70000003", is_staff=True)
+    order_on(listing, admin, timezone.localdate(), "T4")
+    client = APIClient()
+    client.force_authenticate(admin)
+
+    response = client.get("/api/commandes/stats/admin/time-series/", {"period": "week", "days": 30})
+
+    assert response.status_code == 200
+    data = response.json()['data']
+    assert sum(point['orders'] for point in data) == 1
+    assert data[-1]['orders'] == 1
@@ -0,0 +1,62 @@
+# tests/test_vendor_stats.py
+
+import pytest
+from rest_framework.test import APIClient
+from commandes.models import Order
+from listings.models import Listing
+from categories.models import Category
+from reviews.models import Review
+from users.models import VendorDailyStats
+from users.vendor_stats import backfill
+
+
+@pytest.fixture
+def seller(make_user):
+    return make_user("vendeur@example.com", "70000001", role='seller')
+
+
+@pytest.fixture
+def activity(seller, django_capture_on_commit_callbacks, make_user):
+    buyer = make_user("acheteur@example.com", "70000002")
+    listing = Listing.objects.create(
+        user=seller, category=Category.objects.create(name="Mode"), title="Robe",
+        description="Annonce de test", price=10000, condition='new', quantity=10,
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        Order.objects.create(buyer=buyer, user=buyer, listing=listing, quantity=2, status='completed', order_number="A1")
+        Order.objects.create(buyer=buyer, user=buyer, listing=listing, quantity=1, status='pending', order_number="A2")
+        Review.objects.create(reviewer=buyer, reviewed=seller, rating=4, comment="Bien")
+    return listing
+
+
+@pytest.mark.django_db
+def test_rollup_is_maintained_from_events(seller, activity):
+    row = VendorDailyStats.objects.get(seller=seller)
+
+    assert row.orders['completed'] == {'count': 1, 'revenue': '20000.00', 'units': 2}
+    assert row.orders['pending']['count'] == 1
+    assert row.reviews == {'4': 1}
+
+    # Le backfill reconstruit exactement la même ligne
+    incremental = (row.orders, row.reviews)
+    assert backfill() == 1
+    row = VendorDailyStats.objects.get(seller=seller)
+    assert (row.orders, row.reviews) == incremental
+
+
+@pytest.mark.django_db
+def test_vendor_stats_reads_the_rollup(seller, activity, django_assert_max_num_queries):
+    client = APIClient()
+    client.force_authenticate(seller)
+
+    with django_assert_max_num_queries(20):
+        response = client.get("/api/users/vendor/stats/")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['orders']['total'] == 2
+    assert data['orders']['completed'] == 1
+    assert data['overview']['sales_count']['current'] == 1
+    assert data['reviews']['rating_distribution']['4'] == 1
+    assert len(data['charts']['revenue_trend']) == 30
+    assert data['charts']['revenue_trend'][-1]['revenue'] == 20000.0
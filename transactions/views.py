@@ -1,4 +1,5 @@
 import stripe
+from decimal import Decimal
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -6,6 +7,7 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Transaction, Revenue
 from .serializers import TransactionSerializer, RevenueSerializer
 from commandes.models import Order
+from payments.services.ledger_service import LedgerService
 
 #stripe.api_key = "your_stripe_secret_key"
 
@@ -22,8 +24,13 @@ class PaymentView(APIView):
                 source=request.data.get('stripe_token'),
                 description='Charge for order #' + str(order_id)
             )
-            transaction = Transaction.objects.create(order=order, stripe_transaction_id=charge.id, amount=order.total_price, status='success')
-            revenue = Revenue.objects.create(transaction=transaction, seller=order.listing.user, amount=order.total_price * 0.9)  # 10% commission
+            commission = (order.total_price * Decimal('0.10')).quantize(Decimal('0.01'))  # 10% commission
+            transaction = Transaction.objects.create(
+                order=order, stripe_transaction_id=charge.id, amount=order.total_price,
+                commission=commission, net_amount=order.total_price - commission, status='success',
+            )
+            revenue = Revenue.objects.create(transaction=transaction, seller=order.listing.user, amount=transaction.net_amount)
+            LedgerService.record_payments([transaction])
             order.status = 'completed'
             order.save()
             return Response({'message': 'Payment successful'}, status=status.HTTP_200_OK)
@@ -1,6 +1,13 @@
 # users/apps.py
 from django.apps import AppConfig
+from django.core import checks
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'users'
\ No newline at end of file
+    name = 'users'
+
+    def ready(self):
+        import users.signals  # noqa
+        from e_sugu.throttling import check_throttle_cache
+
+        checks.register(check_throttle_cache, checks.Tags.caches)
@@ -0,0 +1,24 @@
+# users/management/commands/backfill_vendor_stats.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.vendor_stats import backfill
+
+
+class Command(BaseCommand):
+    help = "Recalculer le rollup quotidien des statistiques vendeur (VendorDailyStats)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Limiter aux N derniers jours (défaut: tout l\'historique)')
+        parser.add_argument('--seller', type=int, action='append', dest='sellers', help='Id vendeur (répétable)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days']:
+            since = timezone.localdate() - timedelta(days=options['days'] - 1)
+
+        self.stdout.write("🔄 Recalcul des statistiques vendeur...")
+        rows = backfill(since=since, seller_ids=options['sellers'])
+        self.stdout.write(f"✅ {rows} ligne(s) VendorDailyStats écrite(s)")
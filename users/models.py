@@ -337,4 +337,32 @@ class Address(models.Model):
             lines.append(self.address_line2)
         lines.extend([self.city, self.region])
         return ', '.join(filter(None, lines))
-        
\ No newline at end of file
+        
+
+
+class VendorDailyStats(models.Model):
+    """
+    Statistiques quotidiennes pré-calculées d'un vendeur (une ligne par jour).
+    Maintenue par les signaux commandes / vues / avis et remplie par
+    `python manage.py backfill_vendor_stats` (voir users/vendor_stats.py).
+    """
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+
+    # {'pending': {'count': 2, 'revenue': '30000.00', 'units': 3}, ...}
+    orders = models.JSONField(default=dict, blank=True)
+    views = models.PositiveIntegerField(default=0)
+    unique_visitors = models.PositiveIntegerField(default=0)
+    # {'5': 3, '4': 1, ...}
+    reviews = models.JSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Statistiques quotidiennes vendeur"
+        verbose_name_plural = "Statistiques quotidiennes vendeurs"
+        unique_together = ('seller', 'date')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.seller} - {self.date}"
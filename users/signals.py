@@ -0,0 +1,33 @@
+# users/signals.py
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from commandes.models import Order
+from listings.models import ListingView
+from reviews.models import Review
+from .vendor_stats import schedule_refresh
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def refresh_vendor_orders_stats(sender, instance, **kwargs):
+    """Recalculer les commandes du jour dans le rollup du vendeur"""
+    try:
+        seller_id = instance.listing.user_id
+    except Exception:
+        # Annonce supprimée (CASCADE) : la ligne sera corrigée par le backfill
+        return
+    schedule_refresh(seller_id, instance.created_at, 'orders')
+
+
+@receiver(post_save, sender=ListingView)
+def refresh_vendor_views_stats(sender, instance, created, **kwargs):
+    """Mode de suivi 'sync' : le mode 'buffered' rafraîchit au vidage du tampon"""
+    if created:
+        schedule_refresh(instance.listing.user_id, instance.viewed_at, 'views')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_vendor_reviews_stats(sender, instance, **kwargs):
+    schedule_refresh(instance.reviewed_id, instance.created_at, 'reviews')
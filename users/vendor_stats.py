@@ -0,0 +1,240 @@
+# users/vendor_stats.py
+"""
+Rollup quotidien des statistiques vendeur (modèle VendorDailyStats).
+
+Chaque événement (commande, vue, avis) recalcule uniquement la partie
+concernée de la ligne (vendeur, jour) : une requête d'agrégat sur la journée
+puis un INSERT ... ON CONFLICT DO UPDATE. Le recalcul est idempotent et
+suit donc aussi les changements de statut des commandes.
+
+Les tableaux de bord lisent toutes les lignes d'un vendeur en une seule
+requête et les additionnent en Python (au plus quelques centaines de lignes).
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import VendorDailyStats
+
+logger = logging.getLogger(__name__)
+
+RATINGS = (5, 4, 3, 2, 1)
+
+
+def day_bounds(day):
+    """Début et fin (exclue) d'une journée dans le fuseau du projet"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+
+def _orders_payload(rows):
+    return {
+        row['status']: {
+            'count': row['count'],
+            'revenue': str(row['revenue'] or Decimal('0')),
+            'units': row['units'] or 0,
+        }
+        for row in rows
+    }
+
+
+def _compute_orders(seller_id, start, end):
+    from commandes.models import Order
+
+    rows = Order.objects.filter(
+        listing__user_id=seller_id, created_at__gte=start, created_at__lt=end
+    ).values('status').annotate(count=Count('id'), revenue=Sum('total_price'), units=Sum('quantity'))
+    return {'orders': _orders_payload(rows)}
+
+
+def _compute_views(seller_id, start, end):
+    from listings.models import ListingView
+
+    data = ListingView.objects.filter(
+        listing__user_id=seller_id, viewed_at__gte=start, viewed_at__lt=end
+    ).aggregate(views=Count('id'), unique_visitors=Count('ip_address', distinct=True))
+    return {'views': data['views'], 'unique_visitors': data['unique_visitors']}
+
+
+def _compute_reviews(seller_id, start, end):
+    from reviews.models import Review
+
+    rows = Review.objects.filter(
+        reviewed_id=seller_id, created_at__gte=start, created_at__lt=end
+    ).values('rating').annotate(count=Count('id'))
+    return {'reviews': {str(row['rating']): row['count'] for row in rows}}
+
+
+COMPONENTS = {
+    'orders': _compute_orders,
+    'views': _compute_views,
+    'reviews': _compute_reviews,
+}
+
+
+def refresh_vendor_day(seller_id, day, components=tuple(COMPONENTS)):
+    """Recalculer (tout ou partie de) la ligne d'un vendeur pour une journée"""
+    start, end = day_bounds(day)
+    values = {}
+    for name in components:
+        values.update(COMPONENTS[name](seller_id, start, end))
+
+    VendorDailyStats.objects.bulk_create(
+        [VendorDailyStats(seller_id=seller_id, date=day, updated_at=timezone.now(), **values)],
+        update_conflicts=True,
+        unique_fields=['seller', 'date'],
+        update_fields=list(values) + ['updated_at'],
+    )
+
+
+def schedule_refresh(seller_id, when, component):
+    """Recalculer après le commit de la transaction en cours"""
+    if not seller_id or not when:
+        return
+    day = timezone.localdate(when)
+
+    def refresh():
+        try:
+            refresh_vendor_day(seller_id, day, components=(component,))
+        except Exception as e:
+            logger.error(f"❌ Erreur rollup stats vendeur {seller_id} ({day}): {e}")
+
+    transaction.on_commit(refresh)
+
+
+def schedule_refresh_for_orders(orders):
+    """Pour les mises à jour groupées (`queryset.update`) qui ne déclenchent pas post_save"""
+    for seller_id, created_at in orders.values_list('listing__user_id', 'created_at'):
+        schedule_refresh(seller_id, created_at, 'orders')
+
+
+def schedule_refresh_for_views(listing_ids, when):
+    from listings.models import Listing
+
+    for seller_id in set(Listing.objects.filter(pk__in=listing_ids).values_list('user_id', flat=True)):
+        schedule_refresh(seller_id, when, 'views')
+
+
+
+def backfill(since=None, seller_ids=None, batch_size=1000):
+    """
+    Recalculer le rollup avec trois requêtes groupées par (vendeur, jour)
+    (commandes, vues, avis), puis remplacer les lignes de la période.
+    Retourne le nombre de lignes écrites.
+    """
+    from commandes.models import Order
+    from listings.models import ListingView
+    from reviews.models import Review
+
+    tz = timezone.get_current_timezone()
+    since_dt = day_bounds(since)[0] if since else None
+
+    def scoped(queryset, seller_field, date_field):
+        if since_dt:
+            queryset = queryset.filter(**{f'{date_field}__gte': since_dt})
+        if seller_ids:
+            queryset = queryset.filter(**{f'{seller_field}__in': seller_ids})
+        return queryset.values(seller_field, day=TruncDate(date_field, tzinfo=tz))
+
+    rows = defaultdict(dict)
+
+    grouped_orders = defaultdict(list)
+    for row in scoped(Order.objects.all(), 'listing__user_id', 'created_at').values(
+        'listing__user_id', 'day', 'status'
+    ).annotate(count=Count('id'), revenue=Sum('total_price'), units=Sum('quantity')):
+        grouped_orders[(row['listing__user_id'], row['day'])].append(row)
+    for key, items in grouped_orders.items():
+        rows[key]['orders'] = _orders_payload(items)
+
+    for row in scoped(ListingView.objects.all(), 'listing__user_id', 'viewed_at').annotate(
+        views=Count('id'), unique_visitors=Count('ip_address', distinct=True)
+    ):
+        rows[(row['listing__user_id'], row['day'])].update(views=row['views'], unique_visitors=row['unique_visitors'])
+
+    for row in scoped(Review.objects.all(), 'reviewed_id', 'created_at').values(
+        'reviewed_id', 'day', 'rating'
+    ).annotate(count=Count('id')):
+        rows[(row['reviewed_id'], row['day'])].setdefault('reviews', {})[str(row['rating'])] = row['count']
+
+    with transaction.atomic():
+        stale = VendorDailyStats.objects.all()
+        if since:
+            stale = stale.filter(date__gte=since)
+        if seller_ids:
+            stale = stale.filter(seller_id__in=seller_ids)
+        stale.delete()
+        VendorDailyStats.objects.bulk_create([
+            VendorDailyStats(seller_id=seller_id, date=day, **values)
+            for (seller_id, day), values in rows.items()
+        ], batch_size=batch_size)
+    return len(rows)
+
+
+def get_vendor_days(seller, start=None, end=None):
+    """Lignes quotidiennes du vendeur (bornes incluses) : une seule requête"""
+    queryset = VendorDailyStats.objects.filter(seller=seller)
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    return list(queryset.order_by('date').values('date', 'orders', 'views', 'unique_visitors', 'reviews'))
+
+
+def sum_days(days, start=None, end=None):
+    """Additionner les lignes comprises entre `start` et `end` (inclus)"""
+    totals = {
+        'orders_total': 0,
+        'orders_by_status': defaultdict(int),
+        'revenue_by_status': defaultdict(Decimal),
+        'units_by_status': defaultdict(int),
+        'views': 0,
+        'unique_visitors': 0,
+        'reviews_total': 0,
+        'rating_distribution': {rating: 0 for rating in RATINGS},
+        'average_rating': 0,
+    }
+    rating_sum = 0
+    for day in days:
+        if (start and day['date'] < start) or (end and day['date'] > end):
+            continue
+        for status_name, data in day['orders'].items():
+            totals['orders_total'] += data['count']
+            totals['orders_by_status'][status_name] += data['count']
+            totals['revenue_by_status'][status_name] += Decimal(data['revenue'])
+            totals['units_by_status'][status_name] += data['units']
+        totals['views'] += day['views']
+        totals['unique_visitors'] += day['unique_visitors']
+        for rating, count in day['reviews'].items():
+            rating = int(rating)
+            totals['rating_distribution'][rating] = totals['rating_distribution'].get(rating, 0) + count
+            totals['reviews_total'] += count
+            rating_sum += rating * count
+
+    if totals['reviews_total']:
+        totals['average_rating'] = rating_sum / totals['reviews_total']
+    return totals
+
+
+def daily_series(days, start, end, value):
+    """Série quotidienne complète (jours sans données à zéro) : [(date, valeur), ...]"""
+    from commandes.timeseries import bucket_range
+
+    by_date = {day['date']: day for day in days}
+    return [
+        (current, value(by_date[current]) if current in by_date else 0)
+        for current in bucket_range(start, end)
+    ]
+
+
+def status_value(day, status_name, field='count'):
+    data = day['orders'].get(status_name)
+    if not data:
+        return 0
+    return Decimal(data[field]) if field == 'revenue' else data[field]
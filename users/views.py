@@ -12,12 +12,15 @@ from rest_framework.permissions import IsAdminUser
 from datetime import timedelta, datetime
 from commandes.models import Order
 from listings.models import Listing, Category
-from transactions.models import Transaction, Revenue
+from transactions.models import Transaction
+from payments.models import Payout
+from payments.services.ledger_service import LedgerService
 from reviews.models import Review
 from reviews.serializers import ReviewSerializer
 from listings.serializers import ListingSerializer
 from django.db.models import Sum, Count, Avg, Q
 from django.utils.http import urlsafe_base64_decode
+from django.utils.dateparse import parse_date
 from django.utils.encoding import smart_str, DjangoUnicodeDecodeError
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from rest_framework.response import Response
@@ -39,10 +42,14 @@ from rest_framework import serializers
 from .utils import assign_otp_to_user, send_otp_email, verify_otp
 from rest_framework.parsers import MultiPartParser, FormParser
 from .models import User, OneTimePassword, VendorProfile, Address
+from administration.dashboard_cache import cached_dashboard
+from administration.exports import export_response
+from e_sugu.pagination import KeysetPagination
+from .vendor_stats import day_bounds, daily_series, get_vendor_days, status_value, sum_days
 from .serializers import (UserSerializer,LoginSerializer, 
 UserProfileSerializer,SetNewPasswordSerializer,
 RequestResetPasswordAPISerializer,LogoutSerializer,VendorProfileSerializer, AddressSerializer)
-from rest_framework.throttling import AnonRateThrottle
+from e_sugu.throttling import EmailRateThrottle, IPRateThrottle, PhoneRateThrottle
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
 from django.http import Http404
@@ -58,6 +65,8 @@ logger = logging.getLogger(__name__)
 #@csrf_exempt
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, EmailRateThrottle, PhoneRateThrottle]
+    throttle_scope = 'register'
 
     def post(self, request):
         data = request.data
@@ -142,7 +151,9 @@ class VerifyUserOTP(GenericAPIView):
 class LoginView(GenericAPIView):
     serializer_class = LoginSerializer
     permission_classes = [AllowAny]
-    throttle_classes = [AnonRateThrottle]  # Protection contre les attaques brute force
+    # Protection contre les attaques brute force
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = 'login'
 
     def post(self, request):
         logger.debug("Requête de connexion: %s ",  request.data)
@@ -242,6 +253,8 @@ class ProfileView(APIView):
 class RequestResetPasswordAPIView(GenericAPIView):
     serializer_class = RequestResetPasswordAPISerializer
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, EmailRateThrottle, PhoneRateThrottle]
+    throttle_scope = 'password_reset'
 
     def post(self, request):
         logger.debug("🚀 Requête de réinitialisation reçue: %s", request.data)
@@ -559,6 +572,8 @@ def google_config_debug(request):
 #@csrf_exempt 
 class ResendOTPView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = 'otp'
 
     def post(self, request):
         email = request.data.get("email")
@@ -1022,104 +1037,77 @@ class VendorStatsView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Période pour les comparaisons
-        today = timezone.now()
-        last_30_days = today - timedelta(days=30)
+        # Périodes pour les comparaisons (jours calendaires)
+        today = timezone.localdate()
+        last_30_days = today - timedelta(days=29)
         previous_30_days = last_30_days - timedelta(days=30)
-        
+
+        # 🔥 Rollup quotidien du vendeur : une seule requête pour commandes, vues et avis
+        days = get_vendor_days(user)
+        totals = sum_days(days)
+        current = sum_days(days, last_30_days, today)
+        previous = sum_days(days, previous_30_days, last_30_days - timedelta(days=1))
+
         # 🔥 STATISTIQUES DE VENTES
-        # Commandes récentes du vendeur
-        vendor_orders = Order.objects.filter(listing__user=user)
-        
         # Chiffre d'affaires
-        current_period_revenue = vendor_orders.filter(
-            created_at__gte=last_30_days,
-            status='completed'
-        ).aggregate(total=Sum('total_price'))['total'] or 0
-        
-        previous_period_revenue = vendor_orders.filter(
-            created_at__range=[previous_30_days, last_30_days],
-            status='completed'
-        ).aggregate(total=Sum('total_price'))['total'] or 0
+        current_period_revenue = current['revenue_by_status']['completed']
+        previous_period_revenue = previous['revenue_by_status']['completed']
         
         revenue_change = self._calculate_percentage_change(
             current_period_revenue, previous_period_revenue
         )
         
         # Nombre de ventes
-        current_sales_count = vendor_orders.filter(
-            created_at__gte=last_30_days,
-            status='completed'
-        ).count()
-        
-        previous_sales_count = vendor_orders.filter(
-            created_at__range=[previous_30_days, last_30_days],
-            status='completed'
-        ).count()
+        current_sales_count = current['orders_by_status']['completed']
+        previous_sales_count = previous['orders_by_status']['completed']
         
         sales_change = self._calculate_percentage_change(
             current_sales_count, previous_sales_count
         )
         
-        # 🔥 STATISTIQUES DES PRODUITS
+        # 🔥 STATISTIQUES DES PRODUITS (un seul agrégat)
         vendor_listings = Listing.objects.filter(user=user)
-        logger.info(f"📈 Vendeur a {vendor_listings.count()} annonces")
-        from listings.models import ListingView
-        total_views = ListingView.objects.filter(listing__user=user).count()
-        logger.info(f"👀 Total des vues pour ce vendeur: {total_views}")
-        products_stats = {
-            'total': vendor_listings.count(),
-            'active': vendor_listings.filter(status='active').count(),
-            'out_of_stock': vendor_listings.filter(status='out_of_stock').count(),
-            'sold_out': vendor_listings.filter(
-                Q(quantity_sold__gte=F('quantity')) | 
-                Q(quantity=0)
-            ).count(),
-            'draft': vendor_listings.filter(status='expired').count(),
-        }
+        products_stats = vendor_listings.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='active')),
+            out_of_stock=Count('id', filter=Q(status='out_of_stock')),
+            sold_out=Count('id', filter=Q(quantity_sold__gte=F('quantity')) | Q(quantity=0)),
+            draft=Count('id', filter=Q(status='expired')),
+        )
+        logger.info(f"📈 Vendeur a {products_stats['total']} annonces")
         
         # 🔥 STATISTIQUES DES COMMANDES
-        orders_stats = {
-            'total': vendor_orders.count(),
-            'pending': vendor_orders.filter(status='pending').count(),
-            'confirmed': vendor_orders.filter(status='confirmed').count(),
-            'shipped': vendor_orders.filter(status='shipped').count(),
-            'completed': vendor_orders.filter(status='completed').count(),
-            'cancelled': vendor_orders.filter(status='cancelled').count(),
-        }
+        orders_stats = {'total': totals['orders_total']}
+        for status_name in ('pending', 'confirmed', 'shipped', 'completed', 'cancelled'):
+            orders_stats[status_name] = totals['orders_by_status'][status_name]
         
         # 🔥 AVIS CLIENTS
         vendor_reviews = Review.objects.filter(reviewed=user)
         
         reviews_stats = {
-            'total': vendor_reviews.count(),
-            'average_rating': vendor_reviews.aggregate(avg=Avg('rating'))['avg'] or 0,
-            'rating_distribution': self._get_rating_distribution(vendor_reviews),
+            'total': totals['reviews_total'],
+            'average_rating': totals['average_rating'],
+            'rating_distribution': totals['rating_distribution'],
             'recent_reviews': self._get_recent_reviews_serialized(vendor_reviews)
         }
         
         # 🔥 PERFORMANCE
         performance_stats = {
-            'conversion_rate': self._calculate_conversion_rate(vendor_listings, vendor_orders),
-            'average_delivery_time': self._calculate_average_delivery_time(vendor_orders),
+            'conversion_rate': self._calculate_conversion_rate(products_stats['total'], orders_stats['total']),
+            'average_delivery_time': self._calculate_average_delivery_time(Order.objects.filter(listing__user=user)),
             'customer_satisfaction': reviews_stats['average_rating'],
         }
         
         # 🔥 REVENUS ET PORTEFEUILLE
-        wallet_stats = {
-            'available_balance': self._get_available_balance(user),
-            'pending_payouts': self._get_pending_payouts(user),
-            'total_earnings': self._get_total_earnings(user),
-            'commission_paid': self._get_total_commissions(user),
-        }
+        wallet_stats = self._get_wallet_stats(user)
         
         # 🔥 DONNÉES POUR GRAPHIQUES
         chart_data = {
-            'revenue_trend': self._get_revenue_trend(user, 30),
-            'sales_trend': self._get_sales_trend(user, 30),
+            'revenue_trend': self._get_revenue_trend(days, last_30_days, today),
+            'sales_trend': self._get_sales_trend(days, last_30_days, today),
             'top_products': self._get_top_products(user, 5),
         }
-        visitor_stats = self._get_visitor_stats(user)
+        visitor_stats = self._get_visitor_stats(days, current, previous, today)
         popular_listings = self._get_popular_listings(user)
         category_stats = self._get_category_stats(user)
         return Response({
@@ -1164,20 +1152,8 @@ class VendorStatsView(APIView):
             return 100 if current > 0 else 0
         return round(((current - previous) / previous) * 100, 2)
     
-    def _get_rating_distribution(self, reviews):
-        """Distribution des notes"""
-        distribution = {5: 0, 4: 0, 3: 0, 2: 0, 1: 0}
-        for review in reviews:
-            if review.rating in distribution:
-                distribution[review.rating] += 1
-        return distribution
-    
-    def _calculate_conversion_rate(self, listings, orders):
+    def _calculate_conversion_rate(self, total_listings, total_orders):
         """Calculer le taux de conversion"""
-        # Si vous n'avez pas de compteur de vues, utilisez une estimation
-        total_listings = listings.count()
-        total_orders = orders.count()
-        
         if total_listings == 0:
             return 0
         
@@ -1201,95 +1177,31 @@ class VendorStatsView(APIView):
         
         return round(total_days / count, 1) if count > 0 else 0
     
-    def _get_available_balance(self, user):
-        """Solde disponible pour retrait"""
-        try:
-            completed_transactions = Transaction.objects.filter(
-                order__listing__user=user,
-                status='success'
-            )
-            return completed_transactions.aggregate(total=Sum('net_amount'))['total'] or 0
-        except:
-            return 0
-    
-    def _get_pending_payouts(self, user):
-        """Paiements en attente"""
-        try:
-            pending_orders = Order.objects.filter(
-                listing__user=user,
-                status='completed'
-            ).exclude(transaction__status='success')
-            return pending_orders.aggregate(total=Sum('total_price'))['total'] or 0
-        except:
-            return 0
-    
-    def _get_total_earnings(self, user):
-        """Revenus totaux"""
-        try:
-            revenues = Revenue.objects.filter(seller=user)
-            return revenues.aggregate(total=Sum('amount'))['total'] or 0
-        except:
-            return 0
-    
-    def _get_total_commissions(self, user):
-        """Commissions totales payées"""
-        try:
-            transactions = Transaction.objects.filter(order__listing__user=user)
-            return transactions.aggregate(total=Sum('commission'))['total'] or 0
-        except:
-            return 0
+    def _get_wallet_stats(self, user):
+        """Portefeuille lu sur le solde du grand livre (une ligne) et les versements en cours"""
+        balance = LedgerService.balance(user)
+        # Un versement en cours ne sort du solde qu'une fois payé : ne pas le compter deux fois
+        pending = Payout.objects.filter(seller=user, status='pending').aggregate(total=Sum('amount'))['total'] or 0
+        return {
+            'available_balance': balance.balance - pending,
+            'pending_payouts': pending,
+            'total_earnings': balance.total_earned - balance.total_refunded,
+            'commission_paid': balance.total_commission,
+        }
     
-    def _get_revenue_trend(self, user, days=30):
-        """Tendance des revenus sur X jours"""
-        try:
-            end_date = timezone.now()
-            start_date = end_date - timedelta(days=days)
-            
-            daily_revenue = []
-            for i in range(days):
-                date = start_date + timedelta(days=i)
-                next_date = date + timedelta(days=1)
-                
-                revenue = Order.objects.filter(
-                    listing__user=user,
-                    status='completed',
-                    created_at__range=[date, next_date]
-                ).aggregate(total=Sum('total_price'))['total'] or 0
-                
-                daily_revenue.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'revenue': float(revenue)
-                })
-            
-            return daily_revenue
-        except:
-            return []
+    def _get_revenue_trend(self, days, start, end):
+        """Tendance des revenus jour par jour (jours sans vente à zéro)"""
+        return [
+            {'date': date.strftime('%Y-%m-%d'), 'revenue': float(revenue)}
+            for date, revenue in daily_series(days, start, end, lambda day: status_value(day, 'completed', 'revenue'))
+        ]
     
-    def _get_sales_trend(self, user, days=30):
-        """Tendance des ventes sur X jours"""
-        try:
-            end_date = timezone.now()
-            start_date = end_date - timedelta(days=days)
-            
-            daily_sales = []
-            for i in range(days):
-                date = start_date + timedelta(days=i)
-                next_date = date + timedelta(days=1)
-                
-                sales_count = Order.objects.filter(
-                    listing__user=user,
-                    status='completed',
-                    created_at__range=[date, next_date]
-                ).count()
-                
-                daily_sales.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'sales': sales_count
-                })
-            
-            return daily_sales
-        except:
-            return []
+    def _get_sales_trend(self, days, start, end):
+        """Tendance des ventes jour par jour"""
+        return [
+            {'date': date.strftime('%Y-%m-%d'), 'sales': sales}
+            for date, sales in daily_series(days, start, end, lambda day: status_value(day, 'completed'))
+        ]
     
     def _get_top_products(self, user, limit=5):
         """Produits les plus vendus"""
@@ -1314,72 +1226,27 @@ class VendorStatsView(APIView):
             return []
         
         
-    def _get_visitor_stats(self, user):
-        """Statistiques des visiteurs - VERSION CORRIGÉE"""
-        try:
-            from listings.models import ListingView
-            from django.utils import timezone
-            from datetime import timedelta
-            
-            # IDs des annonces du vendeur
-            vendor_listing_ids = Listing.objects.filter(user=user).values_list('id', flat=True)
-            
-            if not vendor_listing_ids:
-                return self._get_empty_visitor_stats()
-            
-            # Périodes pour la comparaison
-            today = timezone.now()
-            current_period_start = today - timedelta(days=30)
-            previous_period_start = current_period_start - timedelta(days=30)
-            previous_period_end = current_period_start
-            
-            # Vues pour la période actuelle (30 derniers jours)
-            current_views = ListingView.objects.filter(
-                listing_id__in=vendor_listing_ids,
-                viewed_at__gte=current_period_start
-            )
-            
-            # Vues pour la période précédente (30 jours avant)
-            previous_views = ListingView.objects.filter(
-                listing_id__in=vendor_listing_ids,
-                viewed_at__range=[previous_period_start, previous_period_end]
-            )
-            
-            # Calculs réels
-            current_total_views = current_views.count()
-            current_unique_visitors = current_views.values('ip_address').distinct().count()
-            
-            previous_total_views = previous_views.count()
-            previous_unique_visitors = previous_views.values('ip_address').distinct().count()
-            
-            # Calcul des pourcentages de changement
-            views_change = self._calculate_percentage_change(current_total_views, previous_total_views)
-            visitor_change = self._calculate_percentage_change(current_unique_visitors, previous_unique_visitors)
-            
-            # Vues aujourd'hui
-            views_today = ListingView.objects.filter(
-                listing_id__in=vendor_listing_ids,
-                viewed_at__date=today.date()
-            ).count()
-            
-            return {
-                'unique_visitors': {
-                    'current': current_unique_visitors,
-                    'previous': previous_unique_visitors,
-                    'change': visitor_change
-                },
-                'total_views': {
-                    'current': current_total_views,
-                    'previous': previous_total_views,
-                    'change': views_change
-                },
-                'views_today': views_today,
-                'avg_time_on_site': 2.5  # Vous pouvez implémenter cette logique plus tard
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur stats visiteurs: {str(e)}")
-            return self._get_empty_visitor_stats()
+    def _get_visitor_stats(self, days, current, previous, today):
+        """
+        Statistiques des visiteurs, depuis le rollup quotidien.
+        Les visiteurs uniques d'une période sont la somme des visiteurs uniques de chaque jour.
+        """
+        views_today = next((day['views'] for day in days if day['date'] == today), 0)
+        
+        return {
+            'unique_visitors': {
+                'current': current['unique_visitors'],
+                'previous': previous['unique_visitors'],
+                'change': self._calculate_percentage_change(current['unique_visitors'], previous['unique_visitors'])
+            },
+            'total_views': {
+                'current': current['views'],
+                'previous': previous['views'],
+                'change': self._calculate_percentage_change(current['views'], previous['views'])
+            },
+            'views_today': views_today,
+            'avg_time_on_site': 2.5  # Vous pouvez implémenter cette logique plus tard
+        }
             
     #def _get_visitor_stats(self, user):
         """Version temporaire avec données simulées pour testing"""
@@ -1558,42 +1425,49 @@ class VendorSalesReportView(APIView):
         end_date = request.GET.get('end_date')
         period = request.GET.get('period', '30d')
         
-        # Appliquer les filtres de date
-        orders_queryset = Order.objects.filter(listing__user=user)
-        
         if start_date and end_date:
-            orders_queryset = orders_queryset.filter(
-                created_at__range=[start_date, end_date]
-            )
+            start = parse_date(str(start_date)[:10])
+            end = parse_date(str(end_date)[:10])
+            if not start or not end:
+                return Response(
+                    {'error': 'Dates invalides (format attendu: AAAA-MM-JJ)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         else:
             # Période par défaut : 30 derniers jours
-            default_end = timezone.now()
-            default_start = default_end - timedelta(days=30)
-            orders_queryset = orders_queryset.filter(
-                created_at__range=[default_start, default_end]
-            )
+            end = timezone.localdate()
+            start = end - timedelta(days=29)
+        
+        # Rollup quotidien : une seule requête pour la période
+        days = get_vendor_days(user, start, end)
+        totals = sum_days(days)
+        completed_orders = totals['orders_by_status']['completed']
+        total_revenue = totals['revenue_by_status']['completed']
+        
+        orders_queryset = Order.objects.filter(
+            listing__user=user,
+            created_at__gte=day_bounds(start)[0],
+            created_at__lt=day_bounds(end)[1]
+        )
         
         # Statistiques détaillées
         report_data = {
             'period': {
-                'start': start_date or default_start.isoformat(),
-                'end': end_date or default_end.isoformat()
+                'start': start.isoformat(),
+                'end': end.isoformat()
             },
             'summary': {
-                'total_orders': orders_queryset.count(),
-                'completed_orders': orders_queryset.filter(status='completed').count(),
-                'total_revenue': orders_queryset.filter(status='completed').aggregate(
-                    total=Sum('total_price')
-                )['total'] or 0,
-                'average_order_value': orders_queryset.filter(status='completed').aggregate(
-                    avg=Avg('total_price')
-                )['avg'] or 0,
+                'total_orders': totals['orders_total'],
+                'completed_orders': completed_orders,
+                'total_revenue': total_revenue,
+                'average_order_value': total_revenue / completed_orders if completed_orders else 0,
             },
-            'orders_by_status': list(orders_queryset.values('status').annotate(
-                count=Count('id')
-            )),
+            'orders_by_status': [
+                {'status': status_name, 'count': count}
+                for status_name, count in totals['orders_by_status'].items()
+            ],
             'top_products': self._get_top_products_report(user, orders_queryset),
-            'daily_breakdown': self._get_daily_breakdown(orders_queryset)
+            'daily_breakdown': self._get_daily_breakdown(days)
         }
         
         return Response(report_data)
@@ -1619,21 +1493,17 @@ class VendorSalesReportView(APIView):
         except:
             return []
     
-    def _get_daily_breakdown(self, orders_queryset):
-        """Récupérer la répartition quotidienne"""
-        try:
-            from django.db.models.functions import TruncDate
-            
-            daily_data = orders_queryset.filter(status='completed').annotate(
-                date=TruncDate('created_at')
-            ).values('date').annotate(
-                orders=Count('id'),
-                revenue=Sum('total_price')
-            ).order_by('date')
-            
-            return list(daily_data)
-        except:
-            return []
+    def _get_daily_breakdown(self, days):
+        """Répartition quotidienne des ventes (jours avec ventes uniquement)"""
+        return [
+            {
+                'date': day['date'],
+                'orders': status_value(day, 'completed'),
+                'revenue': status_value(day, 'completed', 'revenue'),
+            }
+            for day in days
+            if status_value(day, 'completed')
+        ]
 
 # users/views.py - Correction de VendorPerformanceView
 
@@ -1670,23 +1540,30 @@ class VendorPerformanceView(APIView):
     
     def _get_sales_performance(self, user, periods, today):  # ✅ Ajouter today comme paramètre
         """Performance des ventes par période"""
-        sales_data = {}
-        
+        ranges = {}
         for period_name, start_date in periods.items():
             # ✅ CORRECTION : Utiliser today passé en paramètre
             end_date = today if period_name.startswith('current') else start_date + timedelta(days=32)
-            
-            orders = Order.objects.filter(
-                listing__user=user,
-                created_at__range=[start_date, end_date],
-                status='completed'
-            )
+            ranges[period_name] = (start_date, end_date)
+        
+        # Rollup quotidien (une requête) + clients uniques de toutes les périodes (une requête)
+        days = get_vendor_days(user, start=timezone.localdate(min(start for start, _ in ranges.values())))
+        customers = Order.objects.filter(listing__user=user, status='completed').aggregate(**{
+            period_name: Count('buyer', distinct=True, filter=Q(created_at__range=[start_date, end_date]))
+            for period_name, (start_date, end_date) in ranges.items()
+        })
+        
+        sales_data = {}
+        for period_name, (start_date, end_date) in ranges.items():
+            totals = sum_days(days, timezone.localdate(start_date), timezone.localdate(end_date))
+            total_orders = totals['orders_by_status']['completed']
+            total_revenue = totals['revenue_by_status']['completed']
             
             sales_data[period_name] = {
-                'total_orders': orders.count(),
-                'total_revenue': orders.aggregate(total=Sum('total_price'))['total'] or 0,
-                'average_order_value': orders.aggregate(avg=Avg('total_price'))['avg'] or 0,
-                'unique_customers': orders.values('buyer').distinct().count(),
+                'total_orders': total_orders,
+                'total_revenue': total_revenue,
+                'average_order_value': total_revenue / total_orders if total_orders else 0,
+                'unique_customers': customers[period_name],
             }
         
         return sales_data
@@ -1705,7 +1582,7 @@ class VendorPerformanceView(APIView):
     def _get_customer_metrics(self, user):
         """Métriques clients"""
         orders = Order.objects.filter(listing__user=user, status='completed')
-        reviews = Review.objects.filter(listing__user=user)
+        reviews = Review.objects.filter(reviewed=user)
         
         return {
             'repeat_customers': self._get_repeat_customers_count(orders),
@@ -1820,35 +1697,22 @@ def vendor_quick_stats(request):
         }, status=403)
     
     try:
-        # Commandes du vendeur
-        vendor_orders = Order.objects.filter(listing__user=user)
-        vendor_listings = Listing.objects.filter(user=user)
-        from listings.models import ListingView
-        from django.utils import timezone
-        from datetime import timedelta
-        vendor_listing_ids = vendor_listings.values_list('id', flat=True)
-
-        today = timezone.now()
-        last_30_days = today - timedelta(days=30)
-        
-        current_views = ListingView.objects.filter(
-            listing_id__in=vendor_listing_ids,
-            viewed_at__gte=last_30_days
-        )
-        
-        # Période précédente (30-60 jours)
+        today = timezone.localdate()
+        last_30_days = today - timedelta(days=29)
         previous_period_start = last_30_days - timedelta(days=30)
-        previous_views = ListingView.objects.filter(
-            listing_id__in=vendor_listing_ids,
-            viewed_at__range=[previous_period_start, last_30_days]
-        )
+        
+        # Rollup quotidien du vendeur : une seule requête
+        days = get_vendor_days(user)
+        totals = sum_days(days)
+        current = sum_days(days, last_30_days, today)
+        previous = sum_days(days, previous_period_start, last_30_days - timedelta(days=1))
         
         # Calculs
-        current_total_views = current_views.count()
-        current_unique_visitors = current_views.values('ip_address').distinct().count()
+        current_total_views = current['views']
+        current_unique_visitors = current['unique_visitors']
         
-        previous_total_views = previous_views.count()
-        previous_unique_visitors = previous_views.values('ip_address').distinct().count()
+        previous_total_views = previous['views']
+        previous_unique_visitors = previous['unique_visitors']
         
         # Pourcentages de changement
         def calculate_change(current, previous):
@@ -1860,10 +1724,14 @@ def vendor_quick_stats(request):
         visitor_change = calculate_change(current_unique_visitors, previous_unique_visitors)
         
         # Vues aujourd'hui
-        views_today = ListingView.objects.filter(
-            listing_id__in=vendor_listing_ids,
-            viewed_at__date=today.date()
-        ).count()
+        views_today = next((day['views'] for day in days if day['date'] == today), 0)
+        
+        products = Listing.objects.filter(user=user).aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='active')),
+            out_of_stock=Count('id', filter=Q(status='out_of_stock')),
+            draft=Count('id', filter=Q(status='expired')),
+        )
 
         # Calcul des statistiques
         stats = {
@@ -1874,22 +1742,15 @@ def vendor_quick_stats(request):
                 'shop_name': user.vendor_profile.shop_name if hasattr(user, 'vendor_profile') else None
             },
             'orders': {
-                'total': vendor_orders.count(),
-                'pending': vendor_orders.filter(status='pending').count(),
-                'confirmed': vendor_orders.filter(status='confirmed').count(),
-                'completed': vendor_orders.filter(status='completed').count(),
-                'cancelled': vendor_orders.filter(status='cancelled').count(),
-            },
-            'products': {
-                'total': vendor_listings.count(),
-                'active': vendor_listings.filter(status='active').count(),
-                'out_of_stock': vendor_listings.filter(status='out_of_stock').count(),
-                'draft': vendor_listings.filter(status='expired').count(),
+                'total': totals['orders_total'],
+                'pending': totals['orders_by_status']['pending'],
+                'confirmed': totals['orders_by_status']['confirmed'],
+                'completed': totals['orders_by_status']['completed'],
+                'cancelled': totals['orders_by_status']['cancelled'],
             },
+            'products': products,
             'financial': {
-                'total_revenue': float(vendor_orders.filter(status='completed').aggregate(
-                    total=Sum('total_price')
-                )['total'] or 0),
+                'total_revenue': float(totals['revenue_by_status']['completed']),
                 'currency': 'XOF'
             },
             'visitors': {
@@ -2140,29 +2001,8 @@ class AdminUserViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def export(self, request):
-        """Exporter les utilisateurs en CSV"""
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="utilisateurs_{datetime.now().strftime("%Y%m%d")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Email', 'Nom', 'Prénom', 'Rôle', 'Téléphone', 'Statut', 'Date d\'inscription'])
-        
-        users = self.get_queryset()
-        for user in users:
-            writer.writerow([
-                user.email,
-                user.last_name,
-                user.first_name,
-                user.get_role_display(),
-                f"{user.country_code}{user.phone}",
-                "Actif" if user.is_active else "Inactif",
-                user.created_at.strftime('%Y-%m-%d')
-            ])
-        
-        return response
+        """Exporter les utilisateurs (CSV ou NDJSON, en flux)"""
+        return export_response(request, 'users', self.get_queryset())
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
@@ -2200,24 +2040,18 @@ def admin_users_list(request):
         users = users.order_by('-created_at')
     
     
-    page = int(request.GET.get('page', '1'))
-    page_size = int(request.GET.get('page_size', '50'))
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-    
-    paginated_users = users[start_index:end_index]
+    # Pagination par curseur ; ?page=N garde l'ancien format (page, total_pages)
+    paginator = KeysetPagination(page_size=50)
+    paginated_users = paginator.paginate_queryset(users, request)
     serializer = AdminUserSerializer(paginated_users, many=True, context={'request': request})
-    
-    data = {
-        'count': users.count(),
-        'page': page,
-        'page_size': page_size,
-        'total_pages': (users.count() + page_size - 1) // page_size,
-        'results': serializer.data
-    }
-    
-    # 🔥 CORRECTION: Retourner une Response DRF qui gère automatiquement le JSON
-    return Response(data)
+    response = paginator.get_paginated_response(serializer.data)
+    
+    if paginator.page_paginator:
+        page = paginator.page_paginator.page
+        response.data['page'] = page.number
+        response.data['page_size'] = page.paginator.per_page
+        response.data['total_pages'] = page.paginator.num_pages
+    return response
 @api_view(['PATCH'])
 @permission_classes([IsAdminUser])
 def admin_update_user(request, user_id):
@@ -2496,6 +2330,7 @@ def admin_recent_orders(request):
 # users/views.py - CORRECTION de admin_top_vendors
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@cached_dashboard('admin_top_vendors', depends_on=('listings', 'orders', 'reviews'))
 def admin_top_vendors(request):
     """Top vendeurs pour le dashboard - VERSION CORRIGÉE"""
     try:
@@ -2665,6 +2500,7 @@ def check_admin_permission(request):
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@cached_dashboard('admin_dashboard_stats', depends_on=('listings', 'orders', 'transactions'))
 def admin_dashboard_stats(request):
     """Statistiques complètes pour le dashboard admin"""
     from django.utils import timezone
@@ -3304,13 +3140,9 @@ def vendor_notifications(request):
     from notifications.models import Notification
     notifications = Notification.objects.filter(user=user).order_by('-created_at')
     
-    # Pagination
-    page = int(request.GET.get('page', 1))
-    page_size = int(request.GET.get('page_size', 50))
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-    
-    paginated_notifications = notifications[start_index:end_index]
+    # Pagination par curseur (?page=N reste accepté)
+    paginator = KeysetPagination(page_size=50, count_mode='exact')
+    paginated_notifications = paginator.paginate_queryset(notifications, request)
     
     # Serializer personnalisé pour les notifications vendeur
     notifications_data = []
@@ -3333,17 +3165,13 @@ def vendor_notifications(request):
     ).count()
     
     # 🔥 CORRECTION: Retourner un format plus standard
-    return Response({
-        'count': notifications.count(),
-        'next': None if end_index >= notifications.count() else page + 1,
-        'previous': None if page <= 1 else page - 1,
-        'results': notifications_data,
-        'stats': {
-            'total': notifications.count(),
-            'unread': unread_count,
-            'out_of_stock_alerts': out_of_stock_count
-        }
-    })
+    response = paginator.get_paginated_response(notifications_data)
+    response.data['stats'] = {
+        'total': response.data.get('count'),
+        'unread': unread_count,
+        'out_of_stock_alerts': out_of_stock_count
+    }
+    return response
 # users/views.py
 
 @api_view(['POST'])